@@ -0,0 +1,487 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.agents.forms_index import (
+    FORMS_CSV, clean_title, find_form_codes, form_code_key, read_forms_csv, strip_form_codes,
+)
+from app.agents.lexical_index import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+PROGRAMS_JSON = Path(__file__).resolve().parent / "eligibility_rules" / "canadian_immigration_programs.json"
+CATALOG_DB = Path(os.getenv(
+    "CATALOG_DB",
+    Path(__file__).resolve().parents[2] / "data" / "catalog.sqlite",
+))
+SCHEMA_VERSION = 1
+CATALOG_MAX_K = 20
+
+# bm25() column weights for forms_fts(form_code, title, how_to_fill_instructions)
+FORM_FTS_WEIGHTS = (10.0, 5.0, 1.0)
+# ... and for programs_fts(name, province, rules)
+PROGRAM_FTS_WEIGHTS = (5.0, 2.0, 1.0)
+# Left out when matching a query against program names
+GENERIC_NAME_WORDS = frozenset("program programme stream category".split())
+
+_lock = threading.Lock()
+_catalog: Optional["Catalog"] = None
+_catalog_loaded = False
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+
+CREATE TABLE forms (
+    id INTEGER PRIMARY KEY,
+    form_code TEXT NOT NULL,
+    code_key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    last_updated TEXT,
+    form_page_url TEXT,
+    pdf_url TEXT,
+    how_to_fill_instructions TEXT
+);
+CREATE VIRTUAL TABLE forms_fts USING fts5(
+    form_code, title, how_to_fill_instructions,
+    content='forms', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TABLE programs (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    official_url TEXT,
+    last_updated TEXT,
+    jurisdiction TEXT,
+    province TEXT,
+    record_json TEXT NOT NULL
+);
+CREATE INDEX idx_programs_jurisdiction ON programs (jurisdiction);
+CREATE INDEX idx_programs_province ON programs (province);
+
+-- One row per leaf of a program's rules: category is the rule group
+-- ("language", "settlement_funds", "selection_system" ...) and attribute
+-- the dotted path inside it ("english_min", "table_cad.1").
+CREATE TABLE program_rules (
+    program_id INTEGER NOT NULL REFERENCES programs (id),
+    category TEXT NOT NULL,
+    attribute TEXT NOT NULL,
+    value_text TEXT,
+    value_num REAL,
+    value_json TEXT NOT NULL,
+    PRIMARY KEY (program_id, category, attribute)
+) WITHOUT ROWID;
+CREATE INDEX idx_program_rules_attribute ON program_rules (category, attribute, value_num);
+
+CREATE VIRTUAL TABLE programs_fts USING fts5(
+    name, province, rules, tokenize='porter unicode61 remove_diacritics 2'
+);
+"""
+
+_FORM_SUMMARY = "forms.id, forms.form_code, forms.title, forms.last_updated, forms.form_page_url, forms.pdf_url"
+
+# Top-level program keys stored as columns rather than rules
+_PROGRAM_COLUMNS = ("program_name", "official_url", "last_updated", "federal_or_provincial", "province")
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _fingerprint(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _leaves(value: Any, path: str = "") -> Iterator[Tuple[str, Any]]:
+    """(dotted path, value) for every non-dict value; lists are leaves."""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _leaves(child, f"{path}.{key}" if path else str(key))
+    else:
+        yield path, value
+
+
+def program_rules(program: Dict) -> Iterator[Tuple[str, str, Any]]:
+    """(category, attribute, value) rows for one program record."""
+    for category, group in (program.get("eligibility_rules") or {}).items():
+        for attribute, value in _leaves(group):
+            yield category, attribute, value
+    for key, value in program.items():
+        if key in _PROGRAM_COLUMNS or key == "eligibility_rules":
+            continue
+        if isinstance(value, dict):
+            for attribute, leaf in _leaves(value):
+                yield key, attribute, leaf
+        else:
+            yield "program", key, value
+
+
+def _rule_row(program_id: int, category: str, attribute: str, value: Any) -> Tuple:
+    number = float(value) if isinstance(value, (int, float)) else None  # bools too: 1/0
+    text = value if isinstance(value, str) else None
+    return program_id, category, attribute, text, number, json.dumps(value, ensure_ascii=False)
+
+
+def _load_forms(conn: sqlite3.Connection, forms_csv: Path) -> int:
+    seen = set()
+    rows = []
+    for row in read_forms_csv(forms_csv):
+        key = form_code_key(row["form_code"])
+        if key is None or key in seen:
+            logger.warning(f"Skipping form {row['form_code']!r}: unrecognized or duplicate code")
+            continue
+        seen.add(key)
+        rows.append((row["form_code"], key, clean_title(row.get("title", "")), row.get("last_updated"),
+                     row.get("form_page_url"), row.get("pdf_url"), row.get("how_to_fill_instructions")))
+    conn.executemany(
+        "INSERT INTO forms (form_code, code_key, title, last_updated, form_page_url, pdf_url, how_to_fill_instructions)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.execute("INSERT INTO forms_fts (forms_fts) VALUES ('rebuild')")
+    return len(rows)
+
+
+def _load_programs(conn: sqlite3.Connection, programs_json: Path) -> Tuple[int, int]:
+    with open(programs_json, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    programs, rules = 0, 0
+    seen: Dict[str, Dict] = {}
+    for program in data.get("programs", []):
+        slug = slugify(program["program_name"])
+        if slug in seen:
+            if seen[slug] != program:
+                logger.warning(f"Program {program['program_name']!r} listed twice with different rules; keeping the first")
+            continue
+        seen[slug] = program
+
+        cursor = conn.execute(
+            "INSERT INTO programs (slug, name, official_url, last_updated, jurisdiction, province, record_json)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (slug, program["program_name"], program.get("official_url"), program.get("last_updated"),
+             program.get("federal_or_provincial"), program.get("province"), json.dumps(program, ensure_ascii=False)),
+        )
+        program_id = cursor.lastrowid
+        rows = [_rule_row(program_id, *rule) for rule in program_rules(program)]
+        conn.executemany(
+            "INSERT INTO program_rules (program_id, category, attribute, value_text, value_num, value_json)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        rules_text = " ".join(f"{r[1]} {r[2]} {r[3]}" for r in rows if r[3])
+        conn.execute(
+            "INSERT INTO programs_fts (rowid, name, province, rules) VALUES (?, ?, ?, ?)",
+            (program_id, program["program_name"], program.get("province") or "", rules_text),
+        )
+        programs += 1
+        rules += len(rows)
+    return programs, rules
+
+
+def build_catalog(
+    forms_csv: Path = FORMS_CSV,
+    programs_json: Path = PROGRAMS_JSON,
+    out_path: Path = CATALOG_DB,
+    force: bool = False,
+) -> Dict:
+    """
+    Load the forms CSV and the programs JSON into one SQLite database with
+    FTS5 indexes. Skipped when both sources are unchanged since the last
+    build. The database is written under a temporary name and moved into
+    place, so open readers keep seeing the previous build.
+    """
+    out_path = Path(out_path)
+    sources = {"forms_csv": _fingerprint(forms_csv), "programs_json": _fingerprint(programs_json)}
+    if out_path.exists() and not force:
+        try:
+            built = Catalog(out_path).meta()
+            if built.get("schema_version") == str(SCHEMA_VERSION) and all(
+                built.get(name) == digest for name, digest in sources.items()
+            ):
+                logger.info(f"{out_path} is up to date")
+                return {"path": str(out_path), "skipped": True, **built}
+        except sqlite3.Error:
+            pass
+
+    t0 = time.perf_counter()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            forms = _load_forms(conn, forms_csv)
+            programs, rules = _load_programs(conn, programs_json)
+            meta = {
+                "schema_version": str(SCHEMA_VERSION),
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "forms": str(forms),
+                "programs": str(programs),
+                "program_rules": str(rules),
+                **sources,
+            }
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", meta.items())
+        conn.execute("INSERT INTO forms_fts (forms_fts) VALUES ('optimize')")
+        conn.execute("INSERT INTO programs_fts (programs_fts) VALUES ('optimize')")
+        conn.commit()
+        conn.execute("VACUUM")
+    except Exception:
+        conn.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    conn.close()
+    os.replace(tmp_path, out_path)
+
+    stats = {"path": str(out_path), "seconds": round(time.perf_counter() - t0, 3),
+             "bytes": out_path.stat().st_size, **meta}
+    logger.info(f"Built {out_path}: {forms} forms, {programs} programs, {rules} rules")
+    return stats
+
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+def words(text: str) -> List[str]:
+    """Lowercase words of `text` without stopwords, in order."""
+    return [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS]
+
+
+def fts_query(text: str) -> Optional[str]:
+    """FTS5 MATCH expression: any of the query's words, each quoted so user text can't inject syntax."""
+    return " OR ".join(f'"{w}"' for w in dict.fromkeys(words(text))) or None
+
+
+def name_match(query: str, names: List[str]) -> Optional[int]:
+    """
+    Index of the name `query` spells out in full, or None: every word of
+    the name (ignoring GENERIC_NAME_WORDS) or its acronym in parentheses
+    appears in the query. The longest such name wins, so "Express Entry
+    Federal Skilled Worker" picks "Federal Skilled Worker Program (FSW)"
+    over a provincial stream that only shares some of its words.
+    """
+    query_words = set(words(query))
+    best, best_size = None, 0
+    for i, name in enumerate(names):
+        acronym = re.search(r"\(([A-Za-z]+)\)", name)
+        name_words = set(words(re.sub(r"\([^)]*\)", " ", name))) - GENERIC_NAME_WORDS
+        if acronym and acronym.group(1).lower() in query_words:
+            size = len(name_words) + 1
+        elif name_words and name_words <= query_words:
+            size = len(name_words)
+        else:
+            continue
+        if size > best_size:
+            best, best_size = i, size
+    return best
+
+
+class Catalog:
+    """
+    Read-only access to the catalog database. Safe to share across
+    threads; each process opens its own connection and SQLite's statement
+    cache keeps the lookups prepared.
+    """
+
+    def __init__(self, path: Path = CATALOG_DB):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"{self.path} not found; run: python -m app.agents.catalog_db build")
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._conn = conn
+        return self._conn
+
+    def _all(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._connect().execute(sql, params).fetchall()]
+
+    def meta(self) -> Dict[str, str]:
+        return {row["key"]: row["value"] for row in self._all("SELECT key, value FROM meta")}
+
+    # --- forms ---
+
+    def form(self, code: str) -> Optional[Dict]:
+        """The form with this code in any common spelling ("IMM5257", "imm 5257e"), or None."""
+        key = form_code_key(code)
+        if key is None:
+            return None
+        keys = (key, key[:-1]) if key[-1] in ("e", "f") else (key,)
+        for candidate in keys:
+            rows = self._all("SELECT * FROM forms WHERE code_key = ?", (candidate,))
+            if rows:
+                return rows[0]
+        return None
+
+    def search_forms(self, query: str, k: int = 5, snippets: bool = False) -> List[Dict]:
+        """
+        Forms named by code in `query` first, then full-text matches over
+        code, title and instructions ranked by BM25. Instructions are left
+        out; `snippets` adds the matching passage of each (about 1 ms
+        more, as the instruction texts are long).
+        """
+        k = max(1, min(int(k), CATALOG_MAX_K))
+        results, seen = [], set()
+        for key in find_form_codes(query):
+            form = self.form(key)
+            if form and form["id"] not in seen:
+                seen.add(form["id"])
+                form.pop("how_to_fill_instructions")
+                results.append({**form, "score": None})
+        # Codes are removed first: "imm" alone would match every form
+        match = fts_query(strip_form_codes(query))
+        if match and len(results) < k:
+            # Rank first, then fetch rows (and snippets) for the top k only
+            rows = self._all(
+                "WITH top AS (SELECT rowid, bm25(forms_fts, ?1, ?2, ?3) AS score FROM forms_fts"
+                " WHERE forms_fts MATCH ?4 ORDER BY score LIMIT ?5)"
+                f" SELECT {_FORM_SUMMARY}, top.score"
+                + (", snippet(forms_fts, 2, '[', ']', '…', 16) AS snippet" if snippets else "")
+                + " FROM top JOIN forms ON forms.id = top.rowid"
+                + (" JOIN forms_fts ON forms_fts.rowid = top.rowid WHERE forms_fts MATCH ?4" if snippets else "")
+                + " ORDER BY top.score",
+                (*FORM_FTS_WEIGHTS, match, k + len(results)),
+            )
+            for row in rows:
+                if row["id"] not in seen and row["score"] < 0:  # bm25() is lower-is-better
+                    seen.add(row["id"])
+                    row["score"] = round(-row["score"], 4)
+                    results.append(row)
+        return results[:k]
+
+    # --- programs ---
+
+    def programs(self, jurisdiction: Optional[str] = None, province: Optional[str] = None) -> List[Dict]:
+        """Program summaries, optionally only federal/provincial/quebec ones or one province."""
+        clauses, params = [], []
+        if jurisdiction:
+            clauses.append("jurisdiction = ?")
+            params.append(jurisdiction.lower())
+        if province:
+            clauses.append("province LIKE ?")
+            params.append(f"%{province}%")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._all(
+            f"SELECT id, slug, name, official_url, last_updated, jurisdiction, province FROM programs{where} ORDER BY id",
+            tuple(params),
+        )
+
+    def program(self, name: str) -> Optional[Dict]:
+        """
+        A program by slug, exact name, a name spelled out in full (see
+        name_match) or best full-text match, with its rules nested by category.
+        """
+        rows = self._all("SELECT * FROM programs WHERE slug = ? OR name = ?", (slugify(name), name))
+        if not rows:
+            names = self._all("SELECT id, name FROM programs ORDER BY id")
+            best = name_match(name, [row["name"] for row in names])
+            if best is not None:
+                rows = self._all("SELECT * FROM programs WHERE id = ?", (names[best]["id"],))
+        if not rows:
+            rows = self.search_programs(name, k=1)
+        if not rows:
+            return None
+        program = rows[0]
+        program["rules"] = self.rules(program["id"])
+        program["record"] = json.loads(program.pop("record_json"))
+        return program
+
+    def rules(self, program_id: int) -> Dict[str, Dict[str, Any]]:
+        rules: Dict[str, Dict[str, Any]] = {}
+        for row in self._all(
+            "SELECT category, attribute, value_json FROM program_rules WHERE program_id = ?", (program_id,)
+        ):
+            rules.setdefault(row["category"], {})[row["attribute"]] = json.loads(row["value_json"])
+        return rules
+
+    def rule_values(self, category: str, attribute: str) -> List[Dict]:
+        """One rule across all programs, e.g. ("age", "max_age") or ("language", "english_min")."""
+        rows = self._all(
+            "SELECT programs.name, programs.province, program_rules.value_json FROM program_rules"
+            " JOIN programs ON programs.id = program_rules.program_id"
+            " WHERE program_rules.category = ? AND program_rules.attribute = ? ORDER BY programs.id",
+            (category, attribute),
+        )
+        return [{"name": r["name"], "province": r["province"], "value": json.loads(r["value_json"])} for r in rows]
+
+    def search_programs(self, query: str, k: int = 5) -> List[Dict]:
+        match = fts_query(query)
+        if not match:
+            return []
+        rows = self._all(
+            "SELECT programs.*, bm25(programs_fts, ?, ?, ?) AS score FROM programs_fts"
+            " JOIN programs ON programs.id = programs_fts.rowid"
+            " WHERE programs_fts MATCH ? ORDER BY score LIMIT ?",
+            (*PROGRAM_FTS_WEIGHTS, match, max(1, min(int(k), CATALOG_MAX_K))),
+        )
+        for row in rows:
+            row["score"] = round(-row["score"], 4)
+        return rows
+
+
+def get_catalog() -> Optional[Catalog]:
+    """Process-wide catalog, or None if it has not been built."""
+    global _catalog, _catalog_loaded
+    if not _catalog_loaded:
+        with _lock:
+            if not _catalog_loaded:
+                try:
+                    _catalog = Catalog(CATALOG_DB)
+                    logger.info(f"Loaded catalog from {CATALOG_DB}")
+                except Exception as e:
+                    logger.warning(f"Catalog unavailable: {e}")
+                _catalog_loaded = True
+    return _catalog
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    # python -m app.agents.catalog_db build [--force]
+    # python -m app.agents.catalog_db forms <query>
+    # python -m app.agents.catalog_db program <name>
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "build":
+        print(json.dumps(build_catalog(force="--force" in sys.argv), indent=2))
+    elif command in ("forms", "program") and len(sys.argv) > 2:
+        catalog = Catalog()
+        query = " ".join(sys.argv[2:])
+        t0 = time.perf_counter()
+        if command == "forms":
+            results = catalog.search_forms(query, snippets=True)
+            elapsed = (time.perf_counter() - t0) * 1000
+            for form in results:
+                print(f"{form['score'] if form['score'] is not None else 'code':>8}  {form['form_code']:<16} {form['title']}")
+        else:
+            results = catalog.program(query)
+            elapsed = (time.perf_counter() - t0) * 1000
+            print(json.dumps({k: v for k, v in (results or {}).items() if k != "record"}, indent=2, ensure_ascii=False))
+        print(f"{elapsed:.2f} ms")
+    else:
+        print("usage: python -m app.agents.catalog_db build [--force] | forms <query> | program <name>")
+        sys.exit(2)
@@ -0,0 +1,341 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from app.agents.document_agent import DocumentChecklist
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CHECKLIST_CACHE_PATH = Path(os.getenv(
+    "CHECKLIST_CACHE_PATH",
+    Path(__file__).resolve().parents[2] / "cache" / "checklists.sqlite",
+))
+# Entries younger than the TTL are served as-is; older ones are served
+# once more while a background run refreshes them; past MAX_AGE they are
+# treated as a miss.
+CHECKLIST_CACHE_TTL = int(os.getenv("CHECKLIST_CACHE_TTL", str(3 * 24 * 3600)))
+CHECKLIST_CACHE_MAX_AGE = int(os.getenv("CHECKLIST_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+
+# Shared entries are built under this user (by an agent with memory and
+# history disabled) so they don't touch real users' memories
+CHECKLIST_REFRESH_USER = "checklist-cache-refresh"
+
+
+# ============================================================================
+# CACHE KEY: NORMALIZED PROGRAM + LOCATION
+# ============================================================================
+
+# canonical program -> patterns; more specific programs come first
+PROGRAM_PATTERNS = {
+    "Post-Graduation Work Permit": r"\bpgwp\b|post[- ]?grad(uation)? work permit",
+    "Spousal Open Work Permit": r"\bsowp\b|spous(e|al) open work permit",
+    "Work Permit": r"\bwork permit\b",
+    "Study Permit": r"\bstud(y|ent) (permit|visa)\b",
+    "Express Entry - Federal Skilled Worker": r"\bfsw\b|federal skilled worker",
+    "Express Entry - Canadian Experience Class": r"\bcec\b|canadian experience class",
+    "Express Entry - Federal Skilled Trades": r"\bfst\b|federal skilled trades?",
+    "Express Entry": r"\bexpress entry\b",
+    "Spousal Sponsorship": r"\b(spous(e|al)|partner|common[- ]law) sponsorship\b|\bsponsor(ing)? (my )?(wife|husband|spouse|partner)\b",
+    "Parents and Grandparents Sponsorship": r"\bpgp\b|parents? (and|&) grandparents?",
+    "Super Visa": r"\bsuper visa\b",
+    "Visitor Visa": r"\b(visitor|tourist) visa\b|\btrv\b|temporary resident visa",
+    "Provincial Nominee Program": r"\bpnp\b|provincial nominee",
+    "Atlantic Immigration Program": r"\baip\b|atlantic immigration",
+    "Citizenship": r"\bcitizenship (application|grant)\b|apply(ing)? for citizenship",
+    "PR Card Renewal": r"\bpr card\b",
+    "eTA": r"\beta\b|electronic travel authori[sz]ation",
+}
+_PROGRAM_RES = {program: re.compile(pattern, re.I) for program, pattern in PROGRAM_PATTERNS.items()}
+
+# generic program -> specific programs that supersede it when both match
+GENERIC_PROGRAMS = {
+    "Express Entry": {"Express Entry - Federal Skilled Worker", "Express Entry - Canadian Experience Class",
+                      "Express Entry - Federal Skilled Trades"},
+    "Work Permit": {"Post-Graduation Work Permit", "Spousal Open Work Permit"},
+}
+
+LOCATION_PATTERNS = {
+    # Canadian context
+    "Inside Canada": r"\b(inside|within|from within) canada\b",
+    "Outside Canada": r"\boutside( of)? canada\b",
+    "Ontario": r"\bontario\b",
+    "British Columbia": r"\bbritish columbia\b|\bbc\b",
+    "Alberta": r"\balberta\b",
+    "Quebec": r"\bqu[eé]bec\b",
+    "Manitoba": r"\bmanitoba\b",
+    "Saskatchewan": r"\bsaskatchewan\b",
+    "Nova Scotia": r"\bnova scotia\b",
+    "New Brunswick": r"\bnew brunswick\b",
+    "Prince Edward Island": r"\bprince edward island\b|\bpei\b",
+    "Newfoundland and Labrador": r"\bnewfoundland\b",
+    "Yukon": r"\byukon\b",
+    "Northwest Territories": r"\bnorthwest territories\b",
+    "Nunavut": r"\bnunavut\b",
+    # Common countries of residence
+    "India": r"\bindia\b",
+    "Nigeria": r"\bnigeria\b",
+    "Philippines": r"\bphilippines\b",
+    "China": r"\bchina\b",
+    "Pakistan": r"\bpakistan\b",
+    "Bangladesh": r"\bbangladesh\b",
+    "Nepal": r"\bnepal\b",
+    "Sri Lanka": r"\bsri lanka\b",
+    "Iran": r"\biran\b",
+    "Vietnam": r"\bviet ?nam\b",
+    "Brazil": r"\bbrazil\b",
+    "Mexico": r"\bmexico\b",
+    "Colombia": r"\bcolombia\b",
+    "United States": r"\b(usa|united states|america)\b",
+    "United Kingdom": r"\b(uk|united kingdom|england|britain)\b",
+    "France": r"\bfrance\b",
+    "Germany": r"\bgermany\b",
+    "Ukraine": r"\bukraine\b",
+    "Kenya": r"\bkenya\b",
+    "Ghana": r"\bghana\b",
+    "Cameroon": r"\bcameroon\b",
+    "Morocco": r"\bmorocco\b",
+    "Egypt": r"\begypt\b",
+    "United Arab Emirates": r"\b(uae|united arab emirates|dubai)\b",
+    "Saudi Arabia": r"\bsaudi( arabia)?\b",
+    "South Korea": r"\b(south )?korea\b",
+    "Japan": r"\bjapan\b",
+}
+_LOCATION_RES = {location: re.compile(pattern, re.I) for location, pattern in LOCATION_PATTERNS.items()}
+
+# "from X" / "living in X" etc. naming a place we don't recognize makes the
+# request uncacheable rather than silently serving a generic checklist.
+_PLACE_PHRASE = re.compile(r"\b(?:from|living in|resident of|citizen of|national of|based in)\s+([a-z][a-z.'-]*)", re.I)
+_NOT_A_PLACE = {"my", "the", "a", "an", "your", "our", "their", "his", "her", "home", "abroad", "here", "there",
+                "within", "inside", "outside"}
+
+# Personal circumstances change the checklist; those requests always run the agent.
+# Checked on the text left after removing program names, so "spousal open
+# work permit" or "sponsor my wife" still name a program.
+_PERSONAL = re.compile(
+    r"\b(child(ren)?|kids?|dependents?|sons?|daughters?|spous(e|es|al)|wife|wives|husbands?|partners?|"
+    r"common[- ]law|fianc[eé]e?|parents?|mother|father|mom|dad|grand(mother|father|parents?)|"
+    r"siblings?|brother|sister|relatives?|pregnan(t|cy)|military|army|armed forces|"
+    r"refus(ed|al)|rejected|criminal|conviction|medical condition|"
+    r"previous(ly)? (applied|denied)|overstay(ed)?|gap in)\b",
+    re.I,
+)
+
+# Anything else left in a request (once program and place names are removed)
+# may be a circumstance that changes the checklist, so only requests made
+# of these words share a cached checklist.
+_FILLER_WORDS = frozenset("""
+    a an the i me my we our you your to for of in on from at with and or as by about is are am be
+    what which do does did can could would should will please give show tell send get provide make need needs
+    needed require required requirements requirement documents document docs doc checklist check list lists
+    full complete comprehensive detailed exact official all every necessary mandatory supporting papers
+    paperwork apply applying application applications submit submitting process canada canadian i'm im
+    outside inside within living resident based citizen national currently
+    program programme stream class category sponsorship sponsor sponsoring renewal renew renewing
+""".split())
+_WORD_RE = re.compile(r"[a-z][a-z']*")
+
+
+class ChecklistKey(NamedTuple):
+    program: str
+    location: str  # "" when no location context was given
+
+    @property
+    def id(self) -> str:
+        return f"{self.program}|{self.location}".lower()
+
+    def query(self) -> str:
+        """Canonical request used to (re)build the cached checklist."""
+        where = f" ({self.location})" if self.location else ""
+        return f"Complete document checklist for {self.program}{where}."
+
+
+def checklist_key(user_text: str) -> Optional[ChecklistKey]:
+    """
+    Program-level cache key for a document request, or None when the
+    request is ambiguous or personal enough that it must run the agent:
+    besides the program and place names, only generic request words may
+    appear.
+    """
+    program_spans = [m.span() for pattern in _PROGRAM_RES.values() for m in pattern.finditer(user_text)]
+    programs = {program for program, pattern in _PROGRAM_RES.items() if pattern.search(user_text)}
+    for generic, specific in GENERIC_PROGRAMS.items():
+        if generic in programs and programs & specific:
+            programs.discard(generic)
+    if len(programs) != 1:
+        return None
+
+    locations, spans = [], []
+    for location, pattern in _LOCATION_RES.items():
+        found = [m.span() for m in pattern.finditer(user_text)]
+        if found:
+            locations.append(location)
+            spans.extend(found)
+
+    for match in _PLACE_PHRASE.finditer(user_text):
+        word = match.group(1).lower()
+        if word in _NOT_A_PLACE or word == "canada":
+            continue
+        start, end = match.span(1)
+        if not any(s < end and start < e for s, e in spans):
+            return None
+
+    rest = user_text.lower()
+    for start, end in sorted(program_spans + spans, reverse=True):
+        rest = rest[:start] + " " + rest[end:]
+    if _PERSONAL.search(rest):
+        return None
+    if any(word not in _FILLER_WORDS for word in _WORD_RE.findall(rest)):
+        return None
+
+    return ChecklistKey(programs.pop(), " / ".join(locations))
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class ChecklistCache:
+    """
+    SQLite store of validated DocumentChecklist objects with
+    stale-while-revalidate refresh. Safe to share across threads.
+    """
+
+    def __init__(self, path: Path = CHECKLIST_CACHE_PATH, ttl: int = CHECKLIST_CACHE_TTL,
+                 max_age: int = CHECKLIST_CACHE_MAX_AGE):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._refreshing: Dict[str, Future] = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0, "refreshes": 0, "refresh_failures": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checklists ("
+                " key TEXT PRIMARY KEY, program TEXT NOT NULL, location TEXT NOT NULL,"
+                " checklist TEXT NOT NULL, created_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, key: ChecklistKey) -> Tuple[Optional["DocumentChecklist"], bool]:
+        """(checklist, is_stale); checklist is None on a miss."""
+        from app.agents.document_agent import DocumentChecklist
+
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT checklist, created_at FROM checklists WHERE key = ?", (key.id,)).fetchone()
+            age = time.time() - row[1] if row else None
+            if row is None or age > self.max_age:
+                self._stats["misses"] += 1
+                return None, False
+            conn.execute("UPDATE checklists SET hits = hits + 1 WHERE key = ?", (key.id,))
+            conn.commit()
+
+        try:
+            checklist = DocumentChecklist.model_validate_json(row[0])
+        except Exception as e:
+            # Schema changed since the entry was written
+            logger.warning(f"Discarding cached checklist for {key.id}: {e}")
+            self._stats["misses"] += 1
+            return None, False
+
+        stale = age > self.ttl
+        self._stats["stale_hits" if stale else "hits"] += 1
+        return checklist, stale
+
+    def store(self, key: ChecklistKey, checklist: "DocumentChecklist") -> None:
+        """Save a checklist; incomplete ones (no documents or forms) are skipped."""
+        if not checklist.required_documents or not checklist.forms:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO checklists (key, program, location, checklist, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key.id, key.program, key.location, checklist.model_dump_json(), time.time()),
+            )
+            conn.commit()
+            self._stats["stores"] += 1
+
+    def _claim(self, key: ChecklistKey) -> Tuple[Future, bool]:
+        """The build future for `key` and whether the caller started it (False: one is in flight)."""
+        with self._lock:
+            running = self._refreshing.get(key.id)
+            if running is not None:
+                return running, False
+            future = self._refreshing[key.id] = Future()
+            return future, True
+
+    def _build(self, key: ChecklistKey, build: Callable[[], Any], future: Future) -> None:
+        try:
+            checklist = build()
+            self.store(key, checklist)
+            self._stats["refreshes"] += 1
+            logger.info(f"Built cached checklist for {key.id}")
+            future.set_result(checklist)
+        except Exception as e:
+            self._stats["refresh_failures"] += 1
+            logger.warning(f"Checklist build failed for {key.id}: {e}")
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._refreshing.pop(key.id, None)
+
+    def fill(self, key: ChecklistKey, build: Callable[[], Any]) -> "DocumentChecklist":
+        """
+        Build `key` with `build()` in the calling thread, store it and return
+        it. If a build of `key` is already in flight, wait for that one
+        instead, so concurrent misses run the agent once.
+        """
+        future, started = self._claim(key)
+        if started:
+            self._build(key, build, future)
+        return future.result()
+
+    def refresh_in_background(self, key: ChecklistKey, build: Callable[[], Any]) -> bool:
+        """
+        Rebuild `key` on a daemon thread with `build()`, which must return a
+        DocumentChecklist. At most one build per key runs at a time.
+        """
+        future, started = self._claim(key)
+        if started:
+            threading.Thread(
+                target=self._build, args=(key, build, future), name=f"checklist-refresh:{key.id}", daemon=True
+            ).start()
+        return started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM checklists").fetchone()[0]
+            lookups = self._stats["hits"] + self._stats["stale_hits"] + self._stats["misses"]
+            served = self._stats["hits"] + self._stats["stale_hits"]
+            return {
+                "entries": entries,
+                **self._stats,
+                "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+                "refreshing": len(self._refreshing),
+            }
+
+
+CHECKLIST_CACHE = ChecklistCache()
+
+
+def checklist_cache_stats() -> Dict[str, Any]:
+    """Counters for the shared checklist cache."""
+    return CHECKLIST_CACHE.stats()
@@ -7,20 +7,12 @@ from dotenv import load_dotenv
 from pydantic import BaseModel
 from typing import Optional
 from rich.pretty import pprint 
-import os
-from agno.db.postgres import PostgresDb
+from app.agents.shared_db import get_db
+from app.agents.tool_cache import cached_google_search
+from app.agents.knowledge_base import search_immigration_knowledge_base
 
 load_dotenv()
 
-db = PostgresDb(
-    db_url=os.getenv("DATABASE_URL"),
-    memory_table=os.getenv("AGNO_MEMORY_TABLE", "agno_memories"),
-)
-
-memory_tools = MemoryTools(
-    db=db,
-)
-
 # === PYDANTIC SCHEMA ===
 class ChitchatCard(BaseModel):
     reply: Optional[str] = None  
@@ -39,7 +31,8 @@ Before you respond, **always review the user's stored memory**. Check for their
 → **Otherwise**: Answer directly using **live research**.
 
 ## 🔎 RESEARCH-FIRST POLICY
-- For factual questions (processing times, fees, draws), **immediately use `GoogleSearchTools()`**.
+- For program rules, definitions and procedures, **first use `search_immigration_knowledge_base`** and cite the returned URLs.
+- For time-sensitive facts (processing times, fees, draws) or when the knowledge base has nothing relevant, **immediately use `GoogleSearchTools()`**.
 - Cite sources: “According to IRCC (Nov 2025)…” or “Per Quebec Immigration…”
 - If uncertain: “I couldn’t confirm this — please see the official guide: [link].”
 
@@ -59,19 +52,27 @@ Before you respond, **always review the user's stored memory**. Check for their
 
 # === AGENT ===
 # --- Create the Agent ---
-chitchat_agent = Agent(
-    model=Groq(id="openai/gpt-oss-120b"),
-    parser_model=Gemini(id="gemini-2.0-flash"),
-    db=db,
-    enable_agentic_memory = True,
-    add_history_to_context=True,
-    read_chat_history=True,
-    num_history_runs=3,
-    search_session_history=True,
-    add_memories_to_context=True,
-    tools=[GoogleSearchTools(),memory_tools],
-    role="You are Chitchat_agent, a friendly Canadian immigration chitchat/router assistant.",
-    name="Chitchat_agent",
-    output_schema=ChitchatCard,  
-    instructions=chitchat_instructions,
-)
\ No newline at end of file
+def build_chitchat_agent() -> Agent:
+    """Construct the chitchat/router agent with its DB, models and tools."""
+    db = get_db()
+
+    memory_tools = MemoryTools(
+        db=db,
+    )
+
+    return Agent(
+        model=Groq(id="openai/gpt-oss-120b"),
+        parser_model=Gemini(id="gemini-2.0-flash"),
+        db=db,
+        enable_agentic_memory = True,
+        add_history_to_context=True,
+        read_chat_history=True,
+        num_history_runs=3,
+        search_session_history=True,
+        add_memories_to_context=True,
+        tools=[search_immigration_knowledge_base, cached_google_search(GoogleSearchTools()),memory_tools],
+        role="You are Chitchat_agent, a friendly Canadian immigration chitchat/router assistant.",
+        name="Chitchat_agent",
+        output_schema=ChitchatCard,  
+        instructions=chitchat_instructions,
+    )
@@ -9,20 +9,15 @@ from agno.tools.crawl4ai import Crawl4aiTools
 from dotenv import load_dotenv
 from rich.pretty import pprint 
 from pathlib import Path
-from agno.tools.csv_toolkit import CsvTools
 from agno.models.openrouter import OpenRouter
-import os
-from agno.db.postgres import PostgresDb
+from app.agents.shared_db import get_db
+from app.agents.tool_cache import cached_crawl, cached_google_search
+from app.agents.forms_index import lookup_ircc_forms
+from app.agents.knowledge_base import search_immigration_knowledge_base
 
 load_dotenv()
 
 
-db = PostgresDb(
-    db_url=os.getenv("DATABASE_URL"),
-    memory_table=os.getenv("AGNO_MEMORY_TABLE", "agno_memories"),
-)
-
-
 # === PYDANTIC SCHEMA ===
 class DocumentItem(BaseModel):
     name: str = Field(description="Exact document name (e.g., 'Notarized Bank Statements')")
@@ -49,8 +44,6 @@ class DocumentChecklist(BaseModel):
     official_guide_url: str
 
 
-db_path = Path(__file__).parent.parent.parent / "data" / "forms" / "ircc_forms_details.csv"
-
 # === AGENT ===
 
 document_agent_instructions = """"
@@ -65,12 +58,13 @@ INFORMATION GATHERING
 - Ask only if a single missing fact changes the program’s checklist (e.g., study vs work vs PR, in-Canada vs outside). Asl all question at a time (max 3), include a default, and proceed if no reply.
 
 RESEARCH PROTOCOL
-- First search: Use `GoogleSearchTools` to find the official IRCC and provincial government pages for the specified program. (e.g., “study permit checklist site:canada.ca”).
+- Start with `search_immigration_knowledge_base` (local index of IRCC pages, no network) for the program's requirements.
+- Then search: Use `GoogleSearchTools` to find the official IRCC and provincial government pages for the specified program. (e.g., “study permit checklist site:canada.ca”).
 - Then : Use `Crawl4aiTools` to extract detailed requirements.
 - Then add: processing updates (≤6 months), country-specific requirements (e.g., biometrics, PCC routing), VFS quirks.
-- Use `CsvTools` to query your internal `ircc_forms_details.csv` to fetch form numbers, titles, pdf_url, and instructions_url (do not invent). 
-    The columns of the CSV "ircc_forms_details.csv" : form_code,title,last_updated,form_page_url,pdf_url,how_to_fill_instructions
-    You have to find all the detals about forms from this CSV file anyhow. DO not search exact form number in the csv, instead search by keyword match : form number, title or any other relevant keywords to find the correct form details.
+- Use `lookup_ircc_forms` to fetch form numbers, titles, pdf_url, and instructions_url from the internal IRCC forms database (do not invent).
+    Pass form codes in any spelling ("IMM5257", "IMM 0008 Schedule 4"), several codes in one call, or keywords ("study permit outside Canada"). Its records map directly onto the FormItem fields.
+    Set include_instructions=True when you need the official how-to-fill guidance for tips and common mistakes.
 
 OUTPUT REQUIREMENTS (strict schema)
 For each document (required/conditional/optional):
@@ -92,33 +86,40 @@ STRICT RULES
 - Output powers an editable checklist; ensure clarity and actionability.
 
 """
-document_agent = Agent(
-    # model=Groq(id="openai/gpt-oss-120b"),
-    model=Gemini(id="gemini-2.5-flash"),        
-    parser_model=Gemini(id="gemini-2.0-flash"),       
-    db=db,
-    enable_agentic_memory = True,
-    add_history_to_context=True,
-    read_chat_history=True,
-    num_history_runs=3,
-    search_session_history=True,
-    add_memories_to_context=True,
-    name="DocumentAgent",
-    description="You generate exhaustive, real-world Canadian immigration document checklists.",
-    instructions=document_agent_instructions,
-    tools=[
-        GoogleSearchTools(),    
-        Crawl4aiTools(),
-        CsvTools(
-            csvs=[db_path],
-            enable_read_csv_file=True,
-            enable_list_csv_files=True,
-            enable_get_columns=True,
-            enable_query_csv_file=True
-        )
-    ],
-    output_schema=DocumentChecklist,
-)
+def build_document_agent(memory: bool = True) -> Agent:
+    """
+    Construct the document checklist agent with its DB, models and tools.
+    With memory=False it neither reads nor writes user memories or chat
+    history, for checklists shared between users.
+    """
+    db = get_db()
+
+    return Agent(
+        # model=Groq(id="openai/gpt-oss-120b"),
+        model=Gemini(id="gemini-2.5-flash"),        
+        parser_model=Gemini(id="gemini-2.0-flash"),       
+        db=db,
+        enable_agentic_memory = memory,
+        add_history_to_context=memory,
+        read_chat_history=memory,
+        num_history_runs=3,
+        search_session_history=memory,
+        add_memories_to_context=memory,
+        name="DocumentAgent",
+        description="You generate exhaustive, real-world Canadian immigration document checklists.",
+        instructions=document_agent_instructions,
+        tools=[
+            search_immigration_knowledge_base,
+            cached_google_search(GoogleSearchTools()),
+            cached_crawl(Crawl4aiTools()),
+            lookup_ircc_forms,
+        ],
+        output_schema=DocumentChecklist,
+    )
+
+def build_checklist_cache_agent() -> Agent:
+    """Document agent for program-level checklists in the shared cache; no user memory."""
+    return build_document_agent(memory=False)
 
 # === RUN ===
 # programs = [
@@ -132,6 +133,6 @@ document_agent = Agent(
 # query = random.choice(programs)
 # print(f"🔍 Researching documents for: {query}\n")
 
-# run: RunOutput = document_agent.run(query)
+# run: RunOutput = build_document_agent().run(query)
 
 # pprint(run.content)
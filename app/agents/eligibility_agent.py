@@ -12,15 +12,11 @@ from rich.pretty import pprint
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
-from agno.db.postgres import PostgresDb
+from app.agents.shared_db import get_db
+from app.agents.tool_cache import cached_google_search
 
 load_dotenv()
 
-db = PostgresDb(
-    db_url=os.getenv("DATABASE_URL"),
-    memory_table=os.getenv("AGNO_MEMORY_TABLE", "agno_memories"),
-)
-
 # === PYDANTIC SCHEMA ===
 
 class EligibleProgram(BaseModel):
@@ -47,7 +43,7 @@ class UserProfile(BaseModel):
     age: int
     has_canadian_experience: bool
     has_job_offer: bool
-    settlement_funds_cad: float
+    settlement_funds_cad: Optional[float] = None  # None: funds not provided, not checked
     family_size: int
 
 class EligibilityResponse(BaseModel):
@@ -77,6 +73,7 @@ with open((Path(__file__).parent / 'eligibility_rules' / 'canadian_immigration_p
 
 sys.path.insert(0, str(AGENTS_DIR))
 from eligibility_rules.eligibility_checker import evaluate_eligibility
+from eligibility_rules.crs_calculator import calculate_crs
 
 # SMART HELPER TOOLS
 
@@ -174,7 +171,7 @@ def check_immigration_eligibility(
     age: int = 30,
     has_canadian_experience: bool = False,
     has_job_offer: bool = False,
-    settlement_funds_cad: float = 0,
+    settlement_funds_cad: Optional[float] = None,
     family_size: int = 1
 ) -> str:
     """
@@ -214,6 +211,83 @@ def check_immigration_eligibility(
     return output
 
 
+def calculate_crs_score(
+    age: int,
+    education_level: str,
+    clb_score: int,
+    work_experience_years: float = 0,
+    canadian_work_experience_years: float = 0,
+    second_language_clb: int = 0,
+    has_spouse: bool = False,
+    spouse_education_level: str = "",
+    spouse_clb: int = 0,
+    spouse_canadian_work_experience_years: float = 0,
+    has_certificate_of_qualification: bool = False,
+    has_provincial_nomination: bool = False,
+    has_job_offer: bool = False,
+    job_offer_noc_00: bool = False,
+    canadian_education_years: int = 0,
+    french_nclc: int = 0,
+    has_sibling_in_canada: bool = False
+) -> str:
+    """
+    Calculate the Express Entry Comprehensive Ranking System (CRS) score.
+    
+    Args:
+        age: Age in years
+        education_level: Highest education level (e.g. "bachelor", "masters", "phd")
+        clb_score: First official language CLB (lowest across the four abilities)
+        work_experience_years: Total skilled work experience in years
+        canadian_work_experience_years: Skilled work experience in Canada, in years
+        second_language_clb: Second official language CLB (0 if none)
+        has_spouse: Spouse/partner is accompanying and is not a Canadian citizen or PR
+        spouse_education_level: Spouse's highest education level
+        spouse_clb: Spouse's CLB in English or French
+        spouse_canadian_work_experience_years: Spouse's Canadian work experience in years
+        has_certificate_of_qualification: Holds a Canadian trade certificate of qualification
+        has_provincial_nomination: Holds a provincial/territorial nomination
+        has_job_offer: Holds a valid arranged employment offer
+        job_offer_noc_00: Job offer is in NOC major group 00 (senior management)
+        canadian_education_years: Length of Canadian post-secondary credential in years
+        french_nclc: French NCLC level (lowest across the four abilities, 0 if none)
+        has_sibling_in_canada: Has a brother or sister in Canada who is a citizen or PR
+    
+    Returns:
+        CRS score breakdown with the total
+    """
+    
+    breakdown = calculate_crs({
+        "age": age,
+        "education_level": education_level,
+        "clb_score": clb_score,
+        "work_experience_years": work_experience_years,
+        "canadian_work_experience_years": canadian_work_experience_years,
+        "second_language_clb": second_language_clb,
+        "has_spouse": has_spouse,
+        "spouse_education_level": spouse_education_level,
+        "spouse_clb": spouse_clb,
+        "spouse_canadian_work_experience_years": spouse_canadian_work_experience_years,
+        "has_certificate_of_qualification": has_certificate_of_qualification,
+        "has_provincial_nomination": has_provincial_nomination,
+        "has_job_offer": has_job_offer,
+        "job_offer_noc_00": job_offer_noc_00,
+        "canadian_education_years": canadian_education_years,
+        "french_nclc": french_nclc,
+        "has_sibling_in_canada": has_sibling_in_canada
+    })
+    
+    output = f"**📊 CRS Score: {breakdown['total']}**\n\n"
+    output += f"- Core human capital: {breakdown['core_human_capital']}\n"
+    output += f"  - Age: {breakdown['age']}, Education: {breakdown['education']}, "
+    output += f"First language: {breakdown['first_language']}, Second language: {breakdown['second_language']}, "
+    output += f"Canadian work: {breakdown['canadian_work_experience']}\n"
+    output += f"- Spouse factors: {breakdown['spouse_factors']}\n"
+    output += f"- Skill transferability: {breakdown['skill_transferability']}\n"
+    output += f"- Additional points: {breakdown['additional_points']}\n"
+    
+    return output
+
+
 # === AGENT ===
 
 eligible_instructions = """
@@ -236,12 +310,14 @@ Never ask for non-essential details (e.g., name). Never assume job offer, Canadi
 - Use `convert_ielts_to_clb()` if IELTS bands are provided.
 - Run `check_immigration_eligibility()` once core fields are confirmed:
   → work years, education, CLB, TEER, age, job offer, Canadian exp, funds, family size.
+- Run `calculate_crs_score()` with the same confirmed facts and use its total as `crs_estimate`.
+  Never estimate or adjust the CRS score yourself.
 
 ## 🔁 MANDATORY FIELD VALIDATION
 Before calling `check_immigration_eligibility()`, you MUST ensure:
 - `clb_score` is an integer (use `convert_ielts_to_clb` if IELTS provided).
 - `noc_teer_level` is a string (e.g., "1", "2", "3") — **ask for occupation if missing**.
-- `settlement_funds_cad` is a number — **ask for available funds if not in memory**.
+- `settlement_funds_cad` is a number — **ask for available funds if not in memory**. If the user can't or won't say, leave the argument out; the funds check is then skipped and reported as not checked.
 
 If any of these are missing:
 → Ask **one question** that covers the most critical gap.
@@ -249,13 +325,13 @@ Example:
 - “What is your occupation or NOC code? (e.g., Software Developer → NOC 21231, TEER 1)”
 - “What settlement funds do you have available? (Minimum for single applicant: ~$14,690 CAD.)”
 
-Never pass `null` to the eligibility tool.
+Never pass `null` to the eligibility tool; omit `settlement_funds_cad` instead when funds are unknown, and leave it `null` in `user_profile`.
 
 ## 📊 OUTPUT REQUIREMENTS
 - Once you receive the full dictionary of results from the `check_immigration_eligibility()` tool, your final and only task is to **transform that data into the `EligibilityResponse` schema.**
 - List eligible programs with official links and clear reasons.
 - You are not just outputting the raw data. You are re-formatting it to match the required output structure.
-- Present the results clearly: list the eligible programs with official links, provide a CRS estimate, and offer specific, actionable improvement suggestions.
+- Present the results clearly: list the eligible programs with official links, report the CRS score from `calculate_crs_score()`, and offer specific, actionable improvement suggestions.
 - **State all assumptions made**: "This calculation assumes you are a single applicant with no prior Canadian work experience."
 - Your final output MUST be the complete `EligibilityResponse`, containing all fields.
 
@@ -265,27 +341,32 @@ Never pass `null` to the eligibility tool.
 - Your final output should be a clear, human-readable analysis, not a raw data dump.
 """
 
-eligibility_agent = Agent(
-    model=Groq(id="openai/gpt-oss-120b"),
-    # model=Gemini(id="gemini-2.0-flash"),
-    parser_model=Gemini(id="gemini-2.0-flash"),
-    db=db,
-    enable_agentic_memory = True,
-    add_history_to_context=True,
-    read_chat_history=True,
-    num_history_runs=3,
-    search_session_history=True,
-    add_memories_to_context=True,
-    tools=[
-        GoogleSearchTools(),  
-        convert_ielts_to_clb,
-        check_immigration_eligibility
-    ],
-    output_schema=EligibilityResponse,
-    role="You are Eligibility_Agent, a smart Canadian immigration eligibility assessor.",
-    instructions= eligible_instructions,
-    markdown=False,
-)
+def build_eligibility_agent() -> Agent:
+    """Construct the eligibility agent with its DB, models and tools."""
+    db = get_db()
+
+    return Agent(
+        model=Groq(id="openai/gpt-oss-120b"),
+        # model=Gemini(id="gemini-2.0-flash"),
+        parser_model=Gemini(id="gemini-2.0-flash"),
+        db=db,
+        enable_agentic_memory = True,
+        add_history_to_context=True,
+        read_chat_history=True,
+        num_history_runs=3,
+        search_session_history=True,
+        add_memories_to_context=True,
+        tools=[
+            cached_google_search(GoogleSearchTools()),
+            convert_ielts_to_clb,
+            check_immigration_eligibility,
+            calculate_crs_score
+        ],
+        output_schema=EligibilityResponse,
+        role="You are Eligibility_Agent, a smart Canadian immigration eligibility assessor.",
+        instructions= eligible_instructions,
+        markdown=False,
+    )
 
 
 # if __name__ == "__main__":
@@ -293,7 +374,7 @@ eligibility_agent = Agent(
 #     print("🇨🇦 SMART CANADIAN IMMIGRATION ELIGIBILITY AGENT")
 #     print("="*80 + "\n")
     
-#     result = eligibility_agent.run(
+#     result = build_eligibility_agent().run(
 #         "Hi! I have 3 years as a truck driver, hold a college, CLB 8, age 30."
 #     )
 #     pprint(result.content)
\ No newline at end of file
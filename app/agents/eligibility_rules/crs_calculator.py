@@ -0,0 +1,439 @@
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any
+
+import numpy as np
+
+# ============================================================================
+# LOAD CRS RULES (Once at startup)
+# ============================================================================
+with open((Path(__file__).parent / 'canadian_immigration_programs.json'), 'r', encoding='utf-8') as f:
+    _PROGRAMS = json.load(f)['programs']
+
+CRS_RULES = next(
+    (p['comprehensive_ranking_system'] for p in _PROGRAMS if 'comprehensive_ranking_system' in p),
+    {}
+)
+
+# ============================================================================
+# CRS GRIDS
+# ============================================================================
+# The JSON breakdown only lists anchor values (e.g. age 20-29, 30, 40, 45+),
+# so the full IRCC grids live here and any value present in the JSON
+# overrides the matching grid entry in build_crs_tables().
+
+MAX_AGE = 120
+MAX_CLB = 12
+MAX_CANADIAN_WORK_YEARS = 5
+
+CRS_EDUCATION_CATEGORIES = (
+    "less_than_secondary",
+    "secondary",
+    "one_year_post_secondary",
+    "two_year_post_secondary",
+    "bachelors",
+    "two_or_more_credentials",
+    "masters",
+    "phd"
+)
+
+# (without spouse, with spouse)
+AGE_GRID = {
+    17: (0, 0), 18: (99, 90), 19: (105, 95),
+    **{age: (110, 100) for age in range(20, 30)},
+    30: (105, 95), 31: (99, 90), 32: (94, 85), 33: (88, 80), 34: (83, 75),
+    35: (77, 70), 36: (72, 65), 37: (66, 60), 38: (61, 55), 39: (55, 50),
+    40: (50, 45), 41: (39, 35), 42: (28, 25), 43: (17, 15), 44: (6, 5),
+}
+
+EDUCATION_GRID = {
+    "less_than_secondary": (0, 0),
+    "secondary": (30, 28),
+    "one_year_post_secondary": (90, 84),
+    "two_year_post_secondary": (98, 91),
+    "bachelors": (120, 112),
+    "two_or_more_credentials": (128, 119),
+    "masters": (135, 126),
+    "phd": (150, 140),
+}
+
+# Points per ability, keyed by minimum CLB
+FIRST_LANGUAGE_GRID = {4: (6, 6), 6: (9, 8), 7: (17, 16), 8: (23, 22), 9: (31, 29), 10: (34, 32)}
+SECOND_LANGUAGE_GRID = {5: 1, 7: 3, 9: 6}
+CANADIAN_WORK_GRID = {1: (40, 35), 2: (53, 46), 3: (64, 56), 4: (72, 63), 5: (80, 70)}
+
+SPOUSE_EDUCATION_GRID = {
+    "less_than_secondary": 0,
+    "secondary": 2,
+    "one_year_post_secondary": 6,
+    "two_year_post_secondary": 7,
+    "bachelors": 8,
+    "two_or_more_credentials": 9,
+    "masters": 10,
+    "phd": 10,
+}
+SPOUSE_LANGUAGE_GRID = {5: 1, 7: 3, 9: 5}
+SPOUSE_WORK_GRID = {1: 5, 2: 7, 3: 8, 4: 9, 5: 10}
+
+SECOND_LANGUAGE_MAX_WITH_SPOUSE = 22
+
+# ============================================================================
+# TABLE BUILDING
+# ============================================================================
+
+def _threshold_vector(grid: Dict[int, Any], size: int, column: int = None) -> np.ndarray:
+    """Expand a {minimum: points} grid into a lookup vector indexed by value."""
+    vector = np.zeros(size, dtype=np.int64)
+    for minimum in sorted(grid):
+        points = grid[minimum] if column is None else grid[minimum][column]
+        vector[minimum:] = points
+    return vector
+
+
+def _overlay_age(vector: np.ndarray, breakdown: Dict) -> None:
+    """Apply JSON age keys such as "20-29", "30" and "45+"."""
+    for key, points in breakdown.items():
+        if key == "max":
+            continue
+        if m := re.fullmatch(r'(\d+)-(\d+)', key):
+            vector[int(m.group(1)):int(m.group(2)) + 1] = points
+        elif m := re.fullmatch(r'(\d+)\+', key):
+            vector[int(m.group(1)):] = points
+        elif key.isdigit():
+            vector[int(key)] = points
+
+
+def _overlay_thresholds(vector: np.ndarray, breakdown: Dict, pattern: str) -> None:
+    """
+    Apply JSON keys such as "CLB_10+_per_ability" or "5+_years". A trailing
+    "+" sets every value from the threshold up; otherwise only that value.
+    """
+    for key, points in breakdown.items():
+        m = re.fullmatch(pattern, key)
+        if not m:
+            continue
+        value = int(m.group(1))
+        if m.group(2):
+            vector[value:] = points
+        else:
+            vector[value] = points
+
+
+def build_crs_tables(crs_rules: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build NumPy lookup tables from the default grids, overridden by any
+    values in a comprehensive_ranking_system breakdown.
+
+    Two-row tables are indexed [with_spouse, value], i.e. row 0 is the
+    single-applicant grid and row 1 the with-spouse grid.
+    """
+    breakdown = crs_rules.get('breakdown', {})
+    edu_names = {"phd": "phd", "masters": "masters", "bachelors": "bachelors"}
+
+    age = np.zeros((2, MAX_AGE + 1), dtype=np.int64)
+    for col in (0, 1):
+        for a, points in AGE_GRID.items():
+            age[col, a] = points[col]
+    _overlay_age(age[0], breakdown.get('age_without_spouse', {}))
+    _overlay_age(age[1], breakdown.get('age_with_spouse', {}))
+
+    education = np.array([
+        [EDUCATION_GRID[c][col] for c in CRS_EDUCATION_CATEGORIES] for col in (0, 1)
+    ], dtype=np.int64)
+    for col, key in ((0, 'education_without_spouse'), (1, 'education_with_spouse')):
+        for name, points in breakdown.get(key, {}).items():
+            if name.lower() in edu_names:
+                education[col, CRS_EDUCATION_CATEGORIES.index(edu_names[name.lower()])] = points
+
+    clb_pattern = r'CLB_(\d+)(\+?)_per_ability'
+    first_language = np.stack([_threshold_vector(FIRST_LANGUAGE_GRID, MAX_CLB + 1, col) for col in (0, 1)])
+    _overlay_thresholds(first_language[0], breakdown.get('language_first_without_spouse', {}), clb_pattern)
+    _overlay_thresholds(first_language[1], breakdown.get('language_first_with_spouse', {}), clb_pattern)
+
+    second_language = _threshold_vector(SECOND_LANGUAGE_GRID, MAX_CLB + 1)
+    _overlay_thresholds(second_language, breakdown.get('language_second', {}), clb_pattern)
+
+    years_pattern = r'(\d+)(\+?)_years?'
+    canadian_work = np.stack([
+        _threshold_vector(CANADIAN_WORK_GRID, MAX_CANADIAN_WORK_YEARS + 1, col) for col in (0, 1)
+    ])
+    _overlay_thresholds(canadian_work[0], breakdown.get('canadian_work_experience_without_spouse', {}), years_pattern)
+    _overlay_thresholds(canadian_work[1], breakdown.get('canadian_work_experience_with_spouse', {}), years_pattern)
+
+    spouse = breakdown.get('spouse_factors', {})
+    canadian_education = breakdown.get('canadian_education', {})
+    french = breakdown.get('french_proficiency', {})
+
+    return {
+        'age': age,
+        'education': education,
+        'first_language': first_language,
+        'second_language': second_language,
+        'second_language_max': (breakdown.get('language_second', {}).get('max', 24), SECOND_LANGUAGE_MAX_WITH_SPOUSE),
+        'canadian_work': canadian_work,
+        'spouse_education': np.minimum(
+            np.array([SPOUSE_EDUCATION_GRID[c] for c in CRS_EDUCATION_CATEGORIES], dtype=np.int64),
+            spouse.get('education', 10)
+        ),
+        'spouse_language': _threshold_vector(SPOUSE_LANGUAGE_GRID, MAX_CLB + 1),
+        'spouse_language_max': spouse.get('language', 20),
+        'spouse_work': np.minimum(
+            _threshold_vector(SPOUSE_WORK_GRID, MAX_CANADIAN_WORK_YEARS + 1),
+            spouse.get('work', 10)
+        ),
+        'spouse_max': spouse.get('max', 40),
+        'skill_transferability_max': breakdown.get('skill_transferability', {}).get('max', 100),
+        'core_max': crs_rules.get('core_human_capital_max', 600),
+        'provincial_nomination': breakdown.get('provincial_nomination', {}).get('points', 600),
+        'job_offer_noc_00': breakdown.get('job_offer_NOC_00', {}).get('points', 200),
+        'job_offer_other': breakdown.get('job_offer_other', {}).get('points', 50),
+        'canadian_education_short': canadian_education.get('1-2_year', 15),
+        'canadian_education_long': canadian_education.get('3+_year', 30),
+        'french_weak_english': french.get('NCLC_7_no_english', 25),
+        'french_strong_english': french.get('NCLC_7_with_CLB_5', 50),
+        'sibling_in_canada': breakdown.get('sibling_in_canada', {}).get('points', 15),
+        'additional_max': crs_rules.get('additional_points_max', 600),
+        'total_max': crs_rules.get('total_possible', 1200),
+    }
+
+
+CRS_TABLES = build_crs_tables(CRS_RULES)
+
+# ============================================================================
+# PROFILE ENCODING
+# ============================================================================
+
+@lru_cache(maxsize=256)
+def crs_education_category(education_level: str) -> int:
+    """Map a free-text education level to an index in CRS_EDUCATION_CATEGORIES."""
+    level = (education_level or "").lower()
+    if "less than" in level or not level:
+        category = "less_than_secondary"
+    elif "phd" in level or "doctor" in level:
+        category = "phd"
+    elif "master" in level or "professional degree" in level:
+        category = "masters"
+    elif "two or more" in level or "multiple" in level:
+        category = "two_or_more_credentials"
+    elif "bachelor" in level or "3-year" in level or "three-year" in level:
+        category = "bachelors"
+    elif any(k in level for k in ("two-year", "2-year", "2 year", "associate", "advanced diploma")):
+        category = "two_year_post_secondary"
+    elif any(k in level for k in ("post-secondary", "diploma", "certificate", "college", "one-year", "1-year", "trade")):
+        category = "one_year_post_secondary"
+    elif "high school" in level or "secondary" in level:
+        category = "secondary"
+    else:
+        category = "less_than_secondary"
+    return CRS_EDUCATION_CATEGORIES.index(category)
+
+
+def _abilities(value) -> List[int]:
+    """Per-ability CLB list (listening, reading, writing, speaking) from a scalar or sequence."""
+    if value is None:
+        return [0, 0, 0, 0]
+    if isinstance(value, dict):
+        value = [value.get(k, 0) for k in ("listening", "reading", "writing", "speaking")]
+    if isinstance(value, (list, tuple)):
+        return [int(v or 0) for v in value][:4] + [0] * (4 - len(value))
+    return [int(value)] * 4
+
+
+def encode_crs_profiles(profiles: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Encode CRS profiles into NumPy columns, one row per profile.
+
+    Profile fields (all optional):
+        age, education_level, clb_score or clb_scores (first official
+        language, scalar or per ability), second_language_clb,
+        canadian_work_experience_years, foreign_work_experience_years
+        (defaults to work_experience_years minus Canadian years),
+        has_spouse (accompanying, not a Canadian citizen or PR),
+        spouse_education_level, spouse_clb,
+        spouse_canadian_work_experience_years,
+        has_certificate_of_qualification, has_provincial_nomination,
+        has_job_offer, job_offer_noc_00, canadian_education_years,
+        french_nclc, has_sibling_in_canada
+    """
+    def years(value) -> int:
+        return int(np.floor(max(float(value or 0), 0.0)))
+
+    canadian_years = [years(p.get('canadian_work_experience_years', 0)) for p in profiles]
+    foreign_years = [
+        years(p['foreign_work_experience_years']) if p.get('foreign_work_experience_years') is not None
+        else years(float(p.get('work_experience_years', 0) or 0) - cy)
+        for p, cy in zip(profiles, canadian_years)
+    ]
+    return {
+        'age': np.array([p.get('age') or 0 for p in profiles], dtype=np.int64),
+        'education': np.array([crs_education_category(p.get('education_level', '')) for p in profiles], dtype=np.int64),
+        'first_clb': np.array([_abilities(p.get('clb_scores', p.get('clb_score'))) for p in profiles], dtype=np.int64).reshape(-1, 4),
+        'second_clb': np.array([_abilities(p.get('second_language_clb')) for p in profiles], dtype=np.int64).reshape(-1, 4),
+        'canadian_years': np.array(canadian_years, dtype=np.int64),
+        'foreign_years': np.array(foreign_years, dtype=np.int64),
+        'has_spouse': np.array([bool(p.get('has_spouse', False)) for p in profiles], dtype=bool),
+        'spouse_education': np.array([crs_education_category(p.get('spouse_education_level', '')) for p in profiles], dtype=np.int64),
+        'spouse_clb': np.array([_abilities(p.get('spouse_clb')) for p in profiles], dtype=np.int64).reshape(-1, 4),
+        'spouse_canadian_years': np.array([years(p.get('spouse_canadian_work_experience_years', 0)) for p in profiles], dtype=np.int64),
+        'has_certificate_of_qualification': np.array([bool(p.get('has_certificate_of_qualification', False)) for p in profiles], dtype=bool),
+        'has_provincial_nomination': np.array([bool(p.get('has_provincial_nomination', False)) for p in profiles], dtype=bool),
+        'has_job_offer': np.array([bool(p.get('has_job_offer', False)) for p in profiles], dtype=bool),
+        'job_offer_noc_00': np.array([bool(p.get('job_offer_noc_00', False)) for p in profiles], dtype=bool),
+        'canadian_education_years': np.array([years(p.get('canadian_education_years', 0)) for p in profiles], dtype=np.int64),
+        'french_nclc': np.array([_abilities(p.get('french_nclc')) for p in profiles], dtype=np.int64).reshape(-1, 4),
+        'has_sibling_in_canada': np.array([bool(p.get('has_sibling_in_canada', False)) for p in profiles], dtype=bool),
+    }
+
+# ============================================================================
+# CRS CALCULATION
+# ============================================================================
+
+def calculate_crs_batch(profiles: List[Dict[str, Any]], tables: Dict[str, Any] = CRS_TABLES) -> Dict[str, np.ndarray]:
+    """
+    Calculate CRS scores for many profiles at once.
+
+    Args:
+        profiles: List of profile dicts (see encode_crs_profiles for fields)
+        tables: Output of build_crs_tables(); defaults to the FSW
+            comprehensive_ranking_system breakdown
+
+    Returns:
+        Dict of int arrays (one entry per profile) with each factor's points,
+        plus core_human_capital, spouse_factors, skill_transferability,
+        additional_points and total.
+    """
+    c = encode_crs_profiles(profiles)
+    spouse = c['has_spouse'].astype(np.int64)
+
+    age = tables['age'][spouse, np.clip(c['age'], 0, MAX_AGE)]
+    education = tables['education'][spouse, c['education']]
+
+    first_clb = np.clip(c['first_clb'], 0, MAX_CLB)
+    first_language = tables['first_language'][spouse[:, None], first_clb].sum(axis=1)
+
+    second_language = np.minimum(
+        tables['second_language'][np.clip(c['second_clb'], 0, MAX_CLB)].sum(axis=1),
+        np.where(c['has_spouse'], tables['second_language_max'][1], tables['second_language_max'][0])
+    )
+
+    canadian_years = np.clip(c['canadian_years'], 0, MAX_CANADIAN_WORK_YEARS)
+    canadian_work = tables['canadian_work'][spouse, canadian_years]
+
+    core = np.minimum(age + education + first_language + second_language + canadian_work, tables['core_max'])
+
+    # Spouse or common-law partner factors
+    spouse_education = tables['spouse_education'][c['spouse_education']]
+    spouse_language = np.minimum(
+        tables['spouse_language'][np.clip(c['spouse_clb'], 0, MAX_CLB)].sum(axis=1),
+        tables['spouse_language_max']
+    )
+    spouse_work = tables['spouse_work'][np.clip(c['spouse_canadian_years'], 0, MAX_CANADIAN_WORK_YEARS)]
+    spouse_factors = np.where(
+        c['has_spouse'],
+        np.minimum(spouse_education + spouse_language + spouse_work, tables['spouse_max']),
+        0
+    )
+
+    # Skill transferability: each combination scores 0 / half / full
+    min_clb = first_clb.min(axis=1)
+    lang_level = np.select([min_clb >= 9, min_clb >= 7], [2, 1], 0)
+    cdn_level = np.select([canadian_years >= 2, canadian_years >= 1], [2, 1], 0)
+    edu_idx = c['education']
+    edu_level = np.select(
+        [edu_idx >= CRS_EDUCATION_CATEGORIES.index("two_or_more_credentials"),
+         edu_idx >= CRS_EDUCATION_CATEGORIES.index("one_year_post_secondary")],
+        [2, 1], 0
+    )
+    foreign_level = np.select([c['foreign_years'] >= 3, c['foreign_years'] >= 1], [2, 1], 0)
+
+    def combo(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        # Points grid: credential/experience tier (1 or 2) x strength (1 or 2)
+        grid = np.array([[0, 0, 0], [0, 13, 25], [0, 25, 50]], dtype=np.int64)
+        return grid[a, b]
+
+    education_transfer = np.minimum(combo(edu_level, lang_level) + combo(edu_level, cdn_level), 50)
+    foreign_transfer = np.minimum(combo(foreign_level, lang_level) + combo(foreign_level, cdn_level), 50)
+    certificate_transfer = np.where(
+        c['has_certificate_of_qualification'],
+        np.select([min_clb >= 7, min_clb >= 5], [50, 25], 0),
+        0
+    )
+    skill_transferability = np.minimum(
+        education_transfer + foreign_transfer + certificate_transfer,
+        tables['skill_transferability_max']
+    )
+
+    # Additional points
+    provincial_nomination = np.where(c['has_provincial_nomination'], tables['provincial_nomination'], 0)
+    job_offer = np.select(
+        [c['has_job_offer'] & c['job_offer_noc_00'], c['has_job_offer']],
+        [tables['job_offer_noc_00'], tables['job_offer_other']],
+        0
+    )
+    canadian_education = np.select(
+        [c['canadian_education_years'] >= 3, c['canadian_education_years'] >= 1],
+        [tables['canadian_education_long'], tables['canadian_education_short']],
+        0
+    )
+    french_ok = c['french_nclc'].min(axis=1) >= 7
+    french_proficiency = np.select(
+        [french_ok & (min_clb >= 5), french_ok],
+        [tables['french_strong_english'], tables['french_weak_english']],
+        0
+    )
+    sibling = np.where(c['has_sibling_in_canada'], tables['sibling_in_canada'], 0)
+    additional = np.minimum(
+        provincial_nomination + job_offer + canadian_education + french_proficiency + sibling,
+        tables['additional_max']
+    )
+
+    total = np.minimum(core + spouse_factors + skill_transferability + additional, tables['total_max'])
+
+    return {
+        'age': age,
+        'education': education,
+        'first_language': first_language,
+        'second_language': second_language,
+        'canadian_work_experience': canadian_work,
+        'core_human_capital': core,
+        'spouse_factors': spouse_factors,
+        'skill_transferability': skill_transferability,
+        'provincial_nomination': provincial_nomination,
+        'job_offer': job_offer,
+        'canadian_education': canadian_education,
+        'french_proficiency': french_proficiency,
+        'sibling_in_canada': sibling,
+        'additional_points': additional,
+        'total': total,
+    }
+
+
+def calculate_crs(profile: Dict[str, Any], tables: Dict[str, Any] = CRS_TABLES) -> Dict[str, int]:
+    """
+    Calculate the CRS score breakdown for a single profile.
+    Same fields and keys as calculate_crs_batch, as plain ints.
+    """
+    result = calculate_crs_batch([profile], tables)
+    return {k: int(v[0]) for k, v in result.items()}
+
+
+if __name__ == "__main__":
+    # Test case
+    sample_applicant = {
+        "age": 30,
+        "education_level": "bachelor",
+        "clb_score": 9,
+        "work_experience_years": 3,
+        "canadian_work_experience_years": 0,
+        "has_spouse": False,
+    }
+
+    breakdown = calculate_crs(sample_applicant)
+
+    print(f"\n{'='*80}")
+    print(f"CRS SCORE BREAKDOWN")
+    print(f"{'='*80}")
+    for factor, points in breakdown.items():
+        print(f"  {factor}: {points}")
@@ -1,8 +1,11 @@
 import json
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Any
 
+import numpy as np
+
 # ============================================================================
 # LOAD ELIGIBILITY RULES (Once at startup)
 # ============================================================================
@@ -45,6 +48,38 @@ def extract_min_clb(clb_text: str, noc_teer: str = "0") -> int:
     return min(all_clbs)
 
 
+EDUCATION_LEVELS = (
+    "less than high school",
+    "high school",
+    "secondary school",
+    "diploma",
+    "certificate",
+    "post-secondary",
+    "associate degree",
+    "bachelor",
+    "bachelor's degree",
+    "masters",
+    "master's degree",
+    "phd",
+    "doctorate"
+)
+
+NOC_TEER_LEVELS = ("0", "1", "2", "3", "4", "5")
+
+
+def normalize_education(level: str) -> str:
+    """Lowercase an education level and strip common "degree" suffixes."""
+    return level.lower().strip().replace("'s degree", "").replace(" degree", "")
+
+
+def education_rank(normalized_level: str) -> int:
+    """
+    Position of a normalized education level in EDUCATION_LEVELS
+    (lowest to highest), or -1 if it matches no known level.
+    """
+    return next((i for i, lvl in enumerate(EDUCATION_LEVELS) if lvl in normalized_level), -1)
+
+
 def compare_education(applicant_level: str, required_level: str) -> bool:
     """
     Compare education levels with hierarchy understanding.
@@ -53,37 +88,16 @@ def compare_education(applicant_level: str, required_level: str) -> bool:
     if not required_level or "not required" in required_level.lower():
         return True
     
-    app = applicant_level.lower().strip()
-    req = required_level.lower().strip()
-    
-    # Education hierarchy (lowest to highest)
-    levels = [
-        "less than high school",
-        "high school",
-        "secondary school",
-        "diploma",
-        "certificate",
-        "post-secondary",
-        "associate degree",
-        "bachelor",
-        "bachelor's degree",
-        "masters",
-        "master's degree",
-        "phd",
-        "doctorate"
-    ]
-    
-    # Normalize common variations
-    app = app.replace("'s degree", "").replace(" degree", "")
-    req = req.replace("'s degree", "").replace(" degree", "")
+    app = normalize_education(applicant_level)
+    req = normalize_education(required_level)
     
     # Direct match
     if app in req or req in app:
         return True
     
     # Hierarchical comparison
-    app_idx = next((i for i, lvl in enumerate(levels) if lvl in app), -1)
-    req_idx = next((i for i, lvl in enumerate(levels) if lvl in req), -1)
+    app_idx = education_rank(app)
+    req_idx = education_rank(req)
     
     if app_idx >= 0 and req_idx >= 0:
         return app_idx >= req_idx
@@ -91,6 +105,15 @@ def compare_education(applicant_level: str, required_level: str) -> bool:
     return False
 
 
+def int_keyed_funds_table(table_cad: Dict) -> Dict[int, int]:
+    """
+    Convert a settlement funds table to {family_size: amount}.
+    JSON object keys are strings, so "1".."7" become ints here;
+    non-numeric keys such as "additional_per_person" are dropped.
+    """
+    return {int(k): v for k, v in (table_cad or {}).items() if str(k).isdigit()}
+
+
 def check_work_experience(applicant: Dict, rules: Dict) -> tuple[bool, str]:
     """Check work experience requirements"""
     work_rules = rules.get('work_experience', {})
@@ -180,13 +203,16 @@ def check_settlement_funds(applicant: Dict, rules: Dict) -> tuple[bool, str]:
         return True, "Settlement funds not required"
     
     family_size = applicant.get('family_size', 1)
-    applicant_funds = applicant.get('settlement_funds_cad', 0)
+    applicant_funds = applicant.get('settlement_funds_cad')
+    if applicant_funds is None:
+        return True, "Settlement funds not provided; not checked"
     
-    funds_table = funds_rules.get('table_cad', {})
+    table_cad = funds_rules.get('table_cad') or {}
+    funds_table = int_keyed_funds_table(table_cad)
     required_funds = funds_table.get(family_size, funds_table.get(7, 0))
     
     if family_size > 7:
-        additional_per_person = funds_table.get('additional_per_person', 0)
+        additional_per_person = table_cad.get('additional_per_person', 0)
         required_funds += (family_size - 7) * additional_per_person
     
     if applicant_funds >= required_funds:
@@ -208,11 +234,231 @@ def check_job_offer(applicant: Dict, rules: Dict) -> tuple[bool, str]:
     return True, "Job offer requirement met" if has_job_offer else "No job offer required"
 
 
+# ============================================================================
+# COMPILED PROGRAM RULES (Built once at load time)
+# ============================================================================
+
+class ProgramRule:
+    """
+    Pre-parsed eligibility rules for one program.
+
+    All free-text requirements (CLB text, education level, funds table)
+    are resolved to numbers once, so evaluation only compares values.
+    """
+
+    __slots__ = (
+        "index",
+        "program_name",
+        "official_url",
+        "program_type",
+        "province",
+        "last_updated",
+        "min_work_years",
+        "canadian_experience_required",
+        "english_min",
+        "min_clb_by_teer",
+        "education_min_level",
+        "education_required",
+        "education_text",
+        "education_rank",
+        "min_age",
+        "max_age",
+        "funds_required",
+        "funds_table",
+        "funds_fallback",
+        "funds_additional_per_person",
+        "job_offer_required",
+    )
+
+    def __init__(self, index: int, program: Dict[str, Any]):
+        rules = program.get('eligibility_rules', {})
+        work_rules = rules.get('work_experience', {})
+        lang_rules = rules.get('language', {})
+        edu_rules = rules.get('education', {})
+        age_rules = rules.get('age', {})
+        funds_rules = rules.get('settlement_funds', {})
+        connection_rules = rules.get('connection_requirements', {})
+
+        self.index = index
+        self.program_name = program['program_name']
+        self.official_url = program['official_url']
+        self.program_type = program.get('federal_or_provincial', 'unknown')
+        self.province = program.get('province')
+        self.last_updated = program.get('last_updated')
+
+        self.min_work_years = work_rules.get('min_years')
+        self.canadian_experience_required = bool(work_rules.get('canadian_experience_required', False))
+
+        self.english_min = lang_rules.get('english_min', '')
+        self.min_clb_by_teer = {
+            teer: extract_min_clb(self.english_min, teer) for teer in NOC_TEER_LEVELS
+        } if self.english_min else {}
+
+        self.education_min_level = edu_rules.get('min_level', '')
+        self.education_required = bool(self.education_min_level) and "not required" not in self.education_min_level.lower()
+        self.education_text = normalize_education(self.education_min_level) if self.education_required else ""
+        self.education_rank = education_rank(self.education_text) if self.education_required else -1
+
+        self.min_age = age_rules.get('min_age') or 0
+        self.max_age = age_rules.get('max_age') or 0
+
+        table_cad = funds_rules.get('table_cad') or {}
+        self.funds_required = bool(funds_rules.get('required', False))
+        self.funds_table = int_keyed_funds_table(table_cad)
+        self.funds_fallback = self.funds_table.get(7, 0)
+        self.funds_additional_per_person = table_cad.get('additional_per_person', 0)
+
+        self.job_offer_required = bool(connection_rules.get('job_offer_required', False))
+
+    def min_clb(self, noc_teer: str) -> int:
+        """Minimum CLB for a NOC TEER level (0 when there is no minimum)."""
+        min_clb = self.min_clb_by_teer.get(noc_teer)
+        if min_clb is None:
+            # Unusual TEER strings are rare; parse them on demand.
+            min_clb = extract_min_clb(self.english_min, noc_teer)
+        return min_clb
+
+    def required_funds(self, family_size: int) -> int:
+        """Settlement funds (CAD) required for the given family size."""
+        required = self.funds_table.get(family_size, self.funds_fallback)
+        if family_size > 7:
+            required += (family_size - 7) * self.funds_additional_per_person
+        return required
+
+    def evaluate(self, applicant: "ApplicantFacts") -> Dict[str, tuple[bool, str]]:
+        """Run all checks against pre-extracted applicant facts."""
+        return {
+            'work_experience': self._check_work_experience(applicant),
+            'language': self._check_language(applicant),
+            'education': self._check_education(applicant),
+            'age': self._check_age(applicant),
+            'settlement_funds': self._check_settlement_funds(applicant),
+            'job_offer': self._check_job_offer(applicant)
+        }
+
+    def _check_work_experience(self, applicant: "ApplicantFacts") -> tuple[bool, str]:
+        if self.min_work_years is None:
+            return True, "No work experience required"
+        if self.canadian_experience_required and not applicant.has_canadian_experience:
+            return False, "Canadian work experience required"
+        if applicant.work_experience_years >= self.min_work_years:
+            return True, f"Meets work experience requirement ({applicant.work_experience_years} years)"
+        return False, f"Need {self.min_work_years} years, have {applicant.work_experience_years} years"
+
+    def _check_language(self, applicant: "ApplicantFacts") -> tuple[bool, str]:
+        if not self.english_min:
+            return True, "No language requirement"
+        min_clb = self.min_clb(applicant.noc_teer_level)
+        if min_clb == 0:
+            return True, "No minimum CLB required"
+        if applicant.clb_score >= min_clb:
+            return True, f"Meets language requirement (CLB {applicant.clb_score})"
+        return False, f"Need CLB {min_clb}, have CLB {applicant.clb_score}"
+
+    def _check_education(self, applicant: "ApplicantFacts") -> tuple[bool, str]:
+        if not self.education_min_level:
+            return True, "No education requirement"
+        if applicant.education_matches[self.index]:
+            return True, "Meets education requirement"
+        return False, f"Need {self.education_min_level}, have {applicant.education_level}"
+
+    def _check_age(self, applicant: "ApplicantFacts") -> tuple[bool, str]:
+        age = applicant.age
+        if not age:
+            return True, "Age not evaluated"
+        if self.min_age and age < self.min_age:
+            return False, f"Minimum age {self.min_age} required"
+        if self.max_age and age > self.max_age:
+            return False, f"Maximum age {self.max_age} exceeded"
+        return True, "Meets age requirement"
+
+    def _check_settlement_funds(self, applicant: "ApplicantFacts") -> tuple[bool, str]:
+        if not self.funds_required:
+            return True, "Settlement funds not required"
+        if applicant.settlement_funds_cad is None:
+            return True, "Settlement funds not provided; not checked"
+        required_funds = self.required_funds(applicant.family_size)
+        if applicant.settlement_funds_cad >= required_funds:
+            return True, "Meets settlement funds requirement"
+        return False, f"Need ${required_funds:,} CAD, have ${applicant.settlement_funds_cad:,} CAD"
+
+    def _check_job_offer(self, applicant: "ApplicantFacts") -> tuple[bool, str]:
+        if self.job_offer_required and not applicant.has_job_offer:
+            return False, "Valid job offer required"
+        return True, "Job offer requirement met" if applicant.has_job_offer else "No job offer required"
+
+    def to_result(self) -> Dict[str, Any]:
+        """Program metadata block used in evaluate_eligibility output."""
+        return {
+            'program_name': self.program_name,
+            'official_url': self.official_url,
+            'type': self.program_type,
+            'province': self.province,
+            'last_updated': self.last_updated
+        }
+
+
+def compile_rules(programs: List[Dict[str, Any]]) -> tuple:
+    """Compile raw program dicts into a tuple of ProgramRule objects."""
+    return tuple(ProgramRule(i, program) for i, program in enumerate(programs))
+
+
+COMPILED_RULES = compile_rules(ELIGIBILITY_RULES['programs'])
+
+
+@lru_cache(maxsize=256)
+def education_matches(applicant_level: str, compiled_rules: tuple = COMPILED_RULES) -> tuple:
+    """
+    Per-program education pass flags for one applicant education level.
+    Cached, since only a handful of distinct levels are ever seen.
+    """
+    app = normalize_education(applicant_level)
+    app_rank = education_rank(app)
+    matches = []
+    for rule in compiled_rules:
+        if not rule.education_required:
+            matches.append(True)
+        elif app in rule.education_text or rule.education_text in app:
+            matches.append(True)
+        else:
+            matches.append(app_rank >= 0 and rule.education_rank >= 0 and app_rank >= rule.education_rank)
+    return tuple(matches)
+
+
+class ApplicantFacts:
+    """User profile values extracted once per evaluation."""
+
+    __slots__ = (
+        "work_experience_years",
+        "education_level",
+        "education_matches",
+        "clb_score",
+        "noc_teer_level",
+        "age",
+        "has_canadian_experience",
+        "has_job_offer",
+        "settlement_funds_cad",
+        "family_size",
+    )
+
+    def __init__(self, user_profile: Dict[str, Any], compiled_rules: tuple = COMPILED_RULES):
+        self.work_experience_years = user_profile.get('work_experience_years', 0)
+        self.education_level = user_profile.get('education_level', '')
+        self.education_matches = education_matches(self.education_level, compiled_rules)
+        self.clb_score = user_profile.get('clb_score', 0)
+        self.noc_teer_level = str(user_profile.get('noc_teer_level', '0'))
+        self.age = user_profile.get('age')
+        self.has_canadian_experience = user_profile.get('has_canadian_experience', False)
+        self.has_job_offer = user_profile.get('has_job_offer', False)
+        self.settlement_funds_cad = user_profile.get('settlement_funds_cad')  # None: unknown, not checked
+        self.family_size = user_profile.get('family_size', 1)
+
+
 # ============================================================================
 # MAIN ELIGIBILITY EVALUATION FUNCTION
 # ============================================================================
 
-def evaluate_eligibility(user_profile: Dict[str, Any]) -> Dict[str, Any]:
+def evaluate_eligibility(user_profile: Dict[str, Any], compiled_rules: tuple = COMPILED_RULES) -> Dict[str, Any]:
     """
     Evaluate user eligibility for all Canadian immigration programs.
     
@@ -225,8 +471,11 @@ def evaluate_eligibility(user_profile: Dict[str, Any]) -> Dict[str, Any]:
             - age (int, optional): Age in years
             - has_canadian_experience (bool, optional): Canadian work experience
             - has_job_offer (bool, optional): Valid job offer
-            - settlement_funds_cad (float, optional): Available settlement funds
+            - settlement_funds_cad (float, optional): Available settlement funds;
+              the funds check is skipped when it is missing or None
             - family_size (int, optional): Number of family members
+        compiled_rules: Output of compile_rules(); defaults to the rules
+            loaded from canadian_immigration_programs.json
     
     Returns:
         Dict containing:
@@ -237,46 +486,30 @@ def evaluate_eligibility(user_profile: Dict[str, Any]) -> Dict[str, Any]:
     
     eligible_programs = []
     ineligible_programs = []
+    applicant = ApplicantFacts(user_profile, compiled_rules)
     
-    for program in ELIGIBILITY_RULES['programs']:
-        rules = program.get('eligibility_rules', {})
-        
+    for rule in compiled_rules:
         # Run all checks
-        checks = {
-            'work_experience': check_work_experience(user_profile, rules),
-            'language': check_language(user_profile, rules),
-            'education': check_education(user_profile, rules),
-            'age': check_age(user_profile, rules),
-            'settlement_funds': check_settlement_funds(user_profile, rules),
-            'job_offer': check_job_offer(user_profile, rules)
-        }
+        checks = rule.evaluate(applicant)
         
         # Determine if all checks passed
         all_passed = all(check[0] for check in checks.values())
-        failed_checks = {k: v[1] for k, v in checks.items() if not v[0]}
-        passed_checks = {k: v[1] for k, v in checks.items() if v[0]}
         
-        program_result = {
-            'program_name': program['program_name'],
-            'official_url': program['official_url'],
-            'type': program.get('federal_or_provincial', 'unknown'),
-            'province': program.get('province'),
-            'last_updated': program.get('last_updated')
-        }
+        program_result = rule.to_result()
         
         if all_passed:
             program_result['status'] = 'eligible'
-            program_result['details'] = passed_checks
+            program_result['details'] = {k: v[1] for k, v in checks.items()}
             eligible_programs.append(program_result)
         else:
             program_result['status'] = 'ineligible'
-            program_result['failed_requirements'] = failed_checks
+            program_result['failed_requirements'] = {k: v[1] for k, v in checks.items() if not v[0]}
             ineligible_programs.append(program_result)
     
     return {
         'eligible_programs': eligible_programs,
         'ineligible_programs': ineligible_programs,
-        'total_evaluated': len(ELIGIBILITY_RULES['programs']),
+        'total_evaluated': len(compiled_rules),
         'summary': {
             'eligible_count': len(eligible_programs),
             'ineligible_count': len(ineligible_programs)
@@ -286,6 +519,147 @@ def evaluate_eligibility(user_profile: Dict[str, Any]) -> Dict[str, Any]:
 
 
 
+# ============================================================================
+# BATCH ELIGIBILITY EVALUATION (NumPy)
+# ============================================================================
+
+ELIGIBILITY_CHECKS = ('work_experience', 'language', 'education', 'age', 'settlement_funds', 'job_offer')
+
+
+@lru_cache(maxsize=8)
+def _rule_columns(compiled_rules: tuple) -> Dict[str, np.ndarray]:
+    """Per-program numeric thresholds laid out as NumPy vectors."""
+    return {
+        'has_work_rule': np.array([r.min_work_years is not None for r in compiled_rules], dtype=bool),
+        'min_work_years': np.array([r.min_work_years or 0.0 for r in compiled_rules], dtype=np.float64),
+        'canadian_experience_required': np.array([r.canadian_experience_required for r in compiled_rules], dtype=bool),
+        'min_age': np.array([r.min_age for r in compiled_rules], dtype=np.float64),
+        'max_age': np.array([r.max_age for r in compiled_rules], dtype=np.float64),
+        'funds_required': np.array([r.funds_required for r in compiled_rules], dtype=bool),
+        'job_offer_required': np.array([r.job_offer_required for r in compiled_rules], dtype=bool),
+    }
+
+
+def encode_profiles(profiles: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Encode user profiles into NumPy columns, one row per profile.
+
+    Missing fields get the same defaults as evaluate_eligibility; unknown
+    settlement funds are NaN. Text fields (education level, NOC TEER) are
+    kept as object columns and resolved per distinct value during evaluation.
+    """
+    return {
+        'work_experience_years': np.array([p.get('work_experience_years', 0) for p in profiles], dtype=np.float64),
+        'education_level': np.array([p.get('education_level', '') for p in profiles], dtype=object),
+        'clb_score': np.array([p.get('clb_score', 0) for p in profiles], dtype=np.float64),
+        'noc_teer_level': np.array([str(p.get('noc_teer_level', '0')) for p in profiles], dtype=object),
+        'age': np.array([p.get('age') or 0 for p in profiles], dtype=np.float64),
+        'has_canadian_experience': np.array([bool(p.get('has_canadian_experience', False)) for p in profiles], dtype=bool),
+        'has_job_offer': np.array([bool(p.get('has_job_offer', False)) for p in profiles], dtype=bool),
+        'settlement_funds_cad': np.array(
+            [np.nan if p.get('settlement_funds_cad') is None else p['settlement_funds_cad'] for p in profiles],
+            dtype=np.float64
+        ),
+        'family_size': np.array([p.get('family_size', 1) for p in profiles], dtype=np.int64),
+    }
+
+
+def _per_value_matrix(column: np.ndarray, row_for_value) -> np.ndarray:
+    """
+    Build a profiles x programs matrix from a per-distinct-value function,
+    evaluating row_for_value only once for each distinct value in column.
+    """
+    values, inverse = np.unique(column, return_inverse=True)
+    table = np.array([row_for_value(v) for v in values.tolist()])
+    return table[inverse.reshape(-1)]
+
+
+def evaluate_eligibility_batch(
+    profiles: List[Dict[str, Any]],
+    compiled_rules: tuple = COMPILED_RULES
+) -> Dict[str, Any]:
+    """
+    Evaluate many user profiles against all programs at once.
+
+    Args:
+        profiles: List of user profile dicts (same fields as evaluate_eligibility)
+        compiled_rules: Output of compile_rules(); defaults to the rules
+            loaded from canadian_immigration_programs.json
+
+    Returns:
+        Dict containing:
+            - program_names: Program names, in column order
+            - eligible: Bool matrix (profiles x programs), True where all checks pass
+            - failed_checks: Dict of check name -> bool matrix, True where that check fails
+            - eligible_count: Number of eligible programs per profile
+            - total_evaluated: Total number of programs evaluated
+    """
+    cols = encode_profiles(profiles)
+    rules = _rule_columns(compiled_rules)
+    n_programs = len(compiled_rules)
+
+    if not profiles:
+        empty = np.zeros((0, n_programs), dtype=bool)
+        return {
+            'program_names': [r.program_name for r in compiled_rules],
+            'eligible': empty,
+            'failed_checks': {check: empty.copy() for check in ELIGIBILITY_CHECKS},
+            'eligible_count': np.zeros(0, dtype=np.int64),
+            'total_evaluated': n_programs
+        }
+
+    years = cols['work_experience_years'][:, None]
+    has_canadian = cols['has_canadian_experience'][:, None]
+    work_failed = rules['has_work_rule'] & (
+        (rules['canadian_experience_required'] & ~has_canadian) | (years < rules['min_work_years'])
+    )
+
+    min_clb = _per_value_matrix(
+        cols['noc_teer_level'],
+        lambda teer: [r.min_clb(teer) for r in compiled_rules]
+    )
+    language_failed = (min_clb > 0) & (cols['clb_score'][:, None] < min_clb)
+
+    education_failed = ~_per_value_matrix(
+        cols['education_level'],
+        lambda level: education_matches(level, compiled_rules)
+    ).astype(bool)
+
+    age = cols['age'][:, None]
+    age_failed = (age != 0) & (
+        ((rules['min_age'] > 0) & (age < rules['min_age'])) | ((rules['max_age'] > 0) & (age > rules['max_age']))
+    )
+
+    required_funds = _per_value_matrix(
+        cols['family_size'],
+        lambda size: [r.required_funds(size) for r in compiled_rules]
+    )
+    # Unknown funds are NaN, which compares False: not checked
+    funds_failed = rules['funds_required'] & (cols['settlement_funds_cad'][:, None] < required_funds)
+
+    job_offer_failed = rules['job_offer_required'] & ~cols['has_job_offer'][:, None]
+
+    failed_checks = {
+        'work_experience': work_failed,
+        'language': language_failed,
+        'education': education_failed,
+        'age': age_failed,
+        'settlement_funds': funds_failed,
+        'job_offer': job_offer_failed
+    }
+    eligible = ~np.logical_or.reduce(list(failed_checks.values()))
+
+    return {
+        'program_names': [r.program_name for r in compiled_rules],
+        'eligible': eligible,
+        'failed_checks': failed_checks,
+        'eligible_count': eligible.sum(axis=1),
+        'total_evaluated': n_programs
+    }
+
+
+
+
 if __name__ == "__main__":
     # Test case
     sample_applicant = {
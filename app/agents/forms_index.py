@@ -0,0 +1,320 @@
+import csv
+import io
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.agents.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Written by scrapers/ircc_forms_data_scraper.py
+FORMS_CSV = Path(os.getenv(
+    "FORMS_CSV",
+    Path(__file__).resolve().parents[2] / "data" / "forms" / "ircc_forms_details.csv",
+))
+FORMS_MAX_K = 20
+TITLE_WEIGHT = 3.0         # a query term in the title or code counts this much more than in the instructions
+MIN_TRIGRAM_SIMILARITY = 0.45
+MIN_FUZZY_LENGTH = 4       # shorter query terms and numbers only match exactly
+FUZZY_EXPANSIONS = 3       # vocabulary terms a misspelled query term may expand to
+INSTRUCTIONS_PREVIEW = 1500
+
+_lock = threading.Lock()
+_forms_index: Optional["FormsIndex"] = None
+
+_TITLE_NOISE_RE = re.compile(r"\(opens\s+in\s+a\s+new\s+tab\)\s*$", re.IGNORECASE)
+_CONFLICT_RE = re.compile(r"^(<{7}|={7}|>{7})(?: |$)")
+
+# "IMM 5257", "imm5257e", "IMM-0008 Schedule 4", "CIT 2", "IMM 0008 DEP" ...
+_FORM_PREFIXES = r"imm|cit|irm"
+_CODE_IN_TEXT_RE = re.compile(
+    rf"\b({_FORM_PREFIXES})\s*[-_]?\s*(\d{{1,4}})"
+    r"(?:\s*[-_]?\s*(sch(?:edule)?\s*[-_]?\s*\d+[a-z]?|b\d+[a-z]?\b|dep|[a-z]\b))?",
+    re.IGNORECASE,
+)
+_CODE_KEY_RE = re.compile(rf"^({_FORM_PREFIXES})(\d{{1,4}})([a-z0-9]*)$")
+_LANGUAGE_SUFFIXES = ("e", "f")  # English / French PDF editions: imm5257e.pdf
+
+
+def form_code_key(text: str) -> Optional[str]:
+    """
+    Canonical lookup key for a form code, or None if `text` is not one:
+    "IMM 5257", "imm5257", "IMM-5257" -> "imm5257"; "IMM 8 Schedule 4" ->
+    "imm0008sch4"; IRCC's file names for schedules ("imm5257b1") ->
+    "imm5257sch1". Language suffixes ("imm 5257e") are kept here and
+    dropped by FormsIndex.get when the form has no such variant.
+    """
+    compact = re.sub(r"[^a-z0-9]", "", text.lower().replace("schedule", "sch"))
+    match = _CODE_KEY_RE.match(compact)
+    if not match:
+        return None
+    prefix, number, rest = match.groups()
+    return f"{prefix}{number.zfill(4)}{re.sub(r'^b(?=[0-9])', 'sch', rest)}"
+
+
+def find_form_codes(text: str) -> List[str]:
+    """Keys of the form codes mentioned anywhere in `text`, in order."""
+    keys = []
+    for prefix, number, suffix in _CODE_IN_TEXT_RE.findall(text):
+        key = form_code_key(f"{prefix}{number}{suffix or ''}")
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def strip_form_codes(text: str) -> str:
+    """`text` without the form codes find_form_codes recognizes."""
+    return _CODE_IN_TEXT_RE.sub(" ", text)
+
+
+def clean_title(title: str) -> str:
+    return " ".join(_TITLE_NOISE_RE.sub("", title or "").split())
+
+
+# ============================================================================
+# CSV
+# ============================================================================
+
+def strip_conflict_markers(lines: Iterable[str], source: str = "") -> List[str]:
+    """
+    Drop unresolved git merge-conflict blocks, keeping our (HEAD) side.
+    The forms CSV was committed with one around its whole body, the other
+    side being a git-lfs pointer.
+    """
+    kept, side = [], None
+    for line in lines:
+        match = _CONFLICT_RE.match(line)
+        if match:
+            side = {"<<<<<<<": "ours", "=======": "theirs", ">>>>>>>": None}[match.group(1)]
+            if side == "ours":
+                logger.warning(f"Unresolved merge conflict in {source or 'input'}; keeping the HEAD side")
+            continue
+        if side != "theirs":
+            kept.append(line)
+    return kept
+
+
+def read_forms_csv(path: Path = FORMS_CSV) -> List[Dict[str, str]]:
+    """Rows of the forms CSV as dicts, tolerating conflict markers and blank codes."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        lines = strip_conflict_markers(f.read().splitlines(keepends=True), str(path))
+    rows = []
+    for row in csv.DictReader(io.StringIO("".join(lines))):
+        if not (row.get("form_code") or "").strip():
+            continue
+        rows.append({key: (value or "").strip() for key, value in row.items() if key})
+    return rows
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class FormRecord(NamedTuple):
+    """A form as FormItem (app/agents/document_agent.py) describes it, plus the lookup score."""
+    form_number: str
+    title: str
+    pdf_url: str
+    instructions_url: Optional[str]
+    last_updated: str
+    score: float
+
+    def as_form_item(self) -> Dict[str, Optional[str]]:
+        return {"form_number": self.form_number, "title": self.title,
+                "pdf_url": self.pdf_url, "instructions_url": self.instructions_url}
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FormsIndex:
+    """
+    In-memory index of the IRCC forms CSV: exact form-code lookup, an
+    inverted index over titles, codes and fill-in instructions, and a
+    trigram index over the vocabulary so misspelled keywords still match.
+    """
+
+    def __init__(self, rows: List[Dict[str, str]]):
+        self.rows = rows
+        self.by_key: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+
+        for i, row in enumerate(rows):
+            key = form_code_key(row["form_code"])
+            if key is None:
+                logger.warning(f"Unrecognized form code {row['form_code']!r}")
+            elif key in self.by_key:
+                logger.warning(f"Duplicate form code {row['form_code']!r}; keeping the first row")
+            else:
+                self.by_key[key] = i
+            for term in set(tokenize(row.get("how_to_fill_instructions", ""))):
+                self.postings[term][i] = 1.0
+            for term in set(tokenize(f"{row['form_code']} {clean_title(row.get('title', ''))}")):
+                self.postings[term][i] = TITLE_WEIGHT
+
+        self.idf = {
+            term: math.log(1 + (len(rows) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        self.trigrams: Dict[str, Set[str]] = defaultdict(set)
+        for term in self.postings:
+            for gram in _trigrams(term):
+                self.trigrams[gram].add(term)
+
+    @classmethod
+    def from_csv(cls, path: Path = FORMS_CSV) -> "FormsIndex":
+        rows = read_forms_csv(path)
+        logger.info(f"Loaded {len(rows)} forms from {path}")
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _record(self, i: int, score: float) -> FormRecord:
+        row = self.rows[i]
+        return FormRecord(
+            form_number=row["form_code"],
+            title=clean_title(row.get("title", "")),
+            pdf_url=row.get("pdf_url", ""),
+            instructions_url=row.get("form_page_url") or None,
+            last_updated=row.get("last_updated", ""),
+            score=round(score, 3),
+        )
+
+    def instructions(self, form_number: str) -> str:
+        row = self._row_for(form_number)
+        return self.rows[row].get("how_to_fill_instructions", "") if row is not None else ""
+
+    def _row_for(self, code: str) -> Optional[int]:
+        key = form_code_key(code)
+        if key is None:
+            return None
+        if key in self.by_key:
+            return self.by_key[key]
+        if key[-1] in _LANGUAGE_SUFFIXES:
+            return self.by_key.get(key[:-1])
+        return None
+
+    def get(self, code: str) -> Optional[FormRecord]:
+        """The form with this code in any common spelling, or None."""
+        row = self._row_for(code)
+        return self._record(row, 1.0) if row is not None else None
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """`term` itself if indexed, else the closest vocabulary terms by trigram similarity."""
+        if term in self.postings:
+            return [(term, 1.0)]
+        if len(term) < MIN_FUZZY_LENGTH or term.isdigit():
+            return []
+        grams = _trigrams(term)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self.trigrams.get(gram, ()):
+                shared[candidate] += 1
+        scored = []
+        for candidate, count in shared.items():
+            similarity = count / (len(grams) + len(_trigrams(candidate)) - count)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored.append((candidate, similarity))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:FUZZY_EXPANSIONS]
+
+    def _keyword_scores(self, text: str) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(text)):
+            for match, similarity in self._expand(term):
+                idf = self.idf[match]
+                for row, weight in self.postings[match].items():
+                    scores[row] += similarity * idf * weight
+        return scores
+
+    def search(self, query: str, k: int = 5) -> List[FormRecord]:
+        """
+        Forms for `query`, best first. Form codes mentioned in the query
+        resolve exactly and come first; the rest of the query is ranked by
+        keyword matches weighted by rarity, with title and code matches
+        counting more than matches in the instructions.
+        """
+        k = max(1, min(int(k), FORMS_MAX_K))
+        exact = []
+        for key in find_form_codes(query):
+            row = self._row_for(key)
+            if row is not None and row not in exact:
+                exact.append(row)
+        records = [self._record(row, 1.0) for row in exact[:k]]
+
+        # Codes are removed first so "IMM 5257" doesn't also rank every IMM form
+        scores = self._keyword_scores(strip_form_codes(query))
+        for row in exact:
+            scores.pop(row, None)
+        if not scores or len(records) >= k:
+            return records
+
+        best = sorted(scores, key=lambda row: (-scores[row], row))[:k - len(records)]
+        top = scores[best[0]]
+        return records + [self._record(row, scores[row] / top) for row in best]
+
+
+def get_forms_index() -> FormsIndex:
+    """Process-wide forms index, loaded on first use."""
+    global _forms_index
+    if _forms_index is None:
+        with _lock:
+            if _forms_index is None:
+                _forms_index = FormsIndex.from_csv(FORMS_CSV)
+    return _forms_index
+
+
+# === AGENT TOOL ===
+def lookup_ircc_forms(query: str, k: int = 5, include_instructions: bool = False) -> str:
+    """
+    Look up official IRCC forms in the local forms database (no network).
+    Accepts form codes in any spelling ("IMM5257", "imm 5257e", "IMM 0008
+    Schedule 4"), several codes at once, or keywords ("sponsorship
+    undertaking", "study permit outside Canada").
+
+    Args:
+        query: Form codes and/or keywords
+        k: Maximum number of forms to return (1-20)
+        include_instructions: Also return each form's how-to-fill instructions
+
+    Returns:
+        JSON list of forms with form_number, title, pdf_url, instructions_url
+        and last_updated; an empty list means the form is not in the database
+    """
+    try:
+        index = get_forms_index()
+        results = []
+        for record in index.search(query, k=k):
+            item = record.as_form_item()
+            item["last_updated"] = record.last_updated
+            if include_instructions:
+                item["how_to_fill_instructions"] = index.instructions(record.form_number)[:INSTRUCTIONS_PREVIEW]
+            results.append(item)
+        return json.dumps(results, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Forms lookup failed: {e}", exc_info=True)
+        return f"Forms database unavailable ({e}); use web search on canada.ca instead."
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    logging.basicConfig(level=logging.INFO)
+    query = " ".join(sys.argv[1:]) or "IMM 5257"
+    index = get_forms_index()
+    t0 = time.perf_counter()
+    records = index.search(query)
+    print(f"{len(index)} forms; {len(records)} results in {(time.perf_counter() - t0) * 1000:.3f} ms")
+    for record in records:
+        print(f"{record.score:5.2f}  {record.form_number:<16} {record.title}")
@@ -0,0 +1,307 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+    from langchain_core.embeddings import Embeddings
+    from app.agents.lexical_index import LexicalIndex
+    from app.agents.quantized_index import QuantizedIndex
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Chroma store written by scrapers/embedding_helper.py
+KB_PERSIST_DIR = Path(os.getenv(
+    "KB_PERSIST_DIR",
+    Path(__file__).resolve().parents[2] / "data" / "embeddings" / "chroma_immigration",
+))
+KB_COLLECTION = os.getenv("KB_COLLECTION", "langchain")  # langchain_chroma's default collection
+KB_EMBEDDING_MODEL = os.getenv("KB_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+KB_MIN_RELEVANCE = float(os.getenv("KB_MIN_RELEVANCE", "0.3"))
+KB_MAX_K = 20
+# Fuse vector hits with the BM25 index built by app/agents/lexical_index.py
+KB_HYBRID = os.getenv("KB_HYBRID", "true").lower() == "true"
+RRF_K = 60            # reciprocal rank fusion constant
+CANDIDATES_PER_K = 4  # each retriever contributes k * this candidates to fusion
+# "chroma" (HNSW in RAM per process) or "int8"/"binary" for the memory-mapped
+# quantized export built by app/agents/quantized_index.py
+KB_VECTOR_BACKEND = os.getenv("KB_VECTOR_BACKEND", "chroma").lower()
+
+# `source` values written by the content scrapers, and the names a model
+# is likely to use for them
+SOURCE_ALIASES = {"ircc": "ircc_gov", "ircc.gc.ca": "ircc_gov", "canada.ca": "ircc_gov", "canadavisa.com": "canadavisa"}
+
+_lock = threading.Lock()
+_embeddings: Optional["Embeddings"] = None
+_vectorstore: Optional["Chroma"] = None
+_quantized_index: Optional["QuantizedIndex"] = None
+_lexical_index: Optional["LexicalIndex"] = None
+_lexical_loaded = False
+
+
+class KnowledgeChunk(NamedTuple):
+    id: str
+    content: str
+    url: str
+    title: str
+    language: str
+    source: str
+    score: float  # cosine similarity, or the RRF score for hybrid results; higher is better
+
+
+def get_embeddings() -> "Embeddings":
+    """Process-wide query embedding model (EMBEDDING_BACKEND), loaded on first use."""
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                from scrapers.embedding_backends import EMBEDDING_BACKEND, load_embeddings
+
+                _embeddings = load_embeddings(KB_EMBEDDING_MODEL, EMBEDDING_BACKEND)
+    return _embeddings
+
+
+def get_vectorstore() -> "Chroma":
+    """
+    Process-wide Chroma collection with its embedding model. Both are
+    loaded on first use; concurrent first calls load them only once.
+    """
+    global _vectorstore
+    if _vectorstore is None:
+        embeddings = get_embeddings()
+        with _lock:
+            if _vectorstore is None:
+                from langchain_chroma import Chroma
+
+                _vectorstore = Chroma(
+                    collection_name=KB_COLLECTION,
+                    persist_directory=str(KB_PERSIST_DIR),
+                    embedding_function=embeddings,
+                )
+                logger.info(f"Loaded knowledge base from {KB_PERSIST_DIR} ({KB_EMBEDDING_MODEL})")
+    return _vectorstore
+
+
+def get_quantized_index() -> "QuantizedIndex":
+    """Process-wide memory-mapped quantized index for KB_VECTOR_BACKEND."""
+    global _quantized_index
+    if _quantized_index is None:
+        with _lock:
+            if _quantized_index is None:
+                from app.agents.quantized_index import QUANTIZED_INDEX_DIR, QuantizedIndex
+
+                _quantized_index = QuantizedIndex(QUANTIZED_INDEX_DIR, mode=KB_VECTOR_BACKEND)
+                logger.info(f"Loaded {KB_VECTOR_BACKEND} quantized index from {QUANTIZED_INDEX_DIR}")
+    return _quantized_index
+
+
+def get_lexical_index() -> Optional["LexicalIndex"]:
+    """The memory-mapped BM25 index, or None if it is disabled or not built."""
+    global _lexical_index, _lexical_loaded
+    if not _lexical_loaded:
+        with _lock:
+            if not _lexical_loaded:
+                if KB_HYBRID:
+                    from app.agents.lexical_index import LEXICAL_INDEX_DIR, LexicalIndex
+
+                    try:
+                        _lexical_index = LexicalIndex(LEXICAL_INDEX_DIR)
+                        logger.info(f"Loaded lexical index from {LEXICAL_INDEX_DIR}")
+                    except Exception as e:
+                        logger.warning(f"Lexical index unavailable, using vector search only: {e}")
+                _lexical_loaded = True
+    return _lexical_index
+
+
+def canonical_source(source: Optional[str]) -> Optional[str]:
+    """The indexed `source` value for a filter, mapping aliases like "ircc"."""
+    if not source:
+        return None
+    source = source.strip().lower()
+    return SOURCE_ALIASES.get(source, source)
+
+
+def metadata_filter(language: Optional[str] = None, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Chroma `where` clause for the optional language/source filters."""
+    source = canonical_source(source)
+    clauses = []
+    if language:
+        clauses.append({"language": language.lower()})
+    if source:
+        clauses.append({"source": source.lower()})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def vector_search(
+    query: str,
+    k: int = 5,
+    language: Optional[str] = None,
+    source: Optional[str] = None,
+    min_relevance: float = KB_MIN_RELEVANCE,
+) -> List[KnowledgeChunk]:
+    """Top-k chunks by embedding similarity, dropping weak matches."""
+    if KB_VECTOR_BACKEND != "chroma":
+        return _quantized_search(query, k, language, source, min_relevance)
+
+    hits = get_vectorstore().similarity_search_with_score(query, k=k, filter=metadata_filter(language, source))
+
+    chunks = []
+    for doc, distance in hits:
+        # Chroma's default space is squared L2; MiniLM vectors are unit length
+        score = 1.0 - distance / 2.0
+        if score < min_relevance:
+            continue
+        meta = doc.metadata
+        chunks.append(KnowledgeChunk(
+            id=str(meta.get("id", "")),
+            content=doc.page_content,
+            url=meta.get("url", ""),
+            title=meta.get("title", ""),
+            language=meta.get("language", ""),
+            source=meta.get("source", ""),
+            score=round(float(score), 3),
+        ))
+    return chunks
+
+
+def _quantized_search(query, k, language, source, min_relevance) -> List[KnowledgeChunk]:
+    index = get_quantized_index()
+    chunks = []
+    for hit in index.search(get_embeddings().embed_query(query), k=k, language=language, source=source):
+        if hit.score < min_relevance:
+            continue
+        record = index.document(hit.row)
+        chunks.append(KnowledgeChunk(
+            id=record["id"],
+            content=record["content"],
+            url=record["url"],
+            title=record["title"],
+            language=record["language"],
+            source=record["source"],
+            score=round(hit.score, 3),
+        ))
+    return chunks
+
+
+def lexical_search(
+    query: str,
+    k: int = 5,
+    language: Optional[str] = None,
+    source: Optional[str] = None,
+) -> List[KnowledgeChunk]:
+    """Top-k chunks by BM25; empty if the lexical index is not available."""
+    index = get_lexical_index()
+    if index is None:
+        return []
+
+    chunks = []
+    for hit in index.search(query, k=k, language=language, source=source):
+        record = index.document(hit.doc)
+        chunks.append(KnowledgeChunk(
+            id=str(record.get("id", "")),
+            content=record.get("content", ""),
+            url=record.get("url", ""),
+            title=record.get("title", ""),
+            language=record.get("language", ""),
+            source=record.get("source", ""),
+            score=round(hit.score, 3),
+        ))
+    return chunks
+
+
+def reciprocal_rank_fusion(rankings: List[List[KnowledgeChunk]], k: int, rrf_k: int = RRF_K) -> List[KnowledgeChunk]:
+    """Merge ranked lists by sum of 1 / (rrf_k + rank), keyed on chunk id."""
+    fused: Dict[str, float] = {}
+    chunks: Dict[str, KnowledgeChunk] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, 1):
+            key = chunk.id or f"{chunk.url}#{hash(chunk.content)}"
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            chunks.setdefault(key, chunk)
+
+    best = sorted(fused, key=fused.get, reverse=True)[:k]
+    return [chunks[key]._replace(score=round(fused[key], 4)) for key in best]
+
+
+def search_knowledge_base(
+    query: str,
+    k: int = 5,
+    language: Optional[str] = None,
+    source: Optional[str] = None,
+    min_relevance: float = KB_MIN_RELEVANCE,
+) -> List[KnowledgeChunk]:
+    """
+    Top-k chunks for `query`, best first. With the lexical index available,
+    vector and BM25 candidates are fused with reciprocal rank fusion, so
+    exact tokens like "IMM 5257" or "NOC 73300" surface even when the
+    embedding misses them. Either retriever alone is used if the other is
+    unavailable.
+    """
+    k = max(1, min(int(k), KB_MAX_K))
+    source = canonical_source(source)
+    lexical = lexical_search(query, k * CANDIDATES_PER_K, language, source)
+    if not lexical:
+        return vector_search(query, k, language, source, min_relevance)
+
+    try:
+        vector = vector_search(query, k * CANDIDATES_PER_K, language, source, min_relevance)
+    except Exception as e:
+        logger.warning(f"Vector search failed, using lexical results only: {e}")
+        vector = []
+    return reciprocal_rank_fusion([vector, lexical], k)
+
+
+def format_chunks(query: str, chunks: List[KnowledgeChunk]) -> str:
+    """Markdown rendering of search results with numbered URL citations."""
+    if not chunks:
+        return f"No relevant passages found in the local knowledge base for: {query}"
+
+    lines = [f"**Knowledge base results for:** {query}", ""]
+    for i, chunk in enumerate(chunks, 1):
+        lines.append(f"[{i}] {chunk.title} (score {chunk.score:.3g})")
+        lines.append(chunk.content.strip())
+        lines.append(f"Source: {chunk.url}")
+        lines.append("")
+    return "\n".join(lines).rstrip()
+
+
+# === AGENT TOOL ===
+def search_immigration_knowledge_base(
+    query: str,
+    k: int = 5,
+    language: Optional[str] = None,
+    source: Optional[str] = None,
+) -> str:
+    """
+    Search the local index of IRCC and CanadaVisa pages. Fast (no network);
+    use it before web search for program rules, definitions and procedures.
+
+    Args:
+        query: Natural-language question or keywords
+        k: Number of passages to return (1-20)
+        language: Only return passages in this language code (e.g. "en", "fr")
+        source: Only return passages from this source: "ircc_gov" or "canadavisa"
+
+    Returns:
+        Matching passages, each with its title and source URL to cite
+    """
+    try:
+        return format_chunks(query, search_knowledge_base(query, k=k, language=language, source=source))
+    except Exception as e:
+        logger.error(f"Knowledge base search failed: {e}", exc_info=True)
+        return f"Knowledge base unavailable ({e}); use web search instead."
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    print(search_immigration_knowledge_base(" ".join(sys.argv[1:]) or "study permit proof of funds"))
@@ -0,0 +1,300 @@
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CHUNKS_DIR = Path(__file__).resolve().parents[2] / "data" / "chunks"
+LEXICAL_INDEX_DIR = Path(os.getenv(
+    "KB_LEXICAL_DIR",
+    Path(__file__).resolve().parents[2] / "data" / "embeddings" / "bm25",
+))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# ============================================================================
+# TOKENIZER
+# ============================================================================
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Immigration codes that embeddings blur together: IMM 5257, NOC 73300, CLB 7, TEER 1 ...
+_CODE_PREFIXES = r"imm|noc|clb|nclc|teer|cic|irm|bsf|emp|cit|pgwp|ee"
+_SPACED_CODE_RE = re.compile(rf"\b({_CODE_PREFIXES})\s*[- ]\s*(\d+)([a-z]?)\b")
+_JOINED_CODE_RE = re.compile(rf"^({_CODE_PREFIXES})(\d+)([a-z]?)$")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have if in is it its of on or that the this to was were will with "
+    "you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens without stopwords, plus joined forms of codes so
+    "IMM 5257", "imm-5257" and "IMM5257E" all share the token "imm5257".
+    """
+    text = text.lower()
+    tokens = [t for t in _WORD_RE.findall(text) if t not in STOPWORDS]
+
+    extra = []
+    for prefix, number, suffix in _SPACED_CODE_RE.findall(text):
+        extra.append(prefix + number)
+        if suffix:
+            extra.append(prefix + number + suffix)
+    for token in tokens:
+        match = _JOINED_CODE_RE.match(token)
+        if match:
+            prefix, number, suffix = match.groups()
+            extra.extend((prefix, number))
+            if suffix:
+                extra.append(prefix + number)
+    return tokens + extra
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _file_fingerprint(path: Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _is_store(path: Path) -> bool:
+    return path.suffix == ".parquet"
+
+
+def default_chunk_files() -> List[Path]:
+    """Chunk corpus stores (scrapers/corpus_store.py) if present, else the JSONL files."""
+    return sorted(CHUNKS_DIR.glob("*.parquet")) or sorted(CHUNKS_DIR.glob("*.jsonl"))
+
+
+def _iter_chunks(path: Path):
+    """(position, record) per chunk: byte offset in JSONL, row number in a store; record None if unreadable."""
+    if _is_store(path):
+        from scrapers.corpus_store import CorpusStore
+
+        row = 0
+        for batch in CorpusStore(path).scan(columns=["title", "content", "language", "source"]):
+            for record in batch.to_pylist():
+                yield row, record if record["content"] is not None else None
+                row += 1
+        return
+
+    with open(path, "rb") as f:
+        offset = 0
+        for raw in iter(f.readline, b""):
+            line_offset, offset = offset, offset + len(raw)
+            try:
+                data = json.loads(raw)
+                data["content"]
+            except Exception:
+                data = None
+            yield line_offset, data
+
+
+def build_lexical_index(chunk_files: Sequence[Path], out_dir: Path = LEXICAL_INDEX_DIR) -> Dict:
+    """
+    Build a BM25 index over chunk JSONL files or corpus stores into `out_dir`.
+
+    Postings are stored as flat numpy arrays (term offsets, doc ids, term
+    frequencies) that LexicalIndex memory-maps. Documents are not copied:
+    each doc row points at its position (file index, byte offset or row)
+    in the source chunk files.
+    """
+    t0 = time.perf_counter()
+    chunk_files = [Path(p) for p in chunk_files]
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    vocab: Dict[str, int] = {}
+    post_terms, post_docs, post_tfs = array("I"), array("I"), array("H")
+    doc_len, doc_file, doc_offset = array("I"), array("B"), array("q")
+    doc_language, doc_source = array("B"), array("B")
+    languages: Dict[str, int] = {}
+    sources: Dict[str, int] = {}
+    skipped = 0
+
+    for file_no, path in enumerate(chunk_files):
+        for position, data in _iter_chunks(path):
+            if data is None:
+                skipped += 1
+                continue
+
+            doc_id = len(doc_len)
+            counts = Counter(tokenize(f"{data.get('title') or ''} {data['content']}"))
+            for term, tf in counts.items():
+                post_terms.append(vocab.setdefault(term, len(vocab)))
+                post_docs.append(doc_id)
+                post_tfs.append(min(tf, 65535))
+
+            doc_len.append(sum(counts.values()))
+            doc_file.append(file_no)
+            doc_offset.append(position)
+            doc_language.append(languages.setdefault(str(data.get("language") or "").lower(), len(languages)))
+            doc_source.append(sources.setdefault(str(data.get("source") or "").lower(), len(sources)))
+
+    # Group postings by term; a stable sort keeps doc ids ascending per term
+    terms = np.frombuffer(post_terms, dtype=np.uint32)
+    order = np.argsort(terms, kind="stable")
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=len(vocab)), out=offsets[1:])
+
+    np.save(out_dir / "postings_offsets.npy", offsets)
+    np.save(out_dir / "postings_docs.npy", np.frombuffer(post_docs, dtype=np.uint32)[order])
+    np.save(out_dir / "postings_tf.npy", np.frombuffer(post_tfs, dtype=np.uint16)[order])
+    np.save(out_dir / "doc_len.npy", np.frombuffer(doc_len, dtype=np.uint32))
+    np.save(out_dir / "doc_file.npy", np.frombuffer(doc_file, dtype=np.uint8))
+    np.save(out_dir / "doc_offset.npy", np.frombuffer(doc_offset, dtype=np.int64))
+    np.save(out_dir / "doc_language.npy", np.frombuffer(doc_language, dtype=np.uint8))
+    np.save(out_dir / "doc_source.npy", np.frombuffer(doc_source, dtype=np.uint8))
+    with open(out_dir / "terms.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+
+    n_docs = len(doc_len)
+    meta = {
+        "num_docs": n_docs,
+        "num_terms": len(vocab),
+        "num_postings": len(post_docs),
+        "avg_doc_len": (sum(doc_len) / n_docs) if n_docs else 0.0,
+        "files": [{"path": str(p.resolve()), "fingerprint": _file_fingerprint(p)} for p in chunk_files],
+        "languages": list(languages),
+        "sources": list(sources),
+        "skipped_lines": skipped,
+        "build_seconds": round(time.perf_counter() - t0, 3),
+    }
+    with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+class LexicalHit(NamedTuple):
+    doc: int
+    score: float
+
+
+class LexicalIndex:
+    """Read-only BM25 index; arrays are memory-mapped and shared via the page cache."""
+
+    def __init__(self, index_dir: Path = LEXICAL_INDEX_DIR):
+        index_dir = Path(index_dir)
+        with open(index_dir / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(index_dir / "terms.txt", "r", encoding="utf-8") as f:
+            self.vocab = {term: i for i, term in enumerate(f.read().split("\n"))} if self.meta["num_terms"] else {}
+
+        def load(name):
+            return np.load(index_dir / f"{name}.npy", mmap_mode="r")
+
+        self.offsets = load("postings_offsets")
+        self.docs = load("postings_docs")
+        self.tfs = load("postings_tf")
+        self.doc_len = load("doc_len")
+        self.doc_file = load("doc_file")
+        self.doc_offset = load("doc_offset")
+        self.doc_language = load("doc_language")
+        self.doc_source = load("doc_source")
+        self.num_docs = self.meta["num_docs"]
+        self.avg_doc_len = self.meta["avg_doc_len"] or 1.0
+
+        self._files = []
+        for entry in self.meta["files"]:
+            path = Path(entry["path"])
+            if not path.exists() or _file_fingerprint(path) != entry["fingerprint"]:
+                raise ValueError(f"{path} changed since the lexical index was built; rebuild it")
+            if _is_store(path):
+                from scrapers.corpus_store import CorpusStore
+
+                self._files.append(CorpusStore(path))
+                continue
+            with open(path, "rb") as f:
+                self._files.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _code(self, values: List[str], value: Optional[str]) -> Optional[int]:
+        if not value:
+            return None
+        try:
+            return values.index(value.lower())
+        except ValueError:
+            return -1
+
+    def search(self, query: str, k: int = 10, language: Optional[str] = None,
+               source: Optional[str] = None) -> List[LexicalHit]:
+        """Top-k documents by BM25, best first."""
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or not self.num_docs:
+            return []
+
+        doc_parts, score_parts = [], []
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = np.asarray(self.docs[start:end])
+            tf = np.asarray(self.tfs[start:end], dtype=np.float32)
+            df = end - start
+            idf = math.log(1.0 + (self.num_docs - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * np.asarray(self.doc_len[docs], dtype=np.float32) / self.avg_doc_len)
+            doc_parts.append(docs)
+            score_parts.append(idf * tf * (BM25_K1 + 1.0) / (tf + norm))
+
+        candidates, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+        language_code = self._code(self.meta["languages"], language)
+        source_code = self._code(self.meta["sources"], source)
+        if language_code is not None or source_code is not None:
+            mask = np.ones(len(candidates), dtype=bool)
+            if language_code is not None:
+                mask &= np.asarray(self.doc_language[candidates]) == language_code
+            if source_code is not None:
+                mask &= np.asarray(self.doc_source[candidates]) == source_code
+            candidates, scores = candidates[mask], scores[mask]
+
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [LexicalHit(int(candidates[i]), float(scores[i])) for i in order]
+
+    def document(self, doc: int) -> Dict:
+        """The chunk record for a doc, read from its source file."""
+        source = self._files[self.doc_file[doc]]
+        if not isinstance(source, mmap.mmap):
+            record = source.row(int(self.doc_offset[doc]))
+            return {k: v for k, v in record.items() if v is not None}
+        mm = source
+        start = int(self.doc_offset[doc])
+        end = mm.find(b"\n", start)
+        return json.loads(mm[start: end if end != -1 else len(mm)])
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        files = [Path(p) for p in sys.argv[2:]] or default_chunk_files()
+        print(json.dumps(build_lexical_index(files), indent=2))
+    else:
+        index = LexicalIndex()
+        query = " ".join(sys.argv[1:]) or "IMM 5257"
+        t0 = time.perf_counter()
+        hits = index.search(query, k=5)
+        print(f"{len(hits)} hits in {(time.perf_counter() - t0) * 1000:.2f} ms")
+        for hit in hits:
+            record = index.document(hit.doc)
+            print(f"{hit.score:7.3f}  {record.get('title', '')}  {record.get('url', '')}")
@@ -0,0 +1,380 @@
+import json
+import logging
+import math
+import mmap
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_INDEX_DIR = Path(os.getenv(
+    "KB_QUANTIZED_DIR",
+    Path(__file__).resolve().parents[2] / "data" / "embeddings" / "quantized",
+))
+
+QUANTIZED_MODES = ("int8", "binary")
+# float32 re-scoring over k * this many first-pass candidates; sign bits
+# keep far less of the geometry than int8, so binary needs a wider net
+RESCORE_FACTOR = {"int8": 10, "binary": 50}
+BLOCK_ROWS = 4096     # rows scored per step in the first pass (4096 x 384 int8 = 1.5 MB)
+EXPORT_PAGE = 5000
+
+# Coarse partition (IVF): rows are grouped under their nearest of about
+# sqrt(N) centroids and a query only scores the rows of the closest lists
+IVF_NPROBE = int(os.getenv("KB_QUANTIZED_NPROBE", "32"))
+IVF_TRAIN_ITERATIONS = 10
+IVF_TRAIN_SAMPLE = 64     # k-means training rows per list
+IVF_MAX_LISTS = 16384
+
+# popcount of every byte value, for Hamming distance on packed sign bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# ============================================================================
+# BUILD (export from the Chroma collection)
+# ============================================================================
+
+def build_quantized_index(persist_dir: Path, collection_name: str, out_dir: Path = QUANTIZED_INDEX_DIR) -> Dict:
+    """
+    Export every vector of a Chroma collection into memory-mappable files:
+
+      vectors_f32.npy   N x d float32, only read for re-scoring candidates
+      vectors_i8.npy    N x d int8, symmetric per-dimension scales in scales.npy
+      vectors_bin.npy   N x d/8 uint8, packed sign bits
+      docs.jsonl        id, content, url, title, language, source per row
+      doc_offsets.npy   byte offset of each row in docs.jsonl
+      doc_language.npy / doc_source.npy   uint8 codes for filters
+
+    plus the quantized matrices and coarse partition written by
+    write_quantized_matrices.
+    """
+    import chromadb
+
+    t0 = time.perf_counter()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    collection = chromadb.PersistentClient(path=str(persist_dir)).get_collection(collection_name)
+    total = collection.count()
+
+    vectors = None
+    offsets = np.zeros(total, dtype=np.int64)
+    doc_language = np.zeros(total, dtype=np.uint8)
+    doc_source = np.zeros(total, dtype=np.uint8)
+    languages: Dict[str, int] = {}
+    sources: Dict[str, int] = {}
+
+    row = 0
+    with open(out_dir / "docs.jsonl", "wb") as docs:
+        while row < total:
+            page = collection.get(limit=EXPORT_PAGE, offset=row, include=["embeddings", "documents", "metadatas"])
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            if not len(embeddings):
+                break
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(
+                    out_dir / "vectors_f32.npy", mode="w+", dtype=np.float32, shape=(total, embeddings.shape[1])
+                )
+            vectors[row: row + len(embeddings)] = embeddings
+
+            for i, (chunk_id, text, meta) in enumerate(zip(page["ids"], page["documents"], page["metadatas"])):
+                meta = meta or {}
+                language = str(meta.get("language", "")).lower()
+                source = str(meta.get("source", "")).lower()
+                offsets[row + i] = docs.tell()
+                doc_language[row + i] = languages.setdefault(language, len(languages))
+                doc_source[row + i] = sources.setdefault(source, len(sources))
+                record = {"id": str(meta.get("id", chunk_id)), "content": text, "url": meta.get("url", ""),
+                          "title": meta.get("title", ""), "language": language, "source": source}
+                docs.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            row += len(embeddings)
+
+    if vectors is None:
+        raise ValueError(f"Collection {collection_name} in {persist_dir} is empty")
+    vectors.flush()
+
+    np.save(out_dir / "doc_offsets.npy", offsets)
+    np.save(out_dir / "doc_language.npy", doc_language)
+    np.save(out_dir / "doc_source.npy", doc_source)
+
+    meta = {
+        "num_vectors": int(len(vectors)),
+        "dim": int(vectors.shape[1]),
+        "collection": collection_name,
+        "persist_dir": str(Path(persist_dir).resolve()),
+        "languages": list(languages),
+        "sources": list(sources),
+        **write_quantized_matrices(vectors, out_dir),
+        "build_seconds": round(time.perf_counter() - t0, 3),
+    }
+    with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def _normalized(block: np.ndarray) -> np.ndarray:
+    return block / np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+
+
+def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = _normalized(np.asarray(vectors[start: start + BLOCK_ROWS], dtype=np.float32))
+        assignments[start: start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(vectors: np.ndarray, n_lists: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the rows: n_lists unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    n_sample = min(len(vectors), n_lists * IVF_TRAIN_SAMPLE)
+    sample = _normalized(np.asarray(vectors[np.sort(rng.choice(len(vectors), n_sample, replace=False))],
+                                    dtype=np.float32))
+    centroids = sample[rng.choice(n_sample, n_lists, replace=False)]
+    for _ in range(IVF_TRAIN_ITERATIONS):
+        assignments = _nearest_centroid(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=n_lists) == 0
+        sums[empty] = sample[rng.choice(n_sample, int(empty.sum()))]  # re-seed lists that lost every row
+        centroids = _normalized(sums)
+    return centroids
+
+
+def write_quantized_matrices(vectors: np.ndarray, out_dir: Path) -> Dict:
+    """
+    Write the first-pass files for an N x d float32 matrix (usually the
+    vectors_f32.npy map) and return their meta.json entries:
+
+      ivf_centroids.npy  n_lists x d float32, unit length
+      ivf_offsets.npy    n_lists + 1 positions: list i is [offsets[i], offsets[i+1])
+      ivf_rows.npy       original row of each position
+      vectors_i8.npy / vectors_bin.npy   in position order, so every list
+                         is one contiguous slice of the map
+      scales.npy         symmetric per-dimension int8 scales
+    """
+    out_dir = Path(out_dir)
+    n_lists = max(1, min(IVF_MAX_LISTS, int(math.sqrt(len(vectors)))))
+    centroids = train_centroids(vectors, n_lists)
+    assignments = _nearest_centroid(vectors, centroids)
+    rows = np.argsort(assignments, kind="stable")
+    list_offsets = np.searchsorted(assignments[rows], np.arange(n_lists + 1)).astype(np.int64)
+
+    # Per-dimension symmetric int8 quantization
+    scales = np.maximum(np.abs(vectors).max(axis=0), 1e-12) / 127.0
+    quantized = np.lib.format.open_memmap(out_dir / "vectors_i8.npy", mode="w+", dtype=np.int8, shape=vectors.shape)
+    bits = np.lib.format.open_memmap(
+        out_dir / "vectors_bin.npy", mode="w+", dtype=np.uint8, shape=(len(vectors), (vectors.shape[1] + 7) // 8)
+    )
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = np.asarray(vectors[rows[start: start + BLOCK_ROWS]])
+        quantized[start: start + len(block)] = np.clip(np.rint(block / scales), -127, 127).astype(np.int8)
+        bits[start: start + len(block)] = np.packbits(block > 0, axis=1)
+    quantized.flush()
+    bits.flush()
+
+    np.save(out_dir / "scales.npy", scales.astype(np.float32))
+    np.save(out_dir / "ivf_centroids.npy", centroids.astype(np.float32))
+    np.save(out_dir / "ivf_offsets.npy", list_offsets)
+    np.save(out_dir / "ivf_rows.npy", rows.astype(np.int64))
+    sizes = np.diff(list_offsets)
+    return {"ivf_lists": n_lists, "ivf_largest_list": int(sizes.max())}
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+class QuantizedHit(NamedTuple):
+    row: int
+    score: float  # exact cosine similarity (float32 re-score)
+
+
+class QuantizedIndex:
+    """
+    Read-only vector index over memory-mapped quantized matrices. Every
+    Streamlit worker maps the same files, so the OS page cache holds one
+    copy instead of one HNSW graph per process.
+
+    A query ranks the coarse centroids, scores the quantized rows of the
+    `nprobe` closest lists and re-scores the best of those in float32, so
+    its cost grows with about nprobe * sqrt(N) rows rather than N.
+    """
+
+    def __init__(self, index_dir: Path = QUANTIZED_INDEX_DIR, mode: str = "int8", nprobe: int = IVF_NPROBE):
+        if mode not in QUANTIZED_MODES:
+            raise ValueError(f"Unknown quantized mode {mode!r}; expected one of {QUANTIZED_MODES}")
+        index_dir = Path(index_dir)
+        with open(index_dir / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.mode = mode
+        self.nprobe = max(1, int(nprobe))
+
+        def load(name):
+            return np.load(index_dir / f"{name}.npy", mmap_mode="r")
+
+        self.vectors = load("vectors_f32")
+        self.quantized = load("vectors_i8") if mode == "int8" else load("vectors_bin")
+        self.scales = np.load(index_dir / "scales.npy")
+        self.doc_offsets = load("doc_offsets")
+        self.doc_language = load("doc_language")
+        self.doc_source = load("doc_source")
+        if (index_dir / "ivf_centroids.npy").exists():
+            self.centroids = np.load(index_dir / "ivf_centroids.npy")
+            self.list_offsets = np.load(index_dir / "ivf_offsets.npy")
+            self.list_rows = load("ivf_rows")
+        else:
+            # Exports from before the coarse partition: one list, positions are rows
+            logger.warning(f"{index_dir} has no IVF partition; every query scans all rows. Re-run the export.")
+            self.centroids = None
+            self.list_offsets = np.array([0, len(self.quantized)], dtype=np.int64)
+            self.list_rows = None
+        with open(index_dir / "docs.jsonl", "rb") as f:
+            self._docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _filter_codes(self, language: Optional[str], source: Optional[str]) -> List[Tuple[np.ndarray, int]]:
+        codes = []
+        for values, column, wanted in (
+            (self.meta["languages"], self.doc_language, language),
+            (self.meta["sources"], self.doc_source, source),
+        ):
+            if wanted:
+                codes.append((column, values.index(wanted.lower()) if wanted.lower() in values else -1))
+        return codes
+
+    def _rows(self, positions: np.ndarray) -> np.ndarray:
+        return positions if self.list_rows is None else np.asarray(self.list_rows[positions])
+
+    def _approximate_scores(self, start: int, end: int, query: np.ndarray) -> np.ndarray:
+        """
+        First-pass scores for positions [start, end), block by block.
+        int8 rows are dotted with an int8 copy of the query in int32, so
+        no block is widened to float32.
+        """
+        scores = np.empty(end - start, dtype=np.float32)
+        for block_start in range(start, end, BLOCK_ROWS):
+            block = self.quantized[block_start: min(block_start + BLOCK_ROWS, end)]
+            if self.mode == "int8":
+                block_scores = np.einsum("ij,j->i", block, query, dtype=np.int32)
+            else:
+                block_scores = -_POPCOUNT[np.bitwise_xor(block, query)].sum(axis=1, dtype=np.int32)
+            scores[block_start - start: block_start - start + len(block)] = block_scores
+        return scores
+
+    def _first_pass_query(self, query: np.ndarray) -> np.ndarray:
+        if self.mode == "binary":
+            return np.packbits(query > 0)
+        weights = query * self.scales
+        return np.clip(np.rint(weights * (127.0 / (np.abs(weights).max() or 1.0))), -127, 127).astype(np.int8)
+
+    def search(self, query_vector, k: int = 5, language: Optional[str] = None,
+               source: Optional[str] = None) -> List[QuantizedHit]:
+        """Top-k rows by cosine similarity: closest lists, quantized first pass, float32 re-score."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        first_pass = self._first_pass_query(query)
+        codes = self._filter_codes(language, source)
+        if any(code == -1 for _, code in codes):
+            return []  # no row has that language/source
+        n_candidates = k * RESCORE_FACTOR[self.mode]
+
+        if self.centroids is None:
+            ranked_lists = np.zeros(1, dtype=np.int64)
+        else:
+            ranked_lists = np.argsort(-(self.centroids @ query), kind="stable")
+
+        # Probe the closest lists; with filters, keep probing until enough rows pass them
+        positions, scores, kept = [], [], 0
+        for probed, list_id in enumerate(ranked_lists):
+            if probed >= self.nprobe and kept >= n_candidates:
+                break
+            start, end = int(self.list_offsets[list_id]), int(self.list_offsets[list_id + 1])
+            if start == end:
+                continue
+            list_positions = np.arange(start, end)
+            list_scores = self._approximate_scores(start, end, first_pass)
+            if codes:
+                rows = self._rows(list_positions)
+                mask = np.ones(len(rows), dtype=bool)
+                for column, code in codes:
+                    mask &= np.asarray(column[rows]) == code
+                list_positions, list_scores = list_positions[mask], list_scores[mask]
+            positions.append(list_positions)
+            scores.append(list_scores)
+            kept += len(list_positions)
+        if not kept:
+            return []
+
+        positions, scores = np.concatenate(positions), np.concatenate(scores)
+        n_candidates = min(len(scores), n_candidates)
+        candidates = self._rows(positions[np.argpartition(-scores, n_candidates - 1)[:n_candidates]])
+
+        candidates.sort()  # sequential reads from the float32 map
+        rows = np.asarray(self.vectors[candidates])
+        exact = (rows @ query) / np.maximum(np.linalg.norm(rows, axis=1), 1e-12)
+        top = np.argsort(-exact, kind="stable")[:k]
+        return [QuantizedHit(int(candidates[i]), float(exact[i])) for i in top]
+
+    def document(self, row: int) -> Dict:
+        start = int(self.doc_offsets[row])
+        end = self._docs.find(b"\n", start)
+        return json.loads(self._docs[start: end if end != -1 else len(self._docs)])
+
+
+def benchmark(index: QuantizedIndex, n_queries: int = 100, k: int = 10, seed: int = 0) -> Dict:
+    """
+    Latency, recall@k against an exact float32 scan, and peak RSS, using
+    stored vectors plus a little noise as queries.
+    """
+    import resource
+
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index.vectors), min(n_queries, len(index.vectors)), replace=False)
+    queries = np.asarray(index.vectors[np.sort(rows)]) + rng.normal(0, 0.02, (len(rows), index.vectors.shape[1]))
+    queries = _normalized(queries.astype(np.float32))
+
+    index.search(queries[0], k=k)  # map the centroids and offsets before timing
+    latencies, hits = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        hits.append({hit.row for hit in index.search(query, k=k)})
+        latencies.append((time.perf_counter() - t0) * 1000)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    recall = []
+    for query, found in zip(queries, hits):
+        exact = np.concatenate([
+            (_normalized(np.asarray(index.vectors[start: start + BLOCK_ROWS * 16])) @ query)
+            for start in range(0, len(index.vectors), BLOCK_ROWS * 16)
+        ])
+        recall.append(len(found & set(np.argpartition(-exact, k - 1)[:k].tolist())) / k)
+    return {
+        "mode": index.mode,
+        "num_vectors": len(index.vectors),
+        "ivf_lists": len(index.list_offsets) - 1,
+        "nprobe": index.nprobe,
+        f"recall@{k}": round(float(np.mean(recall)), 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from app.agents.knowledge_base import KB_COLLECTION, KB_PERSIST_DIR
+
+    logging.basicConfig(level=logging.INFO)
+    # python -m app.agents.quantized_index                  export the Chroma collection
+    # python -m app.agents.quantized_index bench [int8|binary] [queries]
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        mode = sys.argv[2] if len(sys.argv) > 2 else "int8"
+        n_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        print(json.dumps(benchmark(QuantizedIndex(QUANTIZED_INDEX_DIR, mode=mode), n_queries), indent=2))
+    else:
+        print(json.dumps(build_quantized_index(KB_PERSIST_DIR, KB_COLLECTION), indent=2))
@@ -0,0 +1,81 @@
+import os
+import threading
+from typing import Dict, Any, Optional
+
+from agno.db.postgres import PostgresDb
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+# Pool settings (per process). Keep pool_size + max_overflow times the
+# number of Streamlit workers below Postgres max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+_lock = threading.Lock()
+_engine: Optional[Engine] = None
+_db: Optional[PostgresDb] = None
+_stats = {"checkouts": 0, "peak_checked_out": 0}
+
+
+def _track_checkout(*_args) -> None:
+    _stats["checkouts"] += 1
+    _stats["peak_checked_out"] = max(_stats["peak_checked_out"], _engine.pool.checkedout())
+
+
+def get_engine() -> Engine:
+    """Process-wide SQLAlchemy engine with a bounded connection pool."""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                engine = create_engine(
+                    os.getenv("DATABASE_URL"),
+                    pool_size=DB_POOL_SIZE,
+                    max_overflow=DB_MAX_OVERFLOW,
+                    pool_recycle=DB_POOL_RECYCLE,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    pool_pre_ping=True,
+                )
+                event.listen(engine, "checkout", _track_checkout)
+                _engine = engine
+    return _engine
+
+
+def get_db() -> PostgresDb:
+    """Shared agno PostgresDb used by every agent in this process."""
+    global _db
+    if _db is None:
+        engine = get_engine()
+        with _lock:
+            if _db is None:
+                _db = PostgresDb(
+                    db_engine=engine,
+                    memory_table=os.getenv("AGNO_MEMORY_TABLE", "agno_memories"),
+                )
+    return _db
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Connection pool utilization for the shared engine."""
+    if _engine is None:
+        return {"initialized": False}
+
+    pool = _engine.pool
+    checked_out = pool.checkedout()
+    capacity = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    return {
+        "initialized": True,
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "utilization": round(checked_out / capacity, 3) if capacity else 0.0,
+        "peak_checked_out": _stats["peak_checked_out"],
+        "total_checkouts": _stats["checkouts"],
+    }
@@ -14,7 +14,6 @@ from pathlib import Path
 from agno.tools import tool
 import os
 import sys
-from agno.db.postgres import PostgresDb
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from supabase import create_client, Client
@@ -23,10 +22,12 @@ import logging
 import re
 import unicodedata
 import json
+from functools import lru_cache
 
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2])) 
 from config import GENERATED_FILES_DIR_STR as GENERATED_FILES_DIR
+from app.agents.shared_db import get_db
 
 load_dotenv()
 
@@ -34,19 +35,21 @@ logger = logging.getLogger(__name__)
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+@lru_cache(maxsize=1)
+def get_supabase() -> Client:
+    """Create the Supabase client on first upload rather than at import."""
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
 
 class SOPAgentResponse(BaseModel):
     reply: str
     files: Optional[List[str]] = Field(default_factory=list)
 
-db = PostgresDb(
-    db_url=os.getenv("DATABASE_URL"),
-    memory_table=os.getenv("AGNO_MEMORY_TABLE", "agno_memories"),
-)
-
 # --------------- Typography helpers ---------------
 
+@lru_cache(maxsize=1)
 def _register_fonts():
     """Register a Unicode-friendly font; fallback to Helvetica if missing."""
     try:
@@ -57,8 +60,6 @@ def _register_fonts():
     except Exception:
         return "Helvetica", "Helvetica-Bold"
 
-BASE_FONT, BASE_FONT_BOLD = _register_fonts()
-
 def normalize_punctuation(text: str) -> str:
     """Fix smart quotes/dashes/NBSP and other glyphs that render as squares."""
     if not text:
@@ -88,6 +89,7 @@ def preprocess(text: str) -> str:
     return markdown_to_html_minimal(normalize_punctuation(text))
 
 def get_sop_stylesheet():
+    BASE_FONT, BASE_FONT_BOLD = _register_fonts()
     styles = getSampleStyleSheet()
     # base
     styles["Normal"].fontName = BASE_FONT
@@ -178,7 +180,7 @@ def generate_professional_pdf(
 
         def add_header_footer(canvas, _doc):
             canvas.saveState()
-            canvas.setFont(BASE_FONT, 9)
+            canvas.setFont(_register_fonts()[0], 9)
             if header_text:
                 canvas.drawString(0.85 * inch, 10.75 * inch, normalize_punctuation(header_text))
             page_num = f"Page {canvas.getPageNumber()}"
@@ -197,6 +199,7 @@ def generate_professional_pdf(
 
         # Upload to Supabase
         storage_path = f"{user_id}/{filename}"
+        supabase = get_supabase()
         supabase.storage.from_("user_documents").upload(
             path=storage_path, file=pdf_bytes,
             file_options={"content-type": "application/pdf", "upsert": "true"}
@@ -249,30 +252,34 @@ If non-critical info is missing (e.g., full name), use placeholders like `[Your
 
 
 # --- Create the Agent ---
-sop_agent = Agent(
-    model=Groq(id="openai/gpt-oss-120b"),
-    parser_model=Gemini(id="gemini-2.0-flash"),
-    db=db,
-    enable_agentic_memory = True,
-    add_history_to_context=True,
-    read_chat_history=True,
-    num_history_runs=3,
-    search_session_history=True,
-    add_memories_to_context=True,
-    tools=[
-        generate_professional_pdf,
-    ],
-    role="You are a universal document drafting expert for admissions and immigration.",
-    name="Universal_Doc_Agent",
-    instructions=universal_instructions_concise,
-    markdown=False,
-    output_schema=SOPAgentResponse,
-)
+def build_sop_agent() -> Agent:
+    """Construct the document drafting agent with its DB, models and tools."""
+    db = get_db()
+
+    return Agent(
+        model=Groq(id="openai/gpt-oss-120b"),
+        parser_model=Gemini(id="gemini-2.0-flash"),
+        db=db,
+        enable_agentic_memory = True,
+        add_history_to_context=True,
+        read_chat_history=True,
+        num_history_runs=3,
+        search_session_history=True,
+        add_memories_to_context=True,
+        tools=[
+            generate_professional_pdf,
+        ],
+        role="You are a universal document drafting expert for admissions and immigration.",
+        name="Universal_Doc_Agent",
+        instructions=universal_instructions_concise,
+        markdown=False,
+        output_schema=SOPAgentResponse,
+    )
 
 import json
 # --- Example Run ---
 if __name__ == "__main__":    
-    res = sop_agent.run("""
+    res = build_sop_agent().run("""
     Write a Statement of Purpose for Ananya Singh, a 24-year-old Indian applicant with a B.Tech in Computer Science from IIT Delhi, 
     applying for MSc Computer Science at UofT. She has 2 years experience at Infosys as a Software Engineer, strong coding skills,
     and a passion for AI research. She aims to contribute to AI advancements in healthcare post-graduation.
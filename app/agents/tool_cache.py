@@ -0,0 +1,223 @@
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from agno.tools import Toolkit
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Disk cache for web tool results, shared by every agent in this process.
+TOOL_CACHE_PATH = Path(os.getenv(
+    "TOOL_CACHE_PATH",
+    Path(__file__).resolve().parents[2] / "cache" / "tool_cache.sqlite",
+))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "5000"))
+
+# Seconds before an entry is refetched, per tool
+TOOL_CACHE_TTLS = {
+    "google_search": int(os.getenv("TOOL_CACHE_TTL_SEARCH", str(24 * 3600))),
+    "crawl": int(os.getenv("TOOL_CACHE_TTL_CRAWL", str(7 * 24 * 3600))),
+}
+DEFAULT_TTL = 24 * 3600
+
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|mc_cid|mc_eid)$", re.I)
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query."""
+    return " ".join(str(query).lower().split())
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache keys: lowercase scheme/host, no
+    fragment, no tracking params, sorted query string, no trailing slash.
+    """
+    parts = urlsplit(str(url).strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(((parts.scheme or "https").lower(), host, path, query, ""))
+
+
+class ToolCache:
+    """
+    SQLite-backed TTL cache with LRU eviction once `max_entries` is
+    exceeded. Safe to share across threads.
+    """
+
+    def __init__(self, path: Path = TOOL_CACHE_PATH, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache ("
+                " key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_cache_accessed ON tool_cache (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def _count(self, namespace: str, field: str) -> None:
+        stats = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "expired": 0, "evictions": 0})
+        stats[field] += 1
+
+    def get(self, namespace: str, key: str, ttl: int) -> Optional[Any]:
+        """Cached value, or None if missing or older than `ttl` seconds."""
+        full_key = f"{namespace}:{key}"
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at FROM tool_cache WHERE key = ?", (full_key,)).fetchone()
+            if row is None:
+                self._count(namespace, "misses")
+                return None
+            value, created_at = row
+            if now - created_at > ttl:
+                conn.execute("DELETE FROM tool_cache WHERE key = ?", (full_key,))
+                conn.commit()
+                self._count(namespace, "expired")
+                self._count(namespace, "misses")
+                return None
+            conn.execute("UPDATE tool_cache SET accessed_at = ? WHERE key = ?", (now, full_key))
+            conn.commit()
+            self._count(namespace, "hits")
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, namespace, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (f"{namespace}:{key}", namespace, json.dumps(value), now, now),
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM tool_cache WHERE key IN "
+                    "(SELECT key FROM tool_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                for _ in range(overflow):
+                    self._count(namespace, "evictions")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per tool plus the current entry count."""
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM tool_cache").fetchone()[0]
+            tools = {}
+            for namespace, counts in self._stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                tools[namespace] = {**counts, "hit_rate": round(counts["hits"] / lookups, 3) if lookups else 0.0}
+        return {"path": str(self.path), "entries": entries, "max_entries": self.max_entries, "tools": tools}
+
+
+TOOL_CACHE = ToolCache()
+
+
+def _cacheable(value: Any) -> bool:
+    return not (isinstance(value, str) and value.startswith("Error"))
+
+
+def cache_tool(toolkit: Toolkit, method_name: str, key_fn: Callable[..., str], cache: ToolCache = TOOL_CACHE) -> Toolkit:
+    """
+    Re-register `toolkit.<method_name>` behind `cache`. `key_fn` receives
+    the tool call arguments and returns the cache key. The tool keeps its
+    name, signature and docstring, so the model sees no difference.
+    """
+    method = getattr(toolkit, method_name)
+    ttl = TOOL_CACHE_TTLS.get(method_name, DEFAULT_TTL)
+
+    @functools.wraps(method)
+    def cached(*args, **kwargs):
+        key = key_fn(*args, **kwargs)
+        value = cache.get(method_name, key, ttl)
+        if value is not None:
+            logger.info(f"Tool cache hit: {method_name} {key[:80]}")
+            return value
+        value = method(*args, **kwargs)
+        if _cacheable(value):
+            cache.set(method_name, key, value)
+        return value
+
+    toolkit.register(cached, name=method_name)
+    return toolkit
+
+
+def cached_google_search(toolkit: Toolkit, cache: ToolCache = TOOL_CACHE) -> Toolkit:
+    """GoogleSearchTools with results cached on the normalized query."""
+    def key_fn(query: str, max_results: int = 5, language: str = "en") -> str:
+        max_results = toolkit.fixed_max_results or max_results
+        language = toolkit.fixed_language or language
+        return json.dumps([normalize_query(query), max_results, str(language).lower()])
+
+    return cache_tool(toolkit, "google_search", key_fn, cache)
+
+
+def cached_crawl(toolkit: Toolkit, cache: ToolCache = TOOL_CACHE) -> Toolkit:
+    """
+    Crawl4aiTools with page content cached per normalized URL (and BM25
+    filter query). A list of URLs only crawls the ones not cached.
+    """
+    method = toolkit.crawl
+    ttl = TOOL_CACHE_TTLS["crawl"]
+
+    def key_for(url: str, search_query: Optional[str]) -> str:
+        return json.dumps([normalize_url(url), normalize_query(search_query or "")])
+
+    @functools.wraps(method)
+    def crawl(url, search_query: Optional[str] = None):
+        if not url:
+            return method(url, search_query)
+
+        urls = [url] if isinstance(url, str) else list(url)
+        results = {}
+        for single_url in urls:
+            value = cache.get("crawl", key_for(single_url, search_query), ttl)
+            if value is not None:
+                logger.info(f"Tool cache hit: crawl {single_url}")
+                results[single_url] = value
+
+        missing = [u for u in urls if u not in results]
+        if missing:
+            fetched = method(missing[0], search_query) if isinstance(url, str) else method(missing, search_query)
+            if isinstance(url, str):
+                fetched = {url: fetched}
+            for single_url, value in fetched.items():
+                if _cacheable(value):
+                    cache.set("crawl", key_for(single_url, search_query), value)
+                results[single_url] = value
+
+        return results[url] if isinstance(url, str) else {u: results[u] for u in urls}
+
+    toolkit.register(crawl, name="crawl")
+    return toolkit
+
+
+def tool_cache_stats() -> Dict[str, Any]:
+    """Counters for the shared tool cache."""
+    return TOOL_CACHE.stats()
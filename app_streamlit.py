@@ -20,7 +20,7 @@ if "document_checklist" not in st.session_state:
     st.session_state.document_checklist = {}
 
 # --- Import your bridge functions AFTER initialization ---
-from bridge.router_bridge import run_chitchat, run_eligibility, run_documents, run_sop
+from bridge.router_bridge import local_route, stream_chitchat, run_eligibility, run_documents, stream_sop, startup_report, pool_metrics, tool_cache_stats, checklist_cache_stats
 
 # --- Supabase Client for Document Library ---
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -85,6 +85,36 @@ with st.sidebar:
         
         # Rerun the app to reflect the new, empty session
         st.rerun()
+
+    with st.expander("⏱️ Agent startup"):
+        for row in startup_report():
+            if row["loaded"]:
+                st.caption(f"{row['agent']}: import {row['import_seconds']}s, build {row['build_seconds']}s")
+            else:
+                st.caption(f"{row['agent']}: not loaded yet")
+
+    with st.expander("🗄️ Database pool"):
+        metrics = pool_metrics()
+        if metrics["initialized"]:
+            st.caption(f"In use: {metrics['checked_out']} / {metrics['pool_size'] + metrics['max_overflow']} "
+                       f"({metrics['utilization']:.0%}), peak {metrics['peak_checked_out']}")
+        else:
+            st.caption("Not connected yet")
+
+    with st.expander("🔎 Caches"):
+        cache = tool_cache_stats()
+        if cache:
+            st.caption(f"Web tools: {cache['entries']} / {cache['max_entries']} entries")
+            for tool, counts in cache["tools"].items():
+                st.caption(f"`{tool}`: {counts['hits']} hits, {counts['misses']} misses ({counts['hit_rate']:.0%})")
+        else:
+            st.caption("Web tools: not loaded yet")
+        checklists = checklist_cache_stats()
+        if checklists:
+            st.caption(f"Checklists: {checklists['entries']} cached, {checklists['hits'] + checklists['stale_hits']} served "
+                       f"({checklists['hit_rate']:.0%}), {checklists['refreshes']} refreshed")
+        else:
+            st.caption("Checklists: not loaded yet")
     
 
 # --- UI: Main Panel ---
@@ -406,13 +436,20 @@ if query := st.chat_input("Ask your immigration question..."):
         st.markdown(query)  
 
     # --- 4. Agent Routing and Response ---
+    # Tokens from chitchat/SOP stream here while the agent runs; the final
+    # structured result replaces them in the assistant message below.
+    stream_placeholder = st.empty()
     status_placeholder = st.empty()
     
     try:
         with status_placeholder.container():
             with st.status("Thinking...", expanded=False) as status:
                 status.update(label="Thinking...")
-                reply, escalate_to = run_chitchat(query, user_id)
+                reply, escalate_to = "", local_route(query, user_id)
+                if not escalate_to:
+                    chitchat_stream = stream_chitchat(query, user_id)
+                    stream_placeholder.write_stream(chitchat_stream)
+                    reply, escalate_to = chitchat_stream.result
 
                 if escalate_to:
                     escalate_to = escalate_to.lower()
@@ -459,7 +496,9 @@ if query := st.chat_input("Ask your immigration question..."):
 
                 elif escalate_to == "sop_agent":
                     status.update(label="Running SOP Agent...")
-                    reply_text, pdf_file_url = run_sop(query, user_id)
+                    sop_stream = stream_sop(query, user_id)
+                    stream_placeholder.write_stream(sop_stream)
+                    reply_text, pdf_file_url = sop_stream.result
                     assistant_reply_content = reply_text or "Your document request has been processed."
                     
                     logger.info(f"📄 SOP Result: reply_text={reply_text[:50]}, pdf_url={pdf_file_url[:50] if pdf_file_url else 'None'}")
@@ -480,9 +519,11 @@ if query := st.chat_input("Ask your immigration question..."):
                 status.update(label="Done!", state="complete")
         
         # FIXED: Clear the status placeholder after response
+        stream_placeholder.empty()
         status_placeholder.empty()
         
     except Exception as e:
+        stream_placeholder.empty()
         status_placeholder.empty()
         st.error(f"An error occurred: {e}")
         logger.error(f"Error during agent run for user {user_id}: {e}", exc_info=True)
@@ -0,0 +1,412 @@
+"""
+Retrieval benchmark for the local knowledge base.
+
+Runs a labelled query set (query -> expected URLs) against one or more
+index configurations and writes a JSON report:
+
+    python -m benchmarks.retrieval_benchmark \
+        --queries benchmarks/queries.jsonl \
+        --configs benchmarks/configs.json \
+        --out benchmarks/results/current.json \
+        --baseline benchmarks/results/previous.json
+
+Each configuration names a retriever ("chroma", "int8", "binary",
+"bm25" or "hybrid") and the index it reads, and optionally the
+"embedding_backend" that embeds queries (see scrapers/embedding_backends.py). An optional `build_command`
+(argv list, e.g. a re-chunk + re-embed run with another chunk_size or
+embedding model) runs first and is timed. Quantized and BM25 indexes
+can also be rebuilt in-process with `"build": true`.
+
+Recall and MRR are computed on URLs, not chunk ids, so configurations
+with different chunking stay comparable.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.agents.knowledge_base import (
+    CANDIDATES_PER_K,
+    KB_COLLECTION,
+    KB_EMBEDDING_MODEL,
+    KB_PERSIST_DIR,
+    KnowledgeChunk,
+    reciprocal_rank_fusion,
+)
+from app.agents.tool_cache import normalize_url
+
+ROOT = Path(__file__).resolve().parents[1]
+BENCHMARK_DIR = Path(__file__).resolve().parent
+
+RECALL_AT = (1, 5, 10)
+WARMUP_QUERIES = 3
+REPORT_VERSION = 1
+
+Retriever = Callable[[str, int, Optional[str], Optional[str]], List[KnowledgeChunk]]
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def load_queries(path: Path) -> List[Dict]:
+    """Labelled queries: {"query", "expected_urls", optional "language"/"source"}."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("//"):
+                continue
+            item = json.loads(line)
+            if not item.get("query") or not item.get("expected_urls"):
+                raise ValueError(f"{path}:{line_no} needs 'query' and 'expected_urls'")
+            item["expected_urls"] = sorted({normalize_url(u) for u in item["expected_urls"]})
+            queries.append(item)
+    return queries
+
+
+def load_configs(path: Path) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        configs = json.load(f)
+    names = [c["name"] for c in configs]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate configuration names in {path}")
+    return configs
+
+
+def _path(value, default: Path) -> Path:
+    path = Path(value) if value else default
+    return path if path.is_absolute() else ROOT / path
+
+
+def _dir_size(*paths: Path) -> int:
+    total = 0
+    for path in paths:
+        if path.is_file():
+            total += path.stat().st_size
+        elif path.is_dir():
+            total += sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return total
+
+
+# ============================================================================
+# RETRIEVERS
+# ============================================================================
+
+_embedding_models: Dict[str, object] = {}
+
+
+def _embeddings(model_name: str, backend: Optional[str] = None):
+    from scrapers.embedding_backends import EMBEDDING_BACKEND, load_embeddings
+
+    key = f"{model_name}:{backend or EMBEDDING_BACKEND}"
+    if key not in _embedding_models:
+        _embedding_models[key] = load_embeddings(model_name, backend or EMBEDDING_BACKEND)
+    return _embedding_models[key]
+
+
+def _chroma_retriever(config: Dict) -> Retriever:
+    from langchain_chroma import Chroma
+
+    from app.agents.knowledge_base import metadata_filter
+
+    store = Chroma(
+        collection_name=config.get("collection", KB_COLLECTION),
+        persist_directory=str(_path(config.get("persist_dir"), KB_PERSIST_DIR)),
+        embedding_function=_embeddings(config.get("embedding_model", KB_EMBEDDING_MODEL),
+                                       config.get("embedding_backend")),
+    )
+
+    def retrieve(query, k, language, source):
+        hits = store.similarity_search_with_score(query, k=k, filter=metadata_filter(language, source))
+        return [
+            KnowledgeChunk(
+                id=str(doc.metadata.get("id", "")), content=doc.page_content, url=doc.metadata.get("url", ""),
+                title=doc.metadata.get("title", ""), language=doc.metadata.get("language", ""),
+                source=doc.metadata.get("source", ""), score=1.0 - distance / 2.0,
+            )
+            for doc, distance in hits
+        ]
+    return retrieve
+
+
+def _quantized_retriever(config: Dict) -> Retriever:
+    from app.agents.quantized_index import QUANTIZED_INDEX_DIR, QuantizedIndex
+
+    index = QuantizedIndex(_path(config.get("quantized_dir"), QUANTIZED_INDEX_DIR), mode=config["retriever"])
+    embeddings = _embeddings(config.get("embedding_model", KB_EMBEDDING_MODEL), config.get("embedding_backend"))
+
+    def retrieve(query, k, language, source):
+        chunks = []
+        for hit in index.search(embeddings.embed_query(query), k=k, language=language, source=source):
+            record = index.document(hit.row)
+            chunks.append(KnowledgeChunk(score=hit.score, **record))
+        return chunks
+    return retrieve
+
+
+def _lexical_retriever(config: Dict) -> Retriever:
+    from app.agents.lexical_index import LEXICAL_INDEX_DIR, LexicalIndex
+
+    index = LexicalIndex(_path(config.get("lexical_dir"), LEXICAL_INDEX_DIR))
+
+    def retrieve(query, k, language, source):
+        chunks = []
+        for hit in index.search(query, k=k, language=language, source=source):
+            record = index.document(hit.doc)
+            chunks.append(KnowledgeChunk(
+                id=str(record.get("id", "")), content=record.get("content", ""), url=record.get("url", ""),
+                title=record.get("title", ""), language=record.get("language", ""),
+                source=record.get("source", ""), score=hit.score,
+            ))
+        return chunks
+    return retrieve
+
+
+def _hybrid_retriever(config: Dict) -> Retriever:
+    vector = open_retriever({**config, "retriever": config.get("vector_backend", "chroma")})
+    lexical = _lexical_retriever(config)
+
+    def retrieve(query, k, language, source):
+        depth = k * CANDIDATES_PER_K
+        return reciprocal_rank_fusion(
+            [vector(query, depth, language, source), lexical(query, depth, language, source)], k
+        )
+    return retrieve
+
+
+def open_retriever(config: Dict) -> Retriever:
+    kind = config["retriever"]
+    if kind == "chroma":
+        return _chroma_retriever(config)
+    if kind in ("int8", "binary"):
+        return _quantized_retriever(config)
+    if kind == "bm25":
+        return _lexical_retriever(config)
+    if kind == "hybrid":
+        return _hybrid_retriever(config)
+    raise ValueError(f"Unknown retriever {kind!r} in configuration {config['name']!r}")
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def index_paths(config: Dict) -> List[Path]:
+    """Files a configuration reads at query time, for the size column."""
+    from app.agents.lexical_index import LEXICAL_INDEX_DIR
+    from app.agents.quantized_index import QUANTIZED_INDEX_DIR
+
+    kind = config["retriever"]
+    vector_kind = config.get("vector_backend", "chroma") if kind == "hybrid" else kind
+    paths = []
+    if vector_kind == "chroma":
+        paths.append(_path(config.get("persist_dir"), KB_PERSIST_DIR))
+    elif vector_kind in ("int8", "binary"):
+        quantized_dir = _path(config.get("quantized_dir"), QUANTIZED_INDEX_DIR)
+        matrix = "vectors_i8.npy" if vector_kind == "int8" else "vectors_bin.npy"
+        paths += [quantized_dir / name for name in (matrix, "vectors_f32.npy", "scales.npy", "docs.jsonl",
+                                                     "doc_offsets.npy", "doc_language.npy", "doc_source.npy")]
+    if kind in ("bm25", "hybrid"):
+        paths.append(_path(config.get("lexical_dir"), LEXICAL_INDEX_DIR))
+    return paths
+
+
+def build_index(config: Dict) -> Optional[float]:
+    """Run the configuration's build steps; seconds taken, or None if nothing was built."""
+    if not config.get("build_command") and not config.get("build"):
+        return None
+
+    t0 = time.perf_counter()
+    if config.get("build_command"):
+        subprocess.run(config["build_command"], cwd=ROOT, check=True)
+
+    if config.get("build"):
+        kind = config["retriever"]
+        vector_kind = config.get("vector_backend", "chroma") if kind == "hybrid" else kind
+        if vector_kind in ("int8", "binary"):
+            from app.agents.quantized_index import QUANTIZED_INDEX_DIR, build_quantized_index
+
+            build_quantized_index(
+                _path(config.get("persist_dir"), KB_PERSIST_DIR),
+                config.get("collection", KB_COLLECTION),
+                _path(config.get("quantized_dir"), QUANTIZED_INDEX_DIR),
+            )
+        if kind in ("bm25", "hybrid"):
+            from app.agents.lexical_index import CHUNKS_DIR, LEXICAL_INDEX_DIR, build_lexical_index, default_chunk_files
+
+            chunk_files = [_path(p, CHUNKS_DIR) for p in config.get("chunk_files", [])]
+            build_lexical_index(
+                chunk_files or default_chunk_files(),
+                _path(config.get("lexical_dir"), LEXICAL_INDEX_DIR),
+            )
+    return time.perf_counter() - t0
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def ranked_urls(chunks: List[KnowledgeChunk]) -> List[str]:
+    """Distinct URLs in the order their first chunk was retrieved."""
+    seen, urls = set(), []
+    for chunk in chunks:
+        url = normalize_url(chunk.url) if chunk.url else ""
+        if url and url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+def _percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    if not latencies_ms:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    values = np.asarray(latencies_ms)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3), "mean": round(float(values.mean()), 3)}
+
+
+def evaluate(retrieve: Retriever, queries: List[Dict], repeats: int = 1) -> Dict:
+    depth = max(RECALL_AT) * CANDIDATES_PER_K  # chunks fetched; several can share a URL
+
+    for item in queries[:WARMUP_QUERIES]:  # model load and first page faults stay out of the numbers
+        retrieve(item["query"], depth, item.get("language"), item.get("source"))
+
+    recall = {k: [] for k in RECALL_AT}
+    reciprocal_ranks, latencies, per_query = [], [], {}
+    for item in queries:
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            chunks = retrieve(item["query"], depth, item.get("language"), item.get("source"))
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        urls = ranked_urls(chunks)
+        expected = set(item["expected_urls"])
+        first = next((rank for rank, url in enumerate(urls, 1) if url in expected), None)
+        reciprocal_ranks.append(1.0 / first if first else 0.0)
+        for k in RECALL_AT:
+            recall[k].append(len(expected.intersection(urls[:k])) / len(expected))
+        per_query[item["query"]] = first
+
+    return {
+        "recall": {f"@{k}": round(float(np.mean(v)), 4) for k, v in recall.items()},
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "latency_ms": _percentiles(latencies),
+        "first_relevant_rank": per_query,
+    }
+
+
+def run_benchmark(queries: List[Dict], configs: List[Dict], repeats: int = 1) -> Dict:
+    results = {}
+    for config in configs:
+        name = config["name"]
+        print(f"▶ {name}", file=sys.stderr)
+        try:
+            build_seconds = build_index(config)
+            t0 = time.perf_counter()
+            retrieve = open_retriever(config)
+            load_seconds = time.perf_counter() - t0
+            result = evaluate(retrieve, queries, repeats)
+        except Exception as e:
+            print(f"  ✗ {name} failed: {e}", file=sys.stderr)
+            results[name] = {"config": config, "error": str(e)}
+            continue
+
+        result.update({
+            "config": config,
+            "build_seconds": round(build_seconds, 3) if build_seconds is not None else None,
+            "load_seconds": round(load_seconds, 3),
+            "index_bytes": _dir_size(*index_paths(config)),
+        })
+        results[name] = result
+
+    return {
+        "version": REPORT_VERSION,
+        "queries": len(queries),
+        "repeats": repeats,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor() or platform.machine()},
+        "results": results,
+    }
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def summary_rows(report: Dict, baseline: Optional[Dict] = None) -> List[str]:
+    """One line per configuration; with a baseline, deltas in brackets."""
+    def delta(now, before, fmt):
+        if before is None or now is None:
+            return ""
+        return f" [{now - before:+{fmt}}]"
+
+    rows = [f"{'config':<24} {'R@1':>7} {'R@5':>7} {'R@10':>7} {'MRR':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'build s':>8} {'size MB':>8}"]
+    for name, result in report["results"].items():
+        if "error" in result:
+            rows.append(f"{name:<24} error: {result['error']}")
+            continue
+        before = ((baseline or {}).get("results") or {}).get(name) or {}
+        if "error" in before:
+            before = {}
+        line = f"{name:<24}"
+        for key in ("@1", "@5", "@10"):
+            now = result["recall"][key]
+            line += f" {now:7.3f}{delta(now, before.get('recall', {}).get(key), '.3f')}"
+        line += f" {result['mrr']:7.3f}{delta(result['mrr'], before.get('mrr'), '.3f')}"
+        for key in ("p50", "p95", "p99"):
+            now = result["latency_ms"][key]
+            line += f" {now:8.2f}{delta(now, before.get('latency_ms', {}).get(key), '.2f')}"
+        build = result["build_seconds"]
+        line += f" {build:8.1f}" if build is not None else f" {'-':>8}"
+        line += f" {result['index_bytes'] / 1e6:8.1f}"
+        rows.append(line)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark knowledge-base retrieval configurations")
+    parser.add_argument("--queries", type=Path, default=BENCHMARK_DIR / "queries.jsonl")
+    parser.add_argument("--configs", type=Path, default=BENCHMARK_DIR / "configs.json")
+    parser.add_argument("--only", nargs="*", help="Configuration names to run (default: all)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--out", type=Path, help="Write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="Earlier report to show deltas against")
+    args = parser.parse_args(argv)
+
+    queries = load_queries(args.queries)
+    configs = load_configs(args.configs)
+    if args.only:
+        configs = [c for c in configs if c["name"] in set(args.only)]
+
+    report = run_benchmark(queries, configs, repeats=max(1, args.repeats))
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+        print(f"✅ Report saved to {args.out}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print("\n".join(summary_rows(report, baseline)), file=sys.stderr)
+    return 0 if all("error" not in r for r in report["results"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
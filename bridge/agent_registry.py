@@ -0,0 +1,98 @@
+import importlib
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+
+if TYPE_CHECKING:
+    from agno.agent import Agent
+
+logger = logging.getLogger(__name__)
+
+# name -> (module path, factory function)
+AGENT_SPECS = {
+    "chitchat_agent": ("app.agents.chitchat_agent", "build_chitchat_agent"),
+    "eligibility_agent": ("app.agents.eligibility_agent", "build_eligibility_agent"),
+    "document_agent": ("app.agents.document_agent", "build_document_agent"),
+    "checklist_cache_agent": ("app.agents.document_agent", "build_checklist_cache_agent"),
+    "sop_agent": ("app.agents.sop_agent", "build_sop_agent"),
+}
+
+_agents: Dict[str, "Agent"] = {}
+_locks = {name: threading.Lock() for name in AGENT_SPECS}
+_timings: Dict[str, Dict[str, float]] = {}
+
+
+def get_agent(name: str) -> "Agent":
+    """
+    Return the shared agent for `name`, importing its module and building
+    it on first use. Concurrent first calls build the agent only once.
+    """
+    agent = _agents.get(name)
+    if agent is not None:
+        return agent
+
+    if name not in AGENT_SPECS:
+        raise KeyError(f"Unknown agent: {name}")
+
+    with _locks[name]:
+        agent = _agents.get(name)
+        if agent is not None:
+            return agent
+
+        module_path, factory_name = AGENT_SPECS[name]
+        t0 = time.perf_counter()
+        module = importlib.import_module(module_path)
+        t1 = time.perf_counter()
+        agent = getattr(module, factory_name)()
+        t2 = time.perf_counter()
+
+        _timings[name] = {"import_seconds": t1 - t0, "build_seconds": t2 - t1}
+        _agents[name] = agent
+        logger.info(f"Loaded {name}: import {t1 - t0:.2f}s, build {t2 - t1:.2f}s")
+        return agent
+
+
+def is_loaded(name: str) -> bool:
+    """True once the agent has been built in this process."""
+    return name in _agents
+
+
+def warm_up(names: Optional[List[str]] = None) -> None:
+    """Build agents ahead of first use (all agents by default)."""
+    for name in names or AGENT_SPECS:
+        get_agent(name)
+
+
+def startup_report() -> List[Dict[str, Any]]:
+    """
+    Import and construction cost per agent, in registry order.
+    Agents that have not been used yet are reported with loaded=False.
+    Shared dependencies (agno, dotenv) are charged to whichever agent
+    is imported first.
+    """
+    report = []
+    for name in AGENT_SPECS:
+        timing = _timings.get(name)
+        report.append({
+            "agent": name,
+            "loaded": timing is not None,
+            "import_seconds": round(timing["import_seconds"], 3) if timing else None,
+            "build_seconds": round(timing["build_seconds"], 3) if timing else None,
+        })
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    logging.basicConfig(level=logging.INFO)
+
+    warm_up()
+    print(f"\n{'='*60}")
+    print("AGENT STARTUP REPORT")
+    print(f"{'='*60}")
+    for row in startup_report():
+        print(f"{row['agent']:<20} import {row['import_seconds']:>7.3f}s   build {row['build_seconds']:>7.3f}s")
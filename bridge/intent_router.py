@@ -0,0 +1,231 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Intent labels match the escalate_to values produced by chitchat_agent;
+# CHITCHAT means "let chitchat_agent handle it".
+ELIGIBILITY = "eligibility_agent"
+DOCUMENTS = "document_agent"
+SOP = "sop_agent"
+CHITCHAT = "chitchat"
+
+INTENTS = (ELIGIBILITY, DOCUMENTS, SOP, CHITCHAT)
+
+CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.9"))
+# the top intent must also beat the runner-up by this much
+MIN_MARGIN = float(os.getenv("INTENT_ROUTER_MARGIN", "0.85"))
+
+
+class IntentDecision(NamedTuple):
+    escalate_to: Optional[str]   # None when chitchat_agent should decide
+    confidence: float
+    tier: str                    # "regex", "classifier" or "fallback"
+
+
+# ============================================================================
+# TIER 1: HIGH-PRECISION PATTERNS
+# ============================================================================
+
+# Only immigration documents: a bare "letter" or "essay" is not an SOP request
+_DOC_TYPES = (
+    r"(sops?|statements? of purpose|lors?|letters? of (recommendation|explanation|intent)"
+    r"|(recommendation|explanation|reference) letters?)"
+)
+# Programs, permits and visas a document checklist can be for
+_PROGRAMS = (
+    r"(visa|permit|pgwp|pr|permanent residen(ce|cy)|express entry|pnp|provincial nominee|sponsorship"
+    r"|citizenship|eta|super visa|caregiver|atlantic immigration|skilled worker|experience class)"
+)
+
+INTENT_PATTERNS = {
+    SOP: [
+        re.compile(rf"\b(write|draft|generate|create|prepare|compose)\b.{{0,60}}\b{_DOC_TYPES}\b", re.I),
+    ],
+    DOCUMENTS: [
+        re.compile(r"\b(what|which|list( of)?)\b.{0,30}\b(documents?|paperwork)\b.{0,40}\b(need|required|submit|for)\b", re.I),
+        re.compile(r"\b(document|documents)\s+checklist\b", re.I),
+        re.compile(rf"\bchecklist\b.{{0,40}}\b(for|of)\b.{{0,40}}\b{_PROGRAMS}\b", re.I),
+    ],
+    ELIGIBILITY: [
+        re.compile(r"\b(am i|are we|is my (wife|husband|spouse|partner))\s+eligible\b", re.I),
+        re.compile(r"\b(do|would|can) i qualify\b", re.I),
+        re.compile(r"\b(what('?s| is) my|calculate( my)?|estimate( my)?)\s+crs\b", re.I),
+    ],
+}
+
+
+def match_patterns(text: str) -> List[str]:
+    """Intents whose high-precision patterns match the message."""
+    return [intent for intent, patterns in INTENT_PATTERNS.items() if any(p.search(text) for p in patterns)]
+
+
+# ============================================================================
+# TIER 2: NAIVE BAYES CLASSIFIER (linear in log space)
+# ============================================================================
+
+SEED_EXAMPLES = {
+    ELIGIBILITY: [
+        "am i eligible for express entry with 3 years experience and clb 8",
+        "i am 30 with a bachelor degree and ielts 7 can i get pr",
+        "what is my crs score",
+        "do i qualify for the federal skilled worker program",
+        "check my eligibility for canadian immigration programs",
+        "i have 2 years work experience as a software developer which programs can i apply for",
+        "can i immigrate to canada with a masters degree and ielts 6.5",
+        "which pnp am i eligible for",
+        "my ielts scores are 7 7 6.5 7 what is my clb and crs",
+        "i am a truck driver with 3 years experience can i get permanent residence",
+        "eligibility assessment for canadian experience class",
+        "how many crs points will i get",
+        "i have a job offer in ontario am i eligible",
+        "age 28 masters degree clb 9 four years experience eligible programs",
+    ],
+    DOCUMENTS: [
+        "what documents do i need for a study permit",
+        "document checklist for express entry",
+        "which forms are required for spousal sponsorship",
+        "list of documents for visitor visa from india",
+        "what paperwork is needed for a work permit",
+        "required documents for pr application",
+        "checklist for study permit from nigeria",
+        "do i need a police certificate for express entry",
+        "what forms do i fill for a visitor visa",
+        "documents needed for pgwp application",
+        "proof of funds documents for study permit",
+        "which imm forms do i need for family sponsorship",
+        "what should i submit with my work permit application",
+    ],
+    SOP: [
+        "write a statement of purpose for my study permit",
+        "draft an sop for university of toronto",
+        "generate a letter of recommendation",
+        "create an expression of interest for bc pnp",
+        "write a cover letter for my visa application",
+        "can you draft a pr letter for me",
+        "help me write my sop",
+        "prepare a letter explaining my study gap",
+        "write an explanation letter for my refusal",
+        "compose a letter of intent for my application",
+        "make a pdf of my statement of purpose",
+        "draft a letter of employment reference",
+    ],
+    CHITCHAT: [
+        "hi",
+        "hello there",
+        "thanks",
+        "thank you so much",
+        "what is express entry",
+        "how long does a study permit take to process",
+        "what are the latest express entry draws",
+        "what is the fee for a visitor visa",
+        "tell me about the atlantic immigration program",
+        "how does the provincial nominee program work",
+        "what is the difference between pr and citizenship",
+        "when is the next draw",
+        "who are you",
+        "can you help me",
+        "what is a noc code",
+        "my name is priya and i live in toronto",
+        # general questions that mention programs or documents in passing
+        "how much does it cost to apply for permanent residence",
+        "how much money do i need to immigrate to canada",
+        "what should i know about moving to canada",
+        "i have a question about my application",
+        "i have a question about my study permit",
+        "what does it mean if my application is refused",
+        "my application was refused what now",
+        "what happens after i submit my application",
+        "can i work while studying",
+        "how long is a work permit valid",
+        "is ielts mandatory",
+        "what is proof of funds",
+        "i am 25 years old",
+        "i live in vancouver",
+        "what are the processing times",
+        "can my family come with me",
+        "what is an ita",
+        "how do i apply for citizenship",
+        "what is the difference between a visa and a permit",
+        "explain the express entry process",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word unigrams plus adjacent bigrams."""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesIntentClassifier:
+    """
+    Multinomial naive Bayes with Laplace smoothing over token counts.
+
+    Raw naive Bayes posteriors are close to 0 or 1 for any message of a
+    few words, so predict_proba scores each label by its mean per-token
+    log-likelihood times `scale` instead of the sum.
+    """
+
+    __slots__ = ("scale", "labels", "log_priors", "log_likelihoods", "log_unseen")
+
+    def __init__(self, examples: Dict[str, List[str]], alpha: float = 1.0, scale: float = 5.0):
+        self.scale = scale
+        self.labels = tuple(examples)
+        counts = {label: Counter(t for text in texts for t in tokenize(text)) for label, texts in examples.items()}
+        vocab = set().union(*counts.values())
+        total_examples = sum(len(texts) for texts in examples.values())
+
+        self.log_priors = {label: math.log(len(examples[label]) / total_examples) for label in self.labels}
+        self.log_likelihoods = {}
+        self.log_unseen = {}
+        for label in self.labels:
+            denom = sum(counts[label].values()) + alpha * (len(vocab) + 1)
+            self.log_likelihoods[label] = {t: math.log((c + alpha) / denom) for t, c in counts[label].items()}
+            self.log_unseen[label] = math.log(alpha / denom)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        tokens = tokenize(text)
+        scores = {}
+        for label in self.labels:
+            likelihoods = self.log_likelihoods[label]
+            unseen = self.log_unseen[label]
+            log_score = self.log_priors[label] + sum(likelihoods.get(t, unseen) for t in tokens)
+            scores[label] = log_score * self.scale / max(len(tokens), 1)
+        top = max(scores.values())
+        exp = {label: math.exp(s - top) for label, s in scores.items()}
+        total = sum(exp.values())
+        return {label: v / total for label, v in exp.items()}
+
+    def predict(self, text: str) -> Tuple[str, float, float]:
+        """Top label, its probability, and its margin over the runner-up."""
+        proba = self.predict_proba(text)
+        (label, top), (_, second) = sorted(proba.items(), key=lambda item: item[1], reverse=True)[:2]
+        return label, top, top - second
+
+
+CLASSIFIER = NaiveBayesIntentClassifier(SEED_EXAMPLES)
+
+# ============================================================================
+# ROUTING
+# ============================================================================
+
+def route_intent(text: str, threshold: float = CONFIDENCE_THRESHOLD, min_margin: float = MIN_MARGIN) -> IntentDecision:
+    """
+    Decide locally whether a message can go straight to a specialist agent.
+
+    Returns escalate_to=None when the message is ambiguous or general
+    chitchat, in which case chitchat_agent should handle routing.
+    """
+    matches = match_patterns(text)
+    if len(matches) == 1:
+        return IntentDecision(matches[0], 1.0, "regex")
+
+    label, confidence, margin = CLASSIFIER.predict(text)
+    if not matches and label != CHITCHAT and confidence >= threshold and margin >= min_margin:
+        return IntentDecision(label, confidence, "classifier")
+
+    return IntentDecision(None, confidence, "fallback")
@@ -1,8 +1,11 @@
+import asyncio
 import logging
 from pathlib import Path
 import sys
 import os
 import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Set, Tuple
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,20 +21,140 @@ from config import GENERATED_FILES_DIR
 if str(APP_DIR) not in sys.path:
     sys.path.insert(0, str(APP_DIR))
 
-# Import agents 
+# Agents are imported and built lazily on first use; so are the database
+# and cache modules they share (see the stats helpers below)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app.agents.chitchat_agent import chitchat_agent
-from app.agents.eligibility_agent import eligibility_agent
-from app.agents.sop_agent import sop_agent
-from app.agents.document_agent import document_agent
+from bridge.agent_registry import get_agent, is_loaded, startup_report, warm_up
+from bridge.intent_router import route_intent
+
+LOCAL_INTENT_ROUTER = os.getenv("LOCAL_INTENT_ROUTER", "true").lower() == "true"
+
+SPECIALIST_AGENTS = ["eligibility_agent", "document_agent", "sop_agent"]
+
+# Per-stage timeouts (seconds) for the async dispatcher
+STAGE_TIMEOUTS = {
+    "route": float(os.getenv("ROUTE_TIMEOUT", "45")),
+    "eligibility_agent": float(os.getenv("ELIGIBILITY_TIMEOUT", "120")),
+    "document_agent": float(os.getenv("DOCUMENT_TIMEOUT", "240")),
+    "sop_agent": float(os.getenv("SOP_TIMEOUT", "180")),
+    "local_eligibility": float(os.getenv("LOCAL_ELIGIBILITY_TIMEOUT", "10")),
+}
+
+SOP_FALLBACK_REPLY = "Your document request has been processed."
+
+# --- Shared resource stats (never import the modules themselves) ---
+
+def pool_metrics() -> Dict[str, Any]:
+    """Shared Postgres pool metrics; {"initialized": False} until an agent has loaded it."""
+    shared_db = sys.modules.get("app.agents.shared_db")
+    return shared_db.pool_metrics() if shared_db else {"initialized": False}
+
+def tool_cache_stats() -> Optional[Dict[str, Any]]:
+    """Web tool cache counters, or None until an agent has loaded the cache."""
+    tool_cache = sys.modules.get("app.agents.tool_cache")
+    return tool_cache.tool_cache_stats() if tool_cache else None
+
+def checklist_cache_stats() -> Optional[Dict[str, Any]]:
+    """Checklist cache counters, or None until a document request has loaded the cache."""
+    checklist_cache = sys.modules.get("app.agents.checklist_cache")
+    return checklist_cache.checklist_cache_stats() if checklist_cache else None
+
+# --- Response parsing (shared by sync and async runners) ---
+
+def _parse_chitchat(res):
+    json_output = json.loads(res.content.model_dump_json())
+    reply = json_output.get("reply", "")
+    escalate_to = json_output.get("escalate_to", "")
+    return reply, escalate_to
+
+def _parse_eligibility(res):
+    json_output = json.loads(res.content.model_dump_json())
+    user_profile = json_output.get("user_profile", {})
+    eligible_programs = json_output.get("eligible_programs", [])
+    ineligible_programs = json_output.get("ineligible_programs", [])
+    crs_estimate = json_output.get("crs_estimate", None)
+    improvement_suggestions = json_output.get("improvement_suggestions", [])
+    next_steps = json_output.get("next_steps", [])
+    requires_follow_up = json_output.get("requires_follow_up", False)
+    return user_profile, eligible_programs, ineligible_programs, crs_estimate, improvement_suggestions, next_steps, requires_follow_up
+
+def _parse_documents(res):
+    return _checklist_fields(res.content)
+
+def _checklist_fields(checklist):
+    json_output = json.loads(checklist.model_dump_json())
+
+    # Ensure these .get() calls match the Pydantic schema field names exactly
+    program = json_output.get("program", "")
+    overview = json_output.get("overview", "")
+    required_documents = json_output.get("required_documents", [])
+    conditional_documents = json_output.get("conditional_documents", [])
+    optional_but_recommended = json_output.get("optional_but_recommended", [])
+    forms = json_output.get("forms", [])
+    official_guide_url = json_output.get("official_guide_url", "")
+
+    # The order of this returned tuple matters
+    return (
+        program,
+        overview,
+        required_documents,
+        conditional_documents,
+        optional_but_recommended,
+        forms,
+        official_guide_url,
+    )
+
+def _parse_sop(res):
+    try:
+        json_output = json.loads(res.content.model_dump_json())
+    except Exception as e:
+        logger.error(f"Failed to parse SOPAgentResponse JSON: {e}", exc_info=True)
+        # Fallback minimal reply
+        json_output = {"reply": SOP_FALLBACK_REPLY, "files": []}
+
+    reply_text = json_output.get("reply", SOP_FALLBACK_REPLY)
+    pdf_file_url = None
+
+    if res.files and len(res.files) > 0:
+        logger.info(f"✅ Agent returned {len(res.files)} file(s)")
+        for file in res.files:
+            logger.info(f"   📄 File name: {getattr(file, 'name', '')}")
+            # Prefer Supabase URL carried with the File
+            if getattr(file, "url", None) and getattr(file, "name", "").endswith(".pdf"):
+                logger.info(f"   🔗 Found Supabase URL: {file.url[:80]}...")
+                pdf_file_url = file.url
+                break
+
+    if pdf_file_url:
+        logger.info(f"✅ Returning Supabase URL: {pdf_file_url[:100]}...")
+    else:
+        logger.warning("⚠️ No Supabase URL found in agent response")
+
+    return reply_text, pdf_file_url
+
+def _should_retry_sop(msg: str) -> bool:
+    # Retry only for tool hallucinations or similar tool_use_failed issues
+    return (
+        "attempted to call tool 'json'" in msg
+        or "tool_use_failed" in msg
+        or "tool call validation failed" in msg
+    )
+
+def _sop_hard_nudge(user_text: str) -> str:
+    return (
+        user_text
+        + "\n\n[System constraint to model: Do NOT call any tool named 'json'. "
+          "Generate the document, call only generate_professional_pdf, then OUTPUT final JSON as plain text "
+          "matching SOPAgentResponse with reply and files.]"
+    )
+
+# --- Synchronous runners ---
 
 def run_chitchat(user_text: str, user_id: str):
     logger.info(f"Running chitchat for user {user_id}: {user_text[:50]}...")
     try:
-        res = chitchat_agent.run(user_text, user_id=user_id)
-        json_output = json.loads(res.content.model_dump_json())
-        reply = json_output.get("reply", "")
-        escalate_to = json_output.get("escalate_to", "")
+        res = get_agent("chitchat_agent").run(user_text, user_id=user_id)
+        reply, escalate_to = _parse_chitchat(res)
         logger.info(f"Chitchat completed for user {user_id}")
         logger.info(f"Chitchat reply for user {user_id}, reply : {reply}, escalate_to: {escalate_to}")
         return reply, escalate_to
@@ -39,52 +162,78 @@ def run_chitchat(user_text: str, user_id: str):
         logger.error(f"Error in run_chitchat for user {user_id}: {e}")
         raise
 
+def local_route(user_text: str, user_id: str) -> Optional[str]:
+    if not LOCAL_INTENT_ROUTER:
+        return None
+    decision = route_intent(user_text)
+    if decision.escalate_to:
+        logger.info(
+            f"Local router sent user {user_id} to {decision.escalate_to} "
+            f"({decision.tier}, confidence {decision.confidence:.2f})"
+        )
+    return decision.escalate_to
+
+def route_message(user_text: str, user_id: str):
+    """
+    Returns (reply, escalate_to) like run_chitchat. Confident eligibility,
+    document and SOP requests are routed locally and skip the chitchat LLM
+    call (reply is then empty); everything else goes to run_chitchat.
+    """
+    escalate_to = local_route(user_text, user_id)
+    if escalate_to:
+        return "", escalate_to
+    return run_chitchat(user_text, user_id)
+
 def run_eligibility(user_text: str, user_id: str):
     logger.info(f"Running eligibility for user {user_id}: {user_text[:50]}...")
     try:
-        res = eligibility_agent.run(user_text, user_id=user_id)
-        json_output = json.loads(res.content.model_dump_json())
-        user_profile = json_output.get("user_profile", {})
-        eligible_programs = json_output.get("eligible_programs", [])
-        ineligible_programs = json_output.get("ineligible_programs", [])
-        crs_estimate = json_output.get("crs_estimate", None)
-        improvement_suggestions = json_output.get("improvement_suggestions", [])
-        next_steps = json_output.get("next_steps", [])
-        requires_follow_up = json_output.get("requires_follow_up", False)
+        res = get_agent("eligibility_agent").run(user_text, user_id=user_id)
+        result = _parse_eligibility(res)
         logger.info(f"Eligibility completed for user {user_id}")
-        logger.info(f"CRS estimate for user {user_id}: {crs_estimate}")
-        return user_profile, eligible_programs, ineligible_programs, crs_estimate, improvement_suggestions, next_steps, requires_follow_up
+        logger.info(f"CRS estimate for user {user_id}: {result[3]}")
+        return result
     except Exception as e:
         logger.error(f"Error in run_eligibility for user {user_id}: {e}")
         raise
 
+def _build_shared_checklist(key):
+    """
+    Build the shared entry for `key`. It runs under CHECKLIST_REFRESH_USER
+    with an agent that has memory disabled: a requesting user's own run can
+    carry their memories and chat history, so it is never stored.
+    """
+    from app.agents.checklist_cache import CHECKLIST_REFRESH_USER
+
+    return get_agent("checklist_cache_agent").run(key.query(), user_id=CHECKLIST_REFRESH_USER).content
+
+def _cached_checklist(key):
+    """
+    Program-level checklist for `key` from CHECKLIST_CACHE. A stale entry
+    is served while a background build refreshes it; a miss builds the
+    entry once (or waits for the build already in flight) and serves it.
+    """
+    from app.agents.checklist_cache import CHECKLIST_CACHE
+
+    checklist, stale = CHECKLIST_CACHE.lookup(key)
+    if checklist is None:
+        checklist = CHECKLIST_CACHE.fill(key, lambda: _build_shared_checklist(key))
+    elif stale:
+        CHECKLIST_CACHE.refresh_in_background(key, lambda: _build_shared_checklist(key))
+    logger.info(f"Serving shared checklist for {key.id} (stale={stale})")
+    return _checklist_fields(checklist)
+
 def run_documents(user_text: str, user_id: str):
     logger.info(f"Running documents for user {user_id}: {user_text[:50]}...")
+    from app.agents.checklist_cache import checklist_key
+
     try:
-        res = document_agent.run(user_text, user_id=user_id)
-        json_output = json.loads(res.content.model_dump_json())
-        
-        # Ensure these .get() calls match the Pydantic schema field names exactly
-        program = json_output.get("program", "")
-        overview = json_output.get("overview", "")
-        required_documents = json_output.get("required_documents", [])
-        conditional_documents = json_output.get("conditional_documents", [])
-        optional_but_recommended = json_output.get("optional_but_recommended", [])
-        forms = json_output.get("forms", [])
-        official_guide_url = json_output.get("official_guide_url", "")
-        
-        logger.info(f"Documents completed for user {user_id} for program: {program}")
-        
-        # The order of this returned tuple matters
-        return (
-            program,
-            overview,
-            required_documents,
-            conditional_documents,
-            optional_but_recommended,
-            forms,
-            official_guide_url,
-        )
+        key = checklist_key(user_text)
+        if key is not None:
+            return _cached_checklist(key)
+        res = get_agent("document_agent").run(user_text, user_id=user_id)
+        result = _parse_documents(res)
+        logger.info(f"Documents completed for user {user_id} for program: {result[0]}")
+        return result
     except Exception as e:
         logger.error(f"Error in run_documents for user {user_id}: {e}", exc_info=True)
         return "", "", [], [], [], [], ""
@@ -98,64 +247,296 @@ def run_sop(user_text: str, user_id: str):
     """
     logger.info(f"Running SOP for user {user_id}: {user_text[:50]}...")
 
-    def _extract(res):
-        try:
-            json_output = json.loads(res.content.model_dump_json())
-        except Exception as e:
-            logger.error(f"Failed to parse SOPAgentResponse JSON: {e}", exc_info=True)
-            # Fallback minimal reply
-            json_output = {"reply": "Your document request has been processed.", "files": []}
-
-        reply_text = json_output.get("reply", "Your document request has been processed.")
-        pdf_file_url = None
-
-        if res.files and len(res.files) > 0:
-            logger.info(f"✅ Agent returned {len(res.files)} file(s)")
-            for file in res.files:
-                logger.info(f"   📄 File name: {getattr(file, 'name', '')}")
-                # Prefer Supabase URL carried with the File
-                if getattr(file, "url", None) and getattr(file, "name", "").endswith(".pdf"):
-                    logger.info(f"   🔗 Found Supabase URL: {file.url[:80]}...")
-                    pdf_file_url = file.url
-                    break
-
-        if pdf_file_url:
-            logger.info(f"✅ Returning Supabase URL: {pdf_file_url[:100]}...")
-        else:
-            logger.warning("⚠️ No Supabase URL found in agent response")
-
-        return reply_text, pdf_file_url
-
     # First attempt
     try:
-        res = sop_agent.run(user_text, user_id=user_id)
-        return _extract(res)
+        res = get_agent("sop_agent").run(user_text, user_id=user_id)
+        return _parse_sop(res)
     except Exception as e:
         msg = str(e)
         logger.warning(f"SOP first attempt failed: {msg}")
 
-        # Retry only for tool hallucinations or similar tool_use_failed issues
-        should_retry = (
-            "attempted to call tool 'json'" in msg
-            or "tool_use_failed" in msg
-            or "tool call validation failed" in msg
-        )
-
-        if not should_retry:
+        if not _should_retry_sop(msg):
             logger.error(f"Non-retryable SOP error: {e}", exc_info=True)
             return f"An error occurred: {str(e)}", None
 
         logger.warning("Retrying SOP with hard constraint to forbid 'json' tool calls.")
-        hard_nudge = (
-            user_text
-            + "\n\n[System constraint to model: Do NOT call any tool named 'json'. "
-              "Generate the document, call only generate_professional_pdf, then OUTPUT final JSON as plain text "
-              "matching SOPAgentResponse with reply and files.]"
-        )
+        try:
+            res = get_agent("sop_agent").run(_sop_hard_nudge(user_text), user_id=user_id)
+            return _parse_sop(res)
+        except Exception as e2:
+            logger.error(f"SOP retry failed: {e2}", exc_info=True)
+            return f"An error occurred: {str(e2)}", None
+
+# --- Streaming runners ---
+
+class AgentStream:
+    """
+    Iterable of text deltas from a streaming agent run, for st.write_stream.
+    Once exhausted, `result` holds the same tuple the matching run_*
+    function returns, parsed from the final structured RunOutput.
+    """
+
+    def __init__(self, events: Iterator, parse: Callable, on_error: Callable):
+        self._events = events
+        self._parse = parse
+        self._on_error = on_error
+        self.text = ""
+        self.result = None
+
+    def __iter__(self):
+        from agno.run.agent import RunContentEvent, RunOutput
 
         try:
-            res = sop_agent.run(hard_nudge, user_id=user_id)
-            return _extract(res)
+            for item in self._events:
+                if isinstance(item, RunOutput):
+                    self.result = self._parse(item)
+                elif isinstance(item, RunContentEvent) and isinstance(item.content, str):
+                    # The parser model's structured output also arrives as
+                    # RunContent; only the main model's text is streamed.
+                    self.text += item.content
+                    yield item.content
+        except Exception as e:
+            self.result = self._on_error(e, self.text)
+            return
+        if self.result is None:
+            self.result = self._on_error(None, self.text)
+
+def stream_chitchat(user_text: str, user_id: str) -> AgentStream:
+    """Streaming run_chitchat; `result` is (reply, escalate_to)."""
+    logger.info(f"Streaming chitchat for user {user_id}: {user_text[:50]}...")
+
+    def on_error(e, text):
+        if e is not None:
+            logger.error(f"Error in stream_chitchat for user {user_id}: {e}")
+            raise e
+        return text, ""
+
+    agent = get_agent("chitchat_agent")
+    events = agent.run(user_text, user_id=user_id, stream=True, yield_run_response=True)
+    return AgentStream(events, _parse_chitchat, on_error)
+
+def stream_sop(user_text: str, user_id: str) -> AgentStream:
+    """
+    Streaming run_sop; `result` is (reply_text, supabase_pdf_url).
+    Retries once with the hard constraint on tool hallucinations.
+    """
+    logger.info(f"Streaming SOP for user {user_id}: {user_text[:50]}...")
+    agent = get_agent("sop_agent")
+
+    def events():
+        try:
+            yield from agent.run(user_text, user_id=user_id, stream=True, yield_run_response=True)
+        except Exception as e:
+            msg = str(e)
+            logger.warning(f"SOP first attempt failed: {msg}")
+            if not _should_retry_sop(msg):
+                raise
+            logger.warning("Retrying SOP with hard constraint to forbid 'json' tool calls.")
+            yield from agent.run(_sop_hard_nudge(user_text), user_id=user_id, stream=True, yield_run_response=True)
+
+    def on_error(e, text):
+        if e is not None:
+            logger.error(f"SOP streaming failed: {e}", exc_info=True)
+            return f"An error occurred: {str(e)}", None
+        return text or SOP_FALLBACK_REPLY, None
+
+    return AgentStream(events(), _parse_sop, on_error)
+
+# --- Async runners ---
+
+async def _aget_agent(name: str):
+    # First use imports and builds the agent; keep that off the event loop
+    return await asyncio.to_thread(get_agent, name)
+
+async def arun_chitchat(user_text: str, user_id: str):
+    logger.info(f"Running chitchat (async) for user {user_id}: {user_text[:50]}...")
+    try:
+        agent = await _aget_agent("chitchat_agent")
+        res = await agent.arun(user_text, user_id=user_id)
+        reply, escalate_to = _parse_chitchat(res)
+        logger.info(f"Chitchat reply for user {user_id}, reply : {reply}, escalate_to: {escalate_to}")
+        return reply, escalate_to
+    except Exception as e:
+        logger.error(f"Error in arun_chitchat for user {user_id}: {e}")
+        raise
+
+async def aroute_message(user_text: str, user_id: str):
+    """Async route_message."""
+    escalate_to = local_route(user_text, user_id)
+    if escalate_to:
+        return "", escalate_to
+    return await arun_chitchat(user_text, user_id)
+
+async def arun_eligibility(user_text: str, user_id: str):
+    logger.info(f"Running eligibility (async) for user {user_id}: {user_text[:50]}...")
+    try:
+        agent = await _aget_agent("eligibility_agent")
+        res = await agent.arun(user_text, user_id=user_id)
+        result = _parse_eligibility(res)
+        logger.info(f"CRS estimate for user {user_id}: {result[3]}")
+        return result
+    except Exception as e:
+        logger.error(f"Error in arun_eligibility for user {user_id}: {e}")
+        raise
+
+async def arun_documents(user_text: str, user_id: str):
+    logger.info(f"Running documents (async) for user {user_id}: {user_text[:50]}...")
+    from app.agents.checklist_cache import checklist_key
+
+    try:
+        key = checklist_key(user_text)
+        if key is not None:
+            # SQLite lookup and, on a miss, the shared build run off the event loop
+            return await asyncio.to_thread(_cached_checklist, key)
+        agent = await _aget_agent("document_agent")
+        res = await agent.arun(user_text, user_id=user_id)
+        result = _parse_documents(res)
+        logger.info(f"Documents completed for user {user_id} for program: {result[0]}")
+        return result
+    except Exception as e:
+        logger.error(f"Error in arun_documents for user {user_id}: {e}", exc_info=True)
+        return "", "", [], [], [], [], ""
+
+async def arun_sop(user_text: str, user_id: str):
+    """Async run_sop, with the same single retry on tool hallucinations."""
+    logger.info(f"Running SOP (async) for user {user_id}: {user_text[:50]}...")
+    agent = await _aget_agent("sop_agent")
+    try:
+        res = await agent.arun(user_text, user_id=user_id)
+        return _parse_sop(res)
+    except Exception as e:
+        msg = str(e)
+        logger.warning(f"SOP first attempt failed: {msg}")
+        if not _should_retry_sop(msg):
+            logger.error(f"Non-retryable SOP error: {e}", exc_info=True)
+            return f"An error occurred: {str(e)}", None
+
+        logger.warning("Retrying SOP with hard constraint to forbid 'json' tool calls.")
+        try:
+            res = await agent.arun(_sop_hard_nudge(user_text), user_id=user_id)
+            return _parse_sop(res)
         except Exception as e2:
             logger.error(f"SOP retry failed: {e2}", exc_info=True)
             return f"An error occurred: {str(e2)}", None
+
+async def aevaluate_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Rule-based evaluate_eligibility for a known profile, off the event loop."""
+    from app.agents.eligibility_rules.eligibility_checker import evaluate_eligibility
+
+    return await asyncio.to_thread(evaluate_eligibility, profile)
+
+ASYNC_RUNNERS = {
+    "eligibility_agent": arun_eligibility,
+    "document_agent": arun_documents,
+    "sop_agent": arun_sop,
+}
+
+# --- Async dispatcher ---
+
+async def gather_stages(stages: Dict[str, Tuple[Awaitable, float]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Run independent stages concurrently, each under its own timeout.
+
+    Args:
+        stages: {name: (awaitable, timeout_seconds)}
+
+    Returns:
+        {name: {"result": ..., "error": str or None, "seconds": float}}
+        A stage that times out or raises does not cancel the others.
+    """
+    async def _run(awaitable, timeout):
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(awaitable, timeout)
+            return {"result": result, "error": None, "seconds": time.perf_counter() - start}
+        except asyncio.TimeoutError:
+            return {"result": None, "error": f"timed out after {timeout:g}s", "seconds": time.perf_counter() - start}
+        except Exception as e:
+            return {"result": None, "error": str(e), "seconds": time.perf_counter() - start}
+
+    names = list(stages)
+    outcomes = await asyncio.gather(*(_run(*stages[name]) for name in names))
+    return dict(zip(names, outcomes))
+
+# Detached warm-up tasks; the event loop only keeps weak references
+_background_tasks: Set[asyncio.Task] = set()
+
+def _warm_up_in_background(names):
+    task = asyncio.ensure_future(asyncio.to_thread(warm_up, names))
+    _background_tasks.add(task)
+
+    def done(task):
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.warning(f"Background warm-up of {names} failed: {task.exception()}")
+
+    task.add_done_callback(done)
+
+async def adispatch(user_text: str, user_id: str, timeouts: Optional[Dict[str, float]] = None,
+                    profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Route a message and run the chosen agent without blocking the event loop.
+
+    With `profile` (e.g. the user_profile of an earlier eligibility result)
+    the local rule engine runs while routing and the specialist agent
+    proceed. When chitchat_agent decides the route, specialist agents that
+    are not built yet are warmed up in the background; the reply does not
+    wait for them. Each stage runs under its timeout from STAGE_TIMEOUTS
+    (overridable per call).
+
+    Returns:
+        Dict containing:
+            - reply: Chitchat reply ("" when routed to a specialist)
+            - escalate_to: Specialist agent name, or None
+            - result: Tuple returned by the specialist's runner, or None
+            - error: Error message for the route or specialist stage that failed, or None
+            - local_eligibility: evaluate_eligibility(profile), or None
+            - timings: Seconds spent in each stage
+    """
+    timeouts = {**STAGE_TIMEOUTS, **(timeouts or {})}
+    timings = {}
+
+    side = None
+    if profile:
+        side = asyncio.ensure_future(gather_stages({
+            "local_eligibility": (aevaluate_profile(profile), timeouts["local_eligibility"])
+        }))
+
+    async def finish(reply, escalate_to, result, error):
+        local_eligibility = None
+        if side is not None:
+            outcome = (await side)["local_eligibility"]
+            timings["local_eligibility"] = outcome["seconds"]
+            if outcome["error"]:
+                logger.warning(f"Local eligibility failed for user {user_id}: {outcome['error']}")
+            local_eligibility = outcome["result"]
+        return {
+            "reply": reply,
+            "escalate_to": escalate_to,
+            "result": result,
+            "error": error,
+            "local_eligibility": local_eligibility,
+            "timings": timings,
+        }
+
+    reply, escalate_to = "", local_route(user_text, user_id)
+    if not escalate_to:
+        pending = [name for name in SPECIALIST_AGENTS if not is_loaded(name)]
+        if pending:
+            _warm_up_in_background(pending)
+        route = (await gather_stages({"route": (arun_chitchat(user_text, user_id), timeouts["route"])}))["route"]
+        timings["route"] = route["seconds"]
+        if route["error"]:
+            return await finish("", None, None, f"route: {route['error']}")
+        reply, escalate_to = route["result"]
+
+    escalate_to = (escalate_to or "").lower() or None
+    if escalate_to not in ASYNC_RUNNERS:
+        return await finish(reply, None, None, None)
+
+    outcome = (await gather_stages({
+        escalate_to: (ASYNC_RUNNERS[escalate_to](user_text, user_id), timeouts[escalate_to])
+    }))[escalate_to]
+    timings[escalate_to] = outcome["seconds"]
+    error = f"{escalate_to}: {outcome['error']}" if outcome["error"] else None
+    return await finish(reply, escalate_to, outcome["result"], error)
@@ -0,0 +1,260 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+ROW_GROUP_SIZE = 4096       # rows per row group: the unit of random access and of predicate pushdown
+CACHED_ROW_GROUPS = 16      # decoded row groups kept by CorpusStore.take
+COMPRESSION = "zstd"
+WRITE_BATCH = ROW_GROUP_SIZE
+
+# Strings that repeat across rows are dictionary-encoded: a chunk repeats
+# its page's url/title/description, and language/source have a few values.
+_DICT = pa.dictionary(pa.int32(), pa.string())
+
+RAW_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("url", pa.string()),
+    ("title", pa.string()),
+    ("description", pa.string()),
+    ("content", pa.large_string()),
+    ("timestamp", pa.float64()),
+    ("content_length", pa.int32()),
+    ("language", _DICT),
+    ("source", _DICT),
+    ("cluster_id", pa.string()),
+    ("duplicate_count", pa.int32()),
+    ("duplicate_urls", pa.list_(pa.string())),
+])
+
+CHUNK_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("url", _DICT),
+    ("title", _DICT),
+    ("description", _DICT),
+    ("content", pa.string()),
+    ("timestamp", pa.float64()),
+    ("content_length", pa.int32()),
+    ("language", _DICT),
+    ("source", _DICT),
+    ("document_type", _DICT),
+    ("heading_path", _DICT),
+    ("token_count", pa.int32()),
+    ("cluster_id", _DICT),
+    ("chunk_cluster_id", pa.string()),
+    ("duplicate_count", pa.int32()),
+])
+
+
+def is_store(path):
+    return str(path).endswith(".parquet")
+
+
+def schema_for(path):
+    """Chunk schema for files named like chunks, raw page schema otherwise."""
+    return CHUNK_SCHEMA if "chunk" in os.path.basename(str(path)) else RAW_SCHEMA
+
+
+# ============================================================================
+# WRITE
+# ============================================================================
+
+class CorpusWriter:
+    """
+    Streaming Parquet writer for raw pages or chunks. Records are dicts as
+    in the JSONL files; missing fields are null and unknown fields are
+    dropped. The file is written under a temporary name and moved into
+    place on close, so readers never see a partial store.
+    """
+
+    def __init__(self, path, schema=None):
+        self.path = str(path)
+        self.schema = schema or schema_for(path)
+        self._tmp = self.path + ".tmp"
+        self._writer = pq.ParquetWriter(self._tmp, self.schema, compression=COMPRESSION, use_dictionary=True)
+        self._pending = []
+        self.rows = 0
+
+    def write(self, records):
+        self._pending.extend(records)
+        while len(self._pending) >= ROW_GROUP_SIZE:
+            self._flush(self._pending[:ROW_GROUP_SIZE])
+            self._pending = self._pending[ROW_GROUP_SIZE:]
+
+    def _flush(self, records):
+        if records:
+            table = pa.Table.from_pylist(records, schema=self.schema)
+            self._writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+            self.rows += len(records)
+
+    def close(self):
+        self._flush(self._pending)
+        self._pending = []
+        self._writer.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._writer.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+# ============================================================================
+# READ
+# ============================================================================
+
+def _filter(source=None, language=None):
+    expression = None
+    for column, value in (("source", source), ("language", language)):
+        if value:
+            term = ds.field(column) == value
+            expression = term if expression is None else expression & term
+    return expression
+
+
+class CorpusStore:
+    """
+    Read side of a corpus Parquet file: projected, filtered scans and
+    random access by row. Row numbers are positions in the file and stay
+    valid until it is rewritten.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._file = pq.ParquetFile(self.path, memory_map=True)
+        metadata = self._file.metadata
+        self.num_rows = metadata.num_rows
+        self.schema = self._file.schema_arrow
+        self._group_starts = np.cumsum(
+            [0] + [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        )
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()  # the cache is shared by the retrieval threads
+
+    @property
+    def columns(self):
+        return self.schema.names
+
+    def read(self, columns=None, source=None, language=None):
+        """Whole table (or the matching rows), decoding only `columns`."""
+        return ds.dataset(self.path, format="parquet").to_table(columns=columns, filter=_filter(source, language))
+
+    def scan(self, columns=None, source=None, language=None, batch_size=ROW_GROUP_SIZE):
+        """Record batches in file order; row groups whose statistics rule out the filter are skipped."""
+        dataset = ds.dataset(self.path, format="parquet")
+        yield from dataset.to_batches(columns=columns, filter=_filter(source, language), batch_size=batch_size)
+
+    def iter_rows(self, start=0, columns=None, batch_size=ROW_GROUP_SIZE):
+        """(end_row, records) from row `start` on; end_row is where the next batch starts."""
+        group = max(int(np.searchsorted(self._group_starts, start, side="right")) - 1, 0)
+        for group in range(group, self._file.metadata.num_row_groups):
+            first = int(self._group_starts[group])
+            table = self._file.read_row_group(group, columns=columns)
+            if start > first:
+                table = table.slice(start - first)
+                first = start
+            for offset in range(0, table.num_rows, batch_size):
+                batch = table.slice(offset, batch_size)
+                yield first + offset + batch.num_rows, batch.to_pylist()
+
+    def _row_group(self, group, columns):
+        key = (group, tuple(columns) if columns else None)
+        with self._lock:
+            table = self._cache.get(key)
+            if table is not None:
+                self._cache.move_to_end(key)
+                return table
+        table = self._file.read_row_group(group, columns=columns)
+        with self._lock:
+            self._cache[key] = table
+            if len(self._cache) > CACHED_ROW_GROUPS:
+                self._cache.popitem(last=False)
+        return table
+
+    def take(self, rows, columns=None):
+        """Records at `rows`, in the order given."""
+        records = []
+        for row in rows:
+            row = int(row)
+            if not 0 <= row < self.num_rows:
+                raise IndexError(f"Row {row} out of range for {self.path} ({self.num_rows} rows)")
+            group = int(np.searchsorted(self._group_starts, row, side="right")) - 1
+            table = self._row_group(group, columns)
+            records.append(table.slice(row - int(self._group_starts[group]), 1).to_pylist()[0])
+        return records
+
+    def row(self, row, columns=None):
+        return self.take([row], columns)[0]
+
+
+# ============================================================================
+# CONVERSION
+# ============================================================================
+
+def iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping invalid JSON line: {line[:100]}...")
+
+
+def convert(jsonl_path, store_path=None, schema=None):
+    """Write a JSONL corpus file as a Parquet store; returns the store path."""
+    store_path = store_path or os.path.splitext(jsonl_path)[0] + ".parquet"
+    t0 = time.perf_counter()
+    with CorpusWriter(store_path, schema or schema_for(jsonl_path)) as writer:
+        batch = []
+        for record in iter_jsonl(jsonl_path):
+            batch.append(record)
+            if len(batch) >= WRITE_BATCH:
+                writer.write(batch)
+                batch = []
+        writer.write(batch)
+    before, after = os.path.getsize(jsonl_path), os.path.getsize(store_path)
+    print(f"✅ {jsonl_path} -> {store_path}: {writer.rows:,} rows, "
+          f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB in {time.perf_counter() - t0:.1f}s")
+    return store_path
+
+
+def describe(store_path):
+    store = CorpusStore(store_path)
+    metadata = pq.ParquetFile(store_path).metadata
+    print(f"{store_path}: {store.num_rows:,} rows in {metadata.num_row_groups} row groups, "
+          f"{os.path.getsize(store_path) / 1e6:.1f} MB")
+    for i, field in enumerate(store.schema):
+        size = sum(metadata.row_group(g).column(i).total_compressed_size for g in range(metadata.num_row_groups))
+        kind = f"dictionary<{field.type.value_type}>" if pa.types.is_dictionary(field.type) else str(field.type)
+        print(f"  {field.name:<18} {kind:<20} {size / 1e6:8.2f} MB")
+
+
+if __name__ == "__main__":
+    # python corpus_store.py convert <file.jsonl> [out.parquet]
+    # python corpus_store.py info <file.parquet>
+    if len(sys.argv) >= 3 and sys.argv[1] == "convert":
+        convert(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "info":
+        describe(sys.argv[2])
+    else:
+        print("usage: corpus_store.py convert <file.jsonl> [out.parquet] | info <file.parquet>")
+        sys.exit(2)
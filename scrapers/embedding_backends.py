@@ -0,0 +1,357 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Which implementation embeds text, for ingestion and for query-time search:
+#   huggingface  sentence-transformers on PyTorch (the original setup)
+#   onnx         ONNX Runtime export of the same model, no PyTorch import
+#   onnx-int8    the same export with int8 dynamically quantized weights
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface").lower()
+EMBEDDING_BACKENDS = ("huggingface", "onnx", "onnx-int8")
+ONNX_MODEL_DIR = Path(os.getenv(
+    "ONNX_MODEL_DIR",
+    Path(__file__).resolve().parents[1] / "models" / "all-MiniLM-L6-v2-onnx",
+))
+MAX_SEQ_LENGTH = 256        # all-MiniLM-L6-v2's sentence-transformers limit
+ENCODE_BATCH_SIZE = 64
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+
+# parity and bench runs are appended here
+RESULTS_FILE = Path(__file__).resolve().parents[1] / "benchmarks" / "results" / "embedding_backends.json"
+
+
+_MODEL_ID_SUFFIXES = {"huggingface": "", "onnx": "+onnx", "onnx-int8": "+int8"}
+
+
+def model_id(model_name, backend=EMBEDDING_BACKEND):
+    """
+    Name the embedding cache and manifest see. Each backend gets its own:
+    ONNX vectors are only expected to match the PyTorch ones, and stay
+    apart until a parity run on the real model (RESULTS_FILE) shows it.
+    """
+    return f"{model_name}{_MODEL_ID_SUFFIXES[backend]}"
+
+
+# ============================================================================
+# ONNX RUNTIME
+# ============================================================================
+
+try:
+    from langchain_core.embeddings import Embeddings as _EmbeddingsBase
+except ImportError:  # ingestion workers do not need langchain
+    _EmbeddingsBase = object
+
+
+class OnnxEmbeddings(_EmbeddingsBase):
+    """
+    Sentence embeddings from an ONNX export of a BERT-style encoder:
+    tokenizers for tokenization, ONNX Runtime for the forward pass, then
+    the same mean pooling and L2 normalization as sentence-transformers.
+    Texts are batched by length so little time is spent on padding.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=False, threads=None,
+                 batch_size=ENCODE_BATCH_SIZE, max_length=MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_file = model_dir / (ONNX_INT8_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(
+                f"{model_file} not found; run: python scrapers/embedding_backends.py export"
+            )
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.no_padding()
+        self.batch_size = batch_size
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        width = max(len(e.ids) for e in encodings)
+        ids = np.zeros((len(texts), width), dtype=np.int64)
+        mask = np.zeros((len(texts), width), dtype=np.int64)
+        for i, e in enumerate(encodings):
+            ids[i, :len(e.ids)] = e.ids
+            mask[i, :len(e.ids)] = 1
+
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def embed(self, texts):
+        """float32 matrix, one unit vector per text, in input order."""
+        texts = [t if t.strip() else " " for t in texts]
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        out = None
+        for start in range(0, len(texts), self.batch_size):
+            rows = order[start: start + self.batch_size]
+            vectors = self._encode([texts[i] for i in rows])
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[rows] = vectors
+        return out
+
+    def embed_documents(self, texts):
+        return self.embed(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+
+# ============================================================================
+# FACTORY
+# ============================================================================
+
+def load_embeddings(model_name, backend=EMBEDDING_BACKEND, threads=None, batch_size=ENCODE_BATCH_SIZE,
+                    model_dir=ONNX_MODEL_DIR):
+    """An object with embed_documents/embed_query for `backend`."""
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {EMBEDDING_BACKENDS}")
+
+    if backend == "huggingface":
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={"batch_size": batch_size})
+
+    return OnnxEmbeddings(model_dir, quantized=backend == "onnx-int8", threads=threads, batch_size=batch_size)
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def export_onnx(model_name, out_dir=ONNX_MODEL_DIR, quantize=True):
+    """
+    Put model.onnx, tokenizer.json and (with `quantize`) model_int8.onnx in
+    `out_dir`. Uses the ONNX export published with the sentence-transformers
+    model when there is one, else exports it with PyTorch (needed only for
+    this step).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+    from huggingface_hub import hf_hub_download
+
+    for name in ("tokenizer.json", "config.json"):
+        os.replace(hf_hub_download(repo, name, local_dir=out_dir / ".download"), out_dir / name)
+    try:
+        os.replace(hf_hub_download(repo, "onnx/model.onnx", local_dir=out_dir / ".download"), out_dir / ONNX_MODEL_FILE)
+        print(f"Downloaded the published ONNX export of {repo}")
+    except Exception as e:
+        print(f"No published ONNX export ({e}); exporting with PyTorch")
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(repo)
+        model = AutoModel.from_pretrained(repo).eval()
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+        axes = {n: {0: "batch", 1: "sequence"} for n in names}
+        axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        torch.onnx.export(
+            model, tuple(sample[n] for n in names), str(out_dir / ONNX_MODEL_FILE),
+            input_names=names, output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=14,
+        )
+
+    if quantize:
+        quantize_onnx(out_dir)
+    print(f"✅ ONNX model ready in {out_dir}")
+    return out_dir
+
+
+def quantize_onnx(model_dir=ONNX_MODEL_DIR):
+    """Dynamic int8 quantization of the export's weights (activations stay float)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model_dir = Path(model_dir)
+    quantize_dynamic(str(model_dir / ONNX_MODEL_FILE), str(model_dir / ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+    print(f"Quantized: {(model_dir / ONNX_MODEL_FILE).stat().st_size / 1e6:.1f} MB -> "
+          f"{(model_dir / ONNX_INT8_FILE).stat().st_size / 1e6:.1f} MB")
+
+
+# ============================================================================
+# PARITY AND THROUGHPUT
+# ============================================================================
+
+def parity_check(persist_dir, collection_name, backend="onnx", sample=500, model_name="all-MiniLM-L6-v2"):
+    """
+    Re-embed `sample` stored documents with `backend` and compare against
+    the vectors already in the Chroma collection. Returns cosine stats.
+    """
+    import chromadb
+
+    collection = chromadb.PersistentClient(path=str(persist_dir)).get_collection(collection_name)
+    stored = collection.get(limit=sample, include=["embeddings", "documents"])
+    reference = np.asarray(stored["embeddings"], dtype=np.float32)
+    embeddings = load_embeddings(model_name, backend)
+    candidate = np.asarray(embeddings.embed_documents(stored["documents"]), dtype=np.float32)
+
+    reference /= np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    candidate /= np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    cosine = (reference * candidate).sum(axis=1)
+
+    # Does each re-embedded chunk still retrieve itself first among the sample?
+    top1 = float(np.mean(np.argmax(candidate @ reference.T, axis=1) == np.arange(len(reference))))
+    return {
+        "backend": backend,
+        "documents": len(reference),
+        "cosine_min": round(float(cosine.min()), 6),
+        "cosine_mean": round(float(cosine.mean()), 6),
+        "max_abs_diff": round(float(np.abs(reference - candidate).max()), 6),
+        "self_top1": round(top1, 4),
+    }
+
+
+def _rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure_backend(backend, texts, model_name="all-MiniLM-L6-v2", threads=None, batch_size=ENCODE_BATCH_SIZE):
+    """Import + load time, throughput and peak RSS of one backend in this process."""
+    t0 = time.perf_counter()
+    embeddings = load_embeddings(model_name, backend, threads=threads, batch_size=batch_size)
+    load_seconds = time.perf_counter() - t0
+
+    embeddings.embed_documents(texts[:batch_size])  # warm-up
+    t0 = time.perf_counter()
+    embeddings.embed_documents(texts)
+    encode_seconds = time.perf_counter() - t0
+
+    latencies = []
+    for text in texts[:50]:
+        t0 = time.perf_counter()
+        embeddings.embed_query(text)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "sentences_per_second": round(len(texts) / encode_seconds, 1),
+        "query_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+        "peak_rss_mb": round(_rss_mb(), 1),
+    }
+
+
+def benchmark(texts, backends=EMBEDDING_BACKENDS, threads=None):
+    """Run measure_backend for each backend in a fresh interpreter, so import cost and RSS are not shared."""
+    import subprocess
+    import tempfile
+
+    results = []
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(texts, f)
+        texts_file = f.name
+    try:
+        for backend in backends:
+            cmd = [sys.executable, __file__, "measure", backend, texts_file] + ([str(threads)] if threads else [])
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                results.append({"backend": backend, "error": proc.stderr.strip().splitlines()[-1:]})
+            else:
+                results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    finally:
+        os.remove(texts_file)
+    return results
+
+
+def record_results(command, results, path=RESULTS_FILE):
+    """Append one parity/bench run, with the versions it ran on, to `path`."""
+    import platform
+
+    try:
+        import onnxruntime
+        ort_version = onnxruntime.__version__
+    except ImportError:
+        ort_version = None
+    path = Path(path)
+    runs = json.loads(path.read_text(encoding="utf-8")) if path.exists() else []
+    runs.append({
+        "command": command,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": f"{platform.machine()} {platform.processor() or ''}".strip(),
+        "cpu_count": os.cpu_count(),
+        "onnxruntime": ort_version,
+        "results": results,
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(runs, indent=2) + "\n", encoding="utf-8")
+    print(f"✅ Recorded in {path}")
+
+
+def sample_texts(chunk_file, n=2000):
+    """Chunk texts from a JSONL file or corpus store, for benchmarking."""
+    if str(chunk_file).endswith(".parquet"):
+        from corpus_store import CorpusStore
+
+        store = CorpusStore(chunk_file)
+        return store.read(columns=["content"]).column("content").to_pylist()[:n]
+    texts = []
+    with open(chunk_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                texts.append(json.loads(line)["content"])
+            except Exception:
+                continue
+            if len(texts) >= n:
+                break
+    return texts
+
+
+if __name__ == "__main__":
+    # python embedding_backends.py export [model_name]
+    # python embedding_backends.py parity <persist_dir> [collection] [onnx|onnx-int8]
+    # python embedding_backends.py bench <chunks.jsonl|.parquet> [threads]
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "export":
+        export_onnx(sys.argv[2] if len(sys.argv) > 2 else "all-MiniLM-L6-v2")
+    elif command == "parity" and len(sys.argv) > 2:
+        results = []
+        for backend in ([sys.argv[4]] if len(sys.argv) > 4 else ["onnx", "onnx-int8"]):
+            results.append(parity_check(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "langchain", backend))
+            print(json.dumps(results[-1]))
+        record_results("parity", results)
+    elif command == "bench" and len(sys.argv) > 2:
+        threads = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        results = benchmark(sample_texts(sys.argv[2]), threads=threads)
+        for result in results:
+            print(json.dumps(result))
+        record_results("bench", results)
+    elif command == "measure":
+        with open(sys.argv[3], "r", encoding="utf-8") as f:
+            texts = json.load(f)
+        threads = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        print(json.dumps(measure_backend(sys.argv[2], texts, threads=threads)))
+    else:
+        print("usage: embedding_backends.py export [model] | parity <persist_dir> [collection] [backend] "
+              "| bench <chunk file> [threads]")
+        sys.exit(2)
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+KEY_BYTES = 16
+INITIAL_CAPACITY = 4096
+
+
+def content_key(model_name, text):
+    """Digest of (model name, chunk text); identical text embeds identically."""
+    h = hashlib.blake2b(digest_size=KEY_BYTES)
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.digest()
+
+
+class EmbeddingCache:
+    """
+    On-disk, content-addressed embedding store.
+
+    cache_dir/
+      vectors.f32   float32 matrix (capacity x dim), memory-mapped
+      keys.npy      row -> content key (uint8 x 16), in row order
+      meta.json     model, dim, count, capacity
+
+    Vectors are written before keys and meta, so an interrupted run at
+    worst loses the rows appended since the last flush().
+    """
+
+    def __init__(self, cache_dir, model_name):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.dim = None
+        self.count = 0
+        self.capacity = 0
+        self.hits = 0
+        self.misses = 0
+        self._vectors = None
+        self._keys = []
+        self._index = {}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        meta_path = os.path.join(cache_dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta["model"] != model_name:
+                raise ValueError(f"Embedding cache at {cache_dir} was built with {meta['model']}, not {model_name}")
+            self.dim, self.count, self.capacity = meta["dim"], meta["count"], meta["capacity"]
+            keys = np.load(os.path.join(cache_dir, "keys.npy"))[: self.count]
+            self._keys = [k.tobytes() for k in keys]
+            self._index = {k: row for row, k in enumerate(self._keys)}
+            self._vectors = self._open(self.capacity)
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.cache_dir, "vectors.f32")
+
+    def _open(self, capacity):
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self, needed):
+        capacity = max(self.capacity, INITIAL_CAPACITY)
+        while capacity < needed:
+            capacity *= 2
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self.capacity = capacity
+        self._vectors = self._open(capacity)
+
+    def keys_for(self, texts):
+        return [content_key(self.model_name, t) for t in texts]
+
+    def lookup(self, keys):
+        """Row per key, -1 where the key is not cached."""
+        rows = np.fromiter((self._index.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        found = int((rows >= 0).sum())
+        self.hits += found
+        self.misses += len(keys) - found
+        return rows
+
+    def get(self, rows):
+        """Copy of the cached vectors at `rows` (all must be >= 0)."""
+        return np.array(self._vectors[rows])
+
+    def add(self, keys, vectors):
+        """Append vectors for keys not already cached."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-d vectors, got {vectors.shape[1]}-d")
+
+        new = []
+        for i, key in enumerate(keys):
+            if key not in self._index:
+                self._index[key] = self.count + len(new)
+                new.append(i)
+        if not new:
+            return
+
+        if self.count + len(new) > self.capacity:
+            self._grow(self.count + len(new))
+        self._vectors[self.count: self.count + len(new)] = vectors[new]
+        self._keys.extend(keys[i] for i in new)
+        self.count += len(new)
+
+    def flush(self):
+        """Persist vectors, then the key index and metadata."""
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        keys_tmp = os.path.join(self.cache_dir, "keys.tmp.npy")
+        # uint8 rows rather than a bytes dtype, which would strip trailing NULs
+        np.save(keys_tmp, np.frombuffer(b"".join(self._keys), dtype=np.uint8).reshape(-1, KEY_BYTES))
+        os.replace(keys_tmp, os.path.join(self.cache_dir, "keys.npy"))
+
+        meta_tmp = os.path.join(self.cache_dir, "meta.json.tmp")
+        with open(meta_tmp, "w") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "count": self.count, "capacity": self.capacity}, f)
+        os.replace(meta_tmp, os.path.join(self.cache_dir, "meta.json"))
@@ -1,166 +1,349 @@
 import json
 import os
+import queue
+import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from tqdm import tqdm
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain.schema import Document
+
+from corpus_store import CorpusStore, is_store
+from embedding_backends import EMBEDDING_BACKEND, load_embeddings, model_id
+from embedding_cache import EmbeddingCache
+from ingestion_manifest import IngestionManifest, content_hash
 
 # ==================Config==============
 INPUT_FILE = "immigration_chunks_ircc.jsonl"
 PERSIST_DIR = "./chroma_immigration"
-BATCH_SIZE = 1000
+COLLECTION_NAME = "langchain"   # langchain_chroma's default, read by app/agents/knowledge_base.py
+BATCH_SIZE = 1000               # chunks per Chroma write
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+INGESTION_BATCH = "2025-10-04"  #this needs to be changed for new sources
+EMBEDDING_CACHE_DIR = "./embedding_cache"  # vectors reused across runs; only new/changed text is embedded
+MANIFEST_FILE = "ingestion_manifest.sqlite"  # inside PERSIST_DIR
+
+# Pipeline: reader thread -> embedding worker processes -> single writer thread
+NUM_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+THREADS_PER_WORKER = max(1, (os.cpu_count() or 2) // NUM_WORKERS)
+ENCODE_BATCH_SIZE = 64          # sentence-transformers batch inside each worker
+QUEUE_DEPTH = 2 * NUM_WORKERS   # batches buffered between stages
+CACHE_FLUSH_EVERY = 20          # batches between embedding cache checkpoints
+WRITE_RETRIES = 3
+
+_DONE = object()
+
+
+# ================Stage 1: reader===============
+def parse_line(line, offset):
+    """(id, text, metadata) for one chunk line, or None if it is invalid."""
+    try:
+        return parse_record(json.loads(line))
+    except Exception as e:
+        print(f"Skipping invalid line at byte {offset}: {e}")
+        return None
+
+
+def parse_record(data):
+    """(id, text, metadata) for one chunk record; raises if a field is missing."""
+    metadata = {
+        "id": data["id"],
+        "url": data["url"],
+        "title": data["title"],
+        "description": data["description"],
+        "timestamp": data["timestamp"],
+        "content_length": data["content_length"],
+        "language": data["language"],
+        "source": data["source"],    # "ircc_gov" or "canadavisa", set by the content scrapers
+        "document_type": data["document_type"],
+        "ingestion_batch": INGESTION_BATCH,
+        # part of the manifest hash, so switching EMBEDDING_BACKEND re-embeds every chunk
+        "embedding_model": model_id(EMBEDDING_MODEL),
+    }
+    if data.get("heading_path"):  # written by markdown_chunker.py
+        metadata["heading_path"] = data["heading_path"]
+    for field in ("cluster_id", "chunk_cluster_id"):  # written by near_dedup.py
+        if data.get(field):
+            metadata[field] = data[field]
+    return data["id"], data["content"], metadata
+
+
+def read_batches(input_file, start_offset, out_q):
+    """
+    Read the input from `start_offset` and put batches of up to BATCH_SIZE
+    chunks on the bounded `out_q` as (end_offset, ids, texts, metadatas).
+    end_offset is where the next batch starts, so it is a safe resume point.
+    For a corpus store (.parquet) offsets are row numbers instead of bytes.
+    """
+    if is_store(input_file):
+        for offset, records in CorpusStore(input_file).iter_rows(start=start_offset, batch_size=BATCH_SIZE):
+            ids, texts, metadatas = [], [], []
+            for row, record in enumerate(records, offset - len(records)):
+                try:
+                    chunk_id, text, metadata = parse_record(record)
+                except Exception as e:
+                    print(f"Skipping invalid record at row {row}: {e}")
+                    continue
+                ids.append(chunk_id)
+                texts.append(text)
+                metadatas.append({k: v for k, v in metadata.items() if v is not None})
+            out_q.put((offset, ids, texts, metadatas))
+        out_q.put(_DONE)
+        return
+
+    ids, texts, metadatas = [], [], []
+    with open(input_file, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for raw in iter(f.readline, b""):
+            line_offset, offset = offset, offset + len(raw)
+            if not raw.strip():
+                continue
+            parsed = parse_line(raw.decode("utf-8"), line_offset)
+            if parsed is not None:
+                ids.append(parsed[0])
+                texts.append(parsed[1])
+                metadatas.append(parsed[2])
+            if len(ids) >= BATCH_SIZE:
+                out_q.put((offset, ids, texts, metadatas))
+                ids, texts, metadatas = [], [], []
+
+    out_q.put((offset, ids, texts, metadatas))
+    out_q.put(_DONE)
 
-# ================Setup===============
-print("Starting RAG ingestion...")
-print(f"Input: {INPUT_FILE}")
-print(f"Output: {PERSIST_DIR}")
-print(f"Batch size: {BATCH_SIZE}")
-print(f"Model: {EMBEDDING_MODEL}\n")
-
-# load embedding model once
-embeddings = HuggingFaceEmbeddings(
-    model = EMBEDDING_MODEL,
-    encode_kwargs={"batch_size": 32}
-)
-
-# Track progress: use a marker file to know where we left off
-progress_file = os.path.join(PERSIST_DIR, "ingestion_progress.txt")
-start_line = 0
-if os.path.exists(progress_file):
-    with open(progress_file, "r") as f:
-        content = f.read().strip()
-        if content:  # Only convert if not empty
-            start_line = int(content)
-        else:
-            print("⚠️ Progress file is empty. Starting from line 0.")
-    print(f"⏭ Resuming from line {start_line}")
-
-# Count total lines (for progress bar)
-print("🔍 Counting total lines (this may take a moment)...")
-total_lines = 0
-with open(INPUT_FILE, "r",encoding="utf-8") as f:
-    for _ in f:
-        total_lines += 1
-print(f"Total chunks to process: {total_lines:,}")
-
-with open(INPUT_FILE, "r",encoding="utf-8") as f:
-    for _ in range(start_line):
-        next(f,None)
-
-    # Initialize vectorstore (load if exists, else create)
-    vectorstore = None
-    if os.path.exists(PERSIST_DIR):
-        try:
-            vectorstore = Chroma(
-                persist_directory=PERSIST_DIR,
-                embedding_function=embeddings
-            )
-            print("Loaded existing ChromaDB")
-        except Exception as e:
-            print(f"⚠️ Could not load existing DB: {e}. Starting fresh.")
-            vectorstore = None
-
-    # Main ingestion loop
-    documents = []
-    current_line = start_line
-
-    pbar = tqdm(
-        total=total_lines,
-        initial=start_line,
-        desc="Ingesting chunks",
-        unit="chunk"
+
+# ================Stage 2: embedding workers===============
+_worker_embeddings = None
+
+
+def _init_worker(threads):
+    """Load the embedding model once per worker process."""
+    global _worker_embeddings
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    _worker_embeddings = load_embeddings(
+        EMBEDDING_MODEL, EMBEDDING_BACKEND, threads=threads, batch_size=ENCODE_BATCH_SIZE
     )
 
-    start_time = time.time()
 
-    for line in f:
-        try:
-            data = json.loads(line)
-            doc = Document(
-                page_content=data["content"],
-                metadata={
-                    "id": data["id"],
-                    "url": data["url"],
-                    "title": data["title"],
-                    "description": data["description"],
-                    "timestamp": data["timestamp"],
-                    "content_length": data["content_length"],
-                    "language": data["language"],
-                    "source": "canadavisa",    #this needs to be changed for new sources
-                    "document_type": data["document_type"],
-                    "ingestion_batch": "2025-10-04" #this needs to be changed for new sources
-                }
-            )
-            documents.append(doc)
-        except Exception as e:
-            print(f"Skipping invalid line {current_line}: {e}")
-            current_line += 1
-            pbar.update(1)
+def embed_texts(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+# ================Stage 3: Chroma writer===============
+def write_batches(collection, manifest, input_file, snapshot, in_q, pbar, failed):
+    """
+    Sole writer to Chroma. Upserts by chunk id, then records the batch and
+    its end offset in the manifest. After a batch fails WRITE_RETRIES times
+    it stops writing (so the resume offset stays at the last good batch)
+    and only drains the queue.
+    """
+    while True:
+        item = in_q.get()
+        if item is _DONE:
+            return
+        if failed:
             continue
+        end_offset, ids, texts, metadatas, hashes, vectors, unchanged = item
 
-        # Process batch
-        if len(documents) >= BATCH_SIZE:
-            batch_start_time = time.time()
+        batch_start_time = time.time()
+        for attempt in range(1, WRITE_RETRIES + 1):
             try:
-                if vectorstore is None:
-                    vectorstore = Chroma.from_documents(
-                        documents,
-                        embeddings,
-                        persist_directory=PERSIST_DIR
-                    )
-                else:
-                    vectorstore.add_documents(documents)
+                if ids:
+                    collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+                manifest.commit_batch(input_file, snapshot, list(zip(ids, hashes)), unchanged, end_offset)
+                break
             except Exception as e:
-                print(f"\nError adding batch: {e}")
-                documents = []
-                current_line += BATCH_SIZE
-                pbar.update(BATCH_SIZE)
-                continue
+                print(f"\nError writing batch (attempt {attempt}/{WRITE_RETRIES}): {e}")
+                if attempt == WRITE_RETRIES:
+                    failed.append(e)
+                else:
+                    time.sleep(2 ** attempt)
+        if failed:
+            continue
+
+        elapsed = time.time() - batch_start_time
+        pbar.set_postfix({"write_time": f"{elapsed:.1f}", "queued": in_q.qsize()})
+        pbar.update(end_offset - pbar.n)
+
+
+# ================Pipeline===============
+def ingest(input_file=INPUT_FILE, persist_dir=PERSIST_DIR, cache_dir=EMBEDDING_CACHE_DIR, drop_legacy=False):
+    """
+    Bring the Chroma collection in line with `input_file`: embed and upsert
+    new or changed chunks, skip unchanged ones and delete chunks that are no
+    longer in the file. Safe to re-run; an interrupted run resumes from the
+    last written batch. Returns False if the run failed.
+
+    A collection with vectors but no manifest was written by the older
+    random-id ingestion; its records can't be matched to chunk ids, so the
+    run refuses to start unless `drop_legacy` lets it recreate the collection.
+    """
+    import chromadb
+
+    print("Starting RAG ingestion...")
+    print(f"Input: {input_file}")
+    print(f"Output: {persist_dir}")
+    print(f"Batch size: {BATCH_SIZE}")
+    print(f"Model: {EMBEDDING_MODEL} ({EMBEDDING_BACKEND})")
+    print(f"Workers: {NUM_WORKERS} x {THREADS_PER_WORKER} threads\n")
+
+    os.makedirs(persist_dir, exist_ok=True)
+    manifest = IngestionManifest(os.path.join(persist_dir, MANIFEST_FILE))
+    client = chromadb.PersistentClient(path=persist_dir)
+    collection = client.get_or_create_collection(COLLECTION_NAME)
+    if manifest.count() == 0 and collection.count() > 0:
+        if not drop_legacy:
+            print(f"❌ {persist_dir} has {collection.count():,} vectors but no manifest (older random-id "
+                  "ingestion); ingesting would duplicate them. Re-run with --drop-legacy to delete "
+                  "them and re-ingest, or point PERSIST_DIR at an empty directory.")
+            return False
+        print(f"🗑 Dropping {collection.count():,} legacy random-id vectors from {COLLECTION_NAME}")
+        client.delete_collection(COLLECTION_NAME)
+        collection = client.get_or_create_collection(COLLECTION_NAME)
+
+    snapshot, start_offset, complete = manifest.start(input_file)
+    if is_store(input_file):
+        file_size, unit = CorpusStore(input_file).num_rows, "chunk"
+    else:
+        file_size, unit = os.path.getsize(input_file), "B"
+    if complete:
+        print("✅ Input unchanged since the last complete run. Nothing to do.")
+        return True
+    if start_offset:
+        print(f"⏭ Resuming snapshot {snapshot} from {'row' if unit == 'chunk' else 'byte'} "
+              f"{start_offset:,} of {file_size:,}")
+
+    cache = EmbeddingCache(cache_dir, model_id(EMBEDDING_MODEL))
+    print(f"Embedding cache: {cache.count:,} vectors in {cache_dir}")
+
+    read_q = queue.Queue(maxsize=QUEUE_DEPTH)
+    write_q = queue.Queue(maxsize=QUEUE_DEPTH)
+    failed = []
+    stats = {"new": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    pbar = tqdm(total=file_size, initial=start_offset, desc="Ingesting chunks", unit=unit, unit_scale=True)
+
+    reader = threading.Thread(target=read_batches, args=(input_file, start_offset, read_q), daemon=True)
+    writer = threading.Thread(
+        target=write_batches, args=(collection, manifest, input_file, snapshot, write_q, pbar, failed), daemon=True
+    )
+
+    start_time = time.time()
+    reader.start()
+    writer.start()
+
+    # Keep at most QUEUE_DEPTH batches embedding at once; hand them to the
+    # writer oldest first so the resume offset only ever moves forward.
+    # Only new/changed chunks are embedded, and only cache misses of those
+    # are sent to the workers.
+    try:
+        with ProcessPoolExecutor(
+            max_workers=NUM_WORKERS, initializer=_init_worker, initargs=(THREADS_PER_WORKER,)
+        ) as pool:
+            in_flight = deque()
+            handed_off = 0
+            while not failed:
+                batch = read_q.get()
+                if batch is _DONE:
+                    break
+                in_flight.append(_plan_batch(batch, manifest, cache, pool, stats))
+                if len(in_flight) >= QUEUE_DEPTH:
+                    _hand_off(in_flight.popleft(), cache, write_q)
+                    handed_off += 1
+                    if handed_off % CACHE_FLUSH_EVERY == 0:
+                        cache.flush()
+            while in_flight and not failed:
+                _hand_off(in_flight.popleft(), cache, write_q)
+    except Exception as e:
+        print(f"\nError embedding batch: {e}")
+        failed.append(e)
+    finally:
+        write_q.put(_DONE)
+        writer.join()
+        pbar.close()
+        cache.flush()
+
+    if failed:
+        print(f"\n❌ Ingestion stopped: {failed[0]}")
+        print("Re-run to resume from the last written batch.")
+        return False
+
+    # Chunks of this input that the snapshot no longer contains
+    stale = manifest.stale_ids(input_file, snapshot)
+    for i in range(0, len(stale), BATCH_SIZE):
+        collection.delete(ids=stale[i: i + BATCH_SIZE])
+        manifest.remove(stale[i: i + BATCH_SIZE])
+    stats["deleted"] = len(stale)
+    manifest.finish(input_file)
+
+    # =========== Final Status ===========
+    total_time = time.time() - start_time
+    hours, rem = divmod(total_time, 3600)
+    minutes, seconds = divmod(rem, 60)
+    processed = stats["new"] + stats["updated"] + stats["unchanged"]
+    print("\nIngestion complete!")
+    print(f"Saved to: {persist_dir}")
+    print(f"Total time: {int(hours)}h {int(minutes)}m {seconds:.1f}s")
+    print(f"Avg speed: {processed / total_time:.1f} chunks/sec")
+    print(f"Chunks: {stats['new']:,} new, {stats['updated']:,} updated, "
+          f"{stats['unchanged']:,} unchanged, {stats['deleted']:,} deleted")
+    print(f"Embedding cache: {cache.hits:,} reused, {cache.misses:,} embedded")
+    print("Your Immigration RAG system is ready!")
+    return True
+
+
+def _plan_batch(batch, manifest, cache, pool, stats):
+    """Split a batch into unchanged and new/changed chunks and start embedding the latter."""
+    end_offset, ids, texts, metadatas = batch
+
+    # Chroma rejects duplicate ids within one upsert; the last occurrence wins
+    last = {chunk_id: i for i, chunk_id in enumerate(ids)}
+    keep = sorted(last.values())
+    ids = [ids[i] for i in keep]
+    texts = [texts[i] for i in keep]
+    metadatas = [metadatas[i] for i in keep]
+
+    hashes = [content_hash(t, m) for t, m in zip(texts, metadatas)]
+    stored = manifest.hashes(ids) if ids else {}
+    changed = [i for i, (chunk_id, h) in enumerate(zip(ids, hashes)) if stored.get(chunk_id) != h]
+    unchanged = [chunk_id for chunk_id, h in zip(ids, hashes) if stored.get(chunk_id) == h]
+    updated = sum(1 for i in changed if ids[i] in stored)
+    stats["unchanged"] += len(unchanged)
+    stats["updated"] += updated
+    stats["new"] += len(changed) - updated
+
+    ids = [ids[i] for i in changed]
+    texts = [texts[i] for i in changed]
+    metadatas = [metadatas[i] for i in changed]
+    hashes = [hashes[i] for i in changed]
+
+    keys = cache.keys_for(texts)
+    rows = cache.lookup(keys)
+    misses = np.flatnonzero(rows < 0)
+    future = pool.submit(embed_texts, [texts[i] for i in misses]) if len(misses) else None
+    return end_offset, ids, texts, metadatas, hashes, unchanged, keys, rows, misses, future
+
 
-            current_line += len(documents)
-            with open(progress_file,"w") as pf:
-                pf.write(str(current_line))
-            
-            elapsed = time.time() - batch_start_time
-            rate = len(documents) / elapsed if elapsed > 0 else 0
-            pbar.set_postfix({"batch_time" : f"{elapsed:.1f}", "rate" : f"{rate:.1f}/s"})
-            pbar.update(len(documents))
-            documents = []
-
-    if documents:
-        print(f"\n Processing final batch ({len(documents)} chunks)...")
-        try:
-            if vectorstore is None:
-                vectorstore = Chroma.from_documents(
-                    documents,
-                    embeddings,
-                    persist_directory=PERSIST_DIR
-                )
-            else:
-                vectorstore.add_documents(documents)
-
-            current_line += len(documents)
-            with open(progress_file, "w") as pf:
-                pf.write(str(current_line))
-
-        except Exception as e:
-            print(f"Final batch error: {e}")
-            
-    pbar.close()
-
-# =========== Final Status ===========
-
-total_time = time.time() - start_time
-hours, rem = divmod(total_time, 3600)
-minutes, seconds = divmod(rem, 60)
-print("\nIngestion complete!")
-print(f"Saved to: {PERSIST_DIR}")
-print(f"Total time: {int(hours)}h {int(minutes)}m {seconds:.1f}s")
-print(f"Avg speed: {total_lines / total_time:.1f} chunks/sec")
-print("Your Immigration RAG system is ready!")
-        
+def _hand_off(entry, cache, write_q):
+    """Merge cached and freshly embedded vectors and queue the batch for writing."""
+    end_offset, ids, texts, metadatas, hashes, unchanged, keys, rows, misses, future = entry
+    if not texts:
+        write_q.put((end_offset, ids, texts, metadatas, hashes, [], unchanged))
+        return
 
+    embedded = np.asarray(future.result(), dtype=np.float32) if future else None
+    dim = cache.dim if embedded is None else embedded.shape[1]
+    vectors = np.empty((len(texts), dim), dtype=np.float32)
+    hits = np.flatnonzero(rows >= 0)
+    if len(hits):
+        vectors[hits] = cache.get(rows[hits])
+    if embedded is not None:
+        vectors[misses] = embedded
+        cache.add([keys[i] for i in misses], embedded)
+    write_q.put((end_offset, ids, texts, metadatas, hashes, vectors, unchanged))
 
 
+if __name__ == "__main__":
+    sys.exit(0 if ingest(drop_legacy="--drop-legacy" in sys.argv[1:]) else 1)
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+def content_hash(text, metadata):
+    """Hash of a chunk's text and metadata; `ingestion_batch` is ignored."""
+    meta = {k: v for k, v in metadata.items() if k != "ingestion_batch"}
+    payload = json.dumps([text, meta], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class IngestionManifest:
+    """
+    Record of what is in the vector store, kept next to it:
+
+      chunks    id -> content hash, input file, snapshot it was last seen in
+      progress  input file -> fingerprint, snapshot, byte offset, complete
+
+    A snapshot is one full pass over an input file. Chunks of that input
+    not seen by the end of the pass were removed upstream and are deleted.
+    Shared by the pipeline threads; every call takes the lock.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, input TEXT NOT NULL, snapshot TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_input_snapshot ON chunks (input, snapshot)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS progress ("
+            " input TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, snapshot TEXT NOT NULL,"
+            " offset INTEGER NOT NULL, complete INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def start(self, input_file):
+        """
+        (snapshot, byte offset, complete) for this run. An interrupted pass
+        over an unchanged file resumes; a changed file starts a new snapshot.
+        """
+        key = os.path.abspath(input_file)
+        fingerprint = file_fingerprint(input_file)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, snapshot, offset, complete FROM progress WHERE input = ?", (key,)
+            ).fetchone()
+            if row and row[0] == fingerprint:
+                return row[1], row[2], bool(row[3])
+
+            snapshot = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            self._conn.execute(
+                "INSERT OR REPLACE INTO progress (input, fingerprint, snapshot, offset, complete) VALUES (?, ?, ?, 0, 0)",
+                (key, fingerprint, snapshot),
+            )
+            self._conn.commit()
+            return snapshot, 0, False
+
+    def hashes(self, ids):
+        """Stored content hash per id, for the ids already ingested."""
+        with self._lock:
+            placeholders = ",".join("?" * len(ids))
+            rows = self._conn.execute(
+                f"SELECT id, content_hash FROM chunks WHERE id IN ({placeholders})", list(ids)
+            ).fetchall()
+        return dict(rows)
+
+    def commit_batch(self, input_file, snapshot, upserted, unchanged, offset):
+        """
+        Record a written batch: `upserted` is [(id, content_hash)], `unchanged`
+        the ids skipped because their hash matched, `offset` where the next
+        batch starts. One transaction, so the manifest never runs ahead of
+        the store.
+        """
+        key = os.path.abspath(input_file)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, content_hash, input, snapshot) VALUES (?, ?, ?, ?)",
+                [(chunk_id, h, key, snapshot) for chunk_id, h in upserted],
+            )
+            self._conn.executemany(
+                "UPDATE chunks SET snapshot = ?, input = ? WHERE id = ?",
+                [(snapshot, key, chunk_id) for chunk_id in unchanged],
+            )
+            self._conn.execute("UPDATE progress SET offset = ? WHERE input = ?", (offset, key))
+
+    def stale_ids(self, input_file, snapshot):
+        """Ids from this input that the current snapshot did not contain."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM chunks WHERE input = ? AND snapshot != ?", (os.path.abspath(input_file), snapshot)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def remove(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+
+    def finish(self, input_file):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE progress SET complete = 1 WHERE input = ?", (os.path.abspath(input_file),))
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
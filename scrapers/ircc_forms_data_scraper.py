@@ -1,10 +1,12 @@
+import asyncio
 import json
 import time
 import os
-from scrapers.pdf_content_scraper import scrape_form_page  # your existing function
+from scrapers.pdf_content_scraper import CONCURRENCY, HOST_MIN_INTERVAL, scrape_form_pages
 
 OUTPUT_FILE = "ircc_forms_detailed.json"
 CATALOG_FILE = "ircc_forms_catalog.json"
+SAVE_EVERY = 10  # results between checkpoints of OUTPUT_FILE
 
 # Load catalog
 with open(CATALOG_FILE, "r", encoding="utf-8") as f:
@@ -15,7 +17,7 @@ form_pages = []
 for form in catalog:
     # If you saved landing_page_url during initial scrape, use it
     if "landing_page_url" in form and form["landing_page_url"]:
-        form_pages.append(form["landing_page_url"])
+        form_pages.append(form["landing_page_url"].strip())
     else:
         # Fallback: try to guess from form code (risky!)
         code = form.get("form_code", "").replace(" ", "").lower()
@@ -23,45 +25,45 @@ for form in catalog:
             url = f"https://www.canada.ca/en/immigration-refugees-citizenship/services/application/application-forms-guides/{code}.html"
             form_pages.append(url)
 
-# Load existing results (for resume)
+# Load existing results (for resume); failed pages are retried
 if os.path.exists(OUTPUT_FILE):
     with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-        results = json.load(f)
+        results = [item for item in json.load(f) if not item.get("error")]
     completed = {item["form_page_url"] for item in results}
 else:
     results = []
     completed = set()
 
-print(f"Starting scrape. Already completed: {len(completed)}")
 
-for i, url in enumerate(form_pages):
-    if url in completed:
-        print(f"Skipping (already done): {url}")
-        continue
+def save(results):
+    tmp = OUTPUT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, OUTPUT_FILE)
 
-    print(f"[{i+1}/{len(form_pages)}] Scraping: {url}")
-    try:
-        data = scrape_form_page(url)
-        results.append(data)
-        completed.add(url)
 
-        # Save after every success (resume-safe)
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+async def main():
+    todo = list(dict.fromkeys(url for url in form_pages if url not in completed))
+    print(f"Starting scrape. Already completed: {len(completed)}, to scrape: {len(todo)} "
+          f"({CONCURRENCY} pages at once, ≥{HOST_MIN_INTERVAL}s between requests per host)")
+
+    start_time = time.perf_counter()
+    failed = 0
+    async for data in scrape_form_pages(todo):
+        results.append(data)
+        if data.get("error"):
+            failed += 1
+            print(f"❌ Failed to scrape {data['form_page_url']}: {data['error']}")
+        else:
+            completed.add(data["form_page_url"])
+            print(f"[{len(results)}/{len(form_pages)}] Scraped: {data['form_page_url']}")
+        if len(results) % SAVE_EVERY == 0:
+            save(results)  # resume-safe checkpoint
+    save(results)
 
-        time.sleep(1)  # Be kind to IRCC servers
+    elapsed = time.perf_counter() - start_time
+    print(f"✅ Scrape complete! {len(todo) - failed} scraped, {failed} failed in {elapsed:.0f}s "
+          f"({len(todo) / max(elapsed, 1e-9) * 60:.1f} pages/min)")
 
-    except Exception as e:
-        print(f"❌ Failed to scrape {url}: {e}")
-        # Optional: save error placeholder
-        results.append({
-            "form_page_url": url,
-            "error": str(e),
-            "pdf_url": None,
-            "how_to_fill_instructions": ""
-        })
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-        time.sleep(2)  # Wait longer on error
 
-print("✅ Scrape complete!")
\ No newline at end of file
+asyncio.run(main())
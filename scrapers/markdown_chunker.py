@@ -0,0 +1,408 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+from typing import NamedTuple
+
+INPUT_FILES = ["immigration_ircc_content.jsonl", "immigration_canadavisa_content.jsonl"]
+OUTPUT_FILE = "immigration_chunks_structured.jsonl"
+
+MAX_TOKENS = 220            # all-MiniLM-L6-v2 truncates at 256 word pieces; leave headroom
+MIN_TOKENS = 60             # a section smaller than this is packed together with the next one
+BOILERPLATE_MIN_DOCS = 5    # a block repeated in this many documents is template/nav text
+LINK_HEAVY_RATIO = 0.5      # repeated blocks that are mostly links are dropped everywhere
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DOCS_PER_TASK = 16          # documents sent to a worker at a time
+TASKS_IN_FLIGHT = 4 * NUM_WORKERS
+WRITE_BUFFER = 1 << 20
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_LIST_ITEM_RE = re.compile(r"^\s{0,3}(?:[-*+]|\d{1,3}[.)])\s+")
+_TABLE_ROW_RE = re.compile(r"^\s*\|")
+_TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{3,}")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class Block(NamedTuple):
+    kind: str        # heading, paragraph, list, table or code
+    text: str
+    level: int = 0   # heading level, 0 for other blocks
+
+
+def count_tokens(text):
+    """Word and punctuation count; close to, and slightly under, the word-piece count."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def block_key(text):
+    """Identity of a block for boilerplate detection: case and whitespace insensitive."""
+    normalized = _SPACE_RE.sub(" ", text).strip().lower()
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def is_link_heavy(text):
+    link_text = sum(len(m.group(0)) for m in _LINK_RE.finditer(text))
+    return link_text > LINK_HEAVY_RATIO * max(len(text.strip()), 1)
+
+
+def heading_text(raw):
+    return _LINK_RE.sub(r"\1", raw).replace("**", "").replace("__", "").strip()
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def parse_blocks(markdown):
+    """Split crawl4ai markdown into headings, paragraphs, lists, tables and code blocks."""
+    blocks = []
+    kind, lines = None, []
+    fence = None
+    blank_in_list = False
+
+    def flush():
+        nonlocal kind, lines
+        if lines:
+            text = "\n".join(lines).strip("\n")
+            if text.strip():
+                blocks.append(Block(kind, text))
+        kind, lines = None, []
+
+    for line in markdown.splitlines():
+        if fence:
+            lines.append(line)
+            if line.strip().startswith(fence):
+                fence = None
+                flush()
+            continue
+
+        fence_match = _FENCE_RE.match(line)
+        if fence_match:
+            flush()
+            kind, lines, fence = "code", [line], fence_match.group(1)
+            continue
+
+        heading = _HEADING_RE.match(line)
+        if heading:
+            flush()
+            blocks.append(Block("heading", line.strip(), len(heading.group(1))))
+            continue
+
+        if not line.strip():
+            if kind == "list":
+                blank_in_list = True  # loose lists separate items with blank lines
+            else:
+                flush()
+            continue
+
+        if _TABLE_ROW_RE.match(line):
+            if kind != "table":
+                flush()
+                kind = "table"
+        elif _LIST_ITEM_RE.match(line):
+            if kind != "list":
+                flush()
+                kind = "list"
+        elif kind == "list" and (not blank_in_list or line.startswith((" ", "\t"))):
+            pass  # continuation of the current item
+        elif kind != "paragraph":
+            flush()
+            kind = "paragraph"
+
+        blank_in_list = False
+        lines.append(line)
+
+    flush()
+    return blocks
+
+
+# ============================================================================
+# SPLITTING AND PACKING
+# ============================================================================
+
+def _pack(units, joiner, budget, header="", first_budget=None):
+    """
+    Greedy packing of units into pieces of at most `budget` tokens (the
+    first piece `first_budget`, if given); each piece starts with `header`.
+    """
+    header_tokens = count_tokens(header)
+    pieces, current, size = [], [], header_tokens
+    for unit in units:
+        tokens = count_tokens(unit)
+        limit = first_budget if first_budget is not None and not pieces else budget
+        if current and size + tokens > limit:
+            pieces.append(joiner.join(([header] if header else []) + current))
+            current, size = [], header_tokens
+        current.append(unit)
+        size += tokens
+    if current:
+        pieces.append(joiner.join(([header] if header else []) + current))
+    return pieces
+
+
+def _split_text(text, budget, first_budget=None):
+    """Sentences, then words, until every piece fits the budget."""
+    pieces = []
+    for sentence in _SENTENCE_RE.split(text):
+        if count_tokens(sentence) <= budget:
+            pieces.append(sentence)
+        else:
+            pieces.extend(_pack(sentence.split(" "), " ", budget))
+    return _pack(pieces, " ", budget, first_budget=first_budget)
+
+
+def split_block(block, budget=MAX_TOKENS, first_budget=None):
+    """
+    A block as one or more pieces that each fit the token budget. The
+    first piece may get a smaller `first_budget` so it fits the room left
+    in a chunk that is already started.
+    """
+    if first_budget is not None and first_budget >= budget:
+        first_budget = None
+    if count_tokens(block.text) <= (budget if first_budget is None else first_budget):
+        return [block.text]
+
+    lines = block.text.split("\n")
+    if block.kind == "table":
+        # Every piece repeats the header row so its columns stay readable
+        header_len = 2 if len(lines) > 1 and _TABLE_SEPARATOR_RE.match(lines[1]) else 0
+        header = "\n".join(lines[:header_len])
+        rows = []
+        for row in lines[header_len:]:
+            rows.extend(_split_text(row, budget // 2) if count_tokens(row) > budget // 2 else [row])
+        return _pack(rows, "\n", budget, header, first_budget)
+
+    if block.kind == "list":
+        items = []
+        for line in lines:
+            if _LIST_ITEM_RE.match(line) or not items:
+                items.append(line)
+            else:
+                items[-1] += "\n" + line
+        units = []
+        for item in items:
+            units.extend(_split_text(item, budget) if count_tokens(item) > budget else [item])
+        return _pack(units, "\n", budget, first_budget=first_budget)
+
+    if block.kind == "code":
+        return _pack(lines, "\n", budget, first_budget=first_budget)
+
+    return _split_text(block.text, budget, first_budget)
+
+
+def chunk_document(doc, repeated=None, ordinal=0):
+    """
+    Structure-aware chunks of one document. Headings open sections; blocks
+    are packed up to MAX_TOKENS without crossing a section boundary unless
+    the section so far is under MIN_TOKENS. `repeated` maps the keys of
+    blocks seen in many documents to the ordinal of the document that keeps
+    them (-1: dropped everywhere).
+    """
+    repeated = repeated or {}
+    chunks = []
+    path = []       # [(level, heading)] of the section being read
+    current = []    # [(text, tokens, heading path or None for body text)]
+    seen = set()
+
+    def flush():
+        """Emit the current chunk; headings at its end move on to the next one."""
+        nonlocal current
+        tail = len(current)
+        while tail and current[tail - 1][2] is not None:
+            tail -= 1
+        if tail:
+            body = current[:tail]
+            chunks.append(("\n\n".join(t for t, _, _ in body), body_path, sum(n for _, n, _ in body)))
+        current = current[tail:]
+
+    body_path = ""
+    for block in parse_blocks(doc.get("content", "")):
+        if block.kind == "heading":
+            if sum(n for _, n, _ in current) >= MIN_TOKENS:
+                flush()
+            while path and path[-1][0] >= block.level:
+                path.pop()
+            path.append((block.level, heading_text(_HEADING_RE.match(block.text).group(2))))
+            current.append((block.text, count_tokens(block.text), " > ".join(h for _, h in path)))
+            continue
+
+        key = block_key(block.text)
+        if key in seen or repeated.get(key, ordinal) != ordinal:
+            continue
+        seen.add(key)
+        # Leave room for the headings that open the chunk this block may start
+        pending = 0
+        for _, n, heading_path in reversed(current):
+            if heading_path is None:
+                break
+            pending += n
+        # A body under MIN_TOKENS stays in this chunk: the first piece only
+        # gets the room that is left, so it doesn't push the body out alone
+        body = sum(n for _, n, p in current if p is None)
+        first_budget = MAX_TOKENS - sum(n for _, n, _ in current) if 0 < body < MIN_TOKENS else None
+        if first_budget is not None and first_budget <= 0:
+            first_budget = None
+        for piece in split_block(block, MAX_TOKENS - pending, first_budget):
+            piece_tokens = count_tokens(piece)
+            if current and sum(n for _, n, _ in current) + piece_tokens > MAX_TOKENS:
+                flush()
+            if all(p is not None for _, _, p in current):  # first body text of the chunk
+                body_path = " > ".join(h for _, h in path)
+            current.append((piece, piece_tokens, None))
+    flush()
+
+    records = []
+    for i, (content, heading_path, token_count) in enumerate(chunks):
+        records.append({
+            "id": f"{doc['id']}_part{i+1}",
+            "url": doc["url"],
+            "title": doc["title"],
+            "description": doc.get("description", ""),
+            "content": content,
+            "timestamp": doc["timestamp"],
+            "content_length": len(content),
+            "language": doc["language"],
+            "source": doc["source"],
+            "document_type": "text",
+            "heading_path": heading_path,
+            "token_count": token_count,
+        })
+        if doc.get("cluster_id"):  # set by near_dedup.py
+            records[-1]["cluster_id"] = doc["cluster_id"]
+    return records
+
+
+# ============================================================================
+# POOL WORKERS
+# ============================================================================
+
+_repeated = {}
+
+
+def _init_worker(repeated):
+    global _repeated
+    _repeated = repeated
+
+
+def _parse(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        doc = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    content = doc.get("content")
+    if not content or not isinstance(content, str) or not content.strip():
+        return None
+    return doc
+
+
+def _block_keys_task(lines):
+    """Per document: distinct (key, link_heavy) of its non-heading blocks."""
+    results = []
+    for line in lines:
+        doc = _parse(line)
+        if doc is None:
+            results.append(None)
+            continue
+        keys = {}
+        for block in parse_blocks(doc["content"]):
+            if block.kind != "heading":
+                keys.setdefault(block_key(block.text), is_link_heavy(block.text))
+        results.append(list(keys.items()))
+    return results
+
+
+def _chunk_task(task):
+    first_ordinal, lines = task
+    results = []
+    for ordinal, line in enumerate(lines, first_ordinal):
+        doc = _parse(line)
+        results.append(None if doc is None else "".join(
+            json.dumps(record, ensure_ascii=False) + "\n" for record in chunk_document(doc, _repeated, ordinal)
+        ))
+    return results
+
+
+def _tasks(input_files):
+    """(first document ordinal, lines) over all inputs, in order."""
+    ordinal, batch = 0, []
+    for input_file in input_files:
+        with open(input_file, "r", encoding="utf-8") as f:
+            for line in f:
+                batch.append(line)
+                if len(batch) == DOCS_PER_TASK:
+                    yield ordinal, batch
+                    ordinal, batch = ordinal + len(batch), []
+    if batch:
+        yield ordinal, batch
+
+
+def ordered_map(pool, fn, tasks, window=TASKS_IN_FLIGHT):
+    """pool.imap with at most `window` tasks queued, so input is read lazily."""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(fn, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def find_repeated_blocks(pool, input_files):
+    """Key -> ordinal of the one document that keeps it, for blocks in BOILERPLATE_MIN_DOCS+ documents."""
+    doc_counts, first_seen, link_heavy = {}, {}, set()
+    ordinal = 0
+    for results in ordered_map(pool, _block_keys_task, (lines for _, lines in _tasks(input_files))):
+        for keys in results:
+            for key, heavy in keys or ():
+                doc_counts[key] = doc_counts.get(key, 0) + 1
+                first_seen.setdefault(key, ordinal)
+                if heavy:
+                    link_heavy.add(key)
+            ordinal += 1
+    return {
+        key: (-1 if key in link_heavy else first_seen[key])
+        for key, count in doc_counts.items() if count >= BOILERPLATE_MIN_DOCS
+    }
+
+
+def chunk_files(input_files=INPUT_FILES, output_file=OUTPUT_FILE, workers=NUM_WORKERS):
+    t0 = time.perf_counter()
+    with Pool(workers) as pool:
+        repeated = find_repeated_blocks(pool, input_files)
+    print(f"🔁 {len(repeated)} repeated blocks ({sum(v == -1 for v in repeated.values())} dropped as navigation)")
+
+    docs = skipped = chunks = 0
+    with Pool(workers, initializer=_init_worker, initargs=(repeated,)) as pool, \
+            open(output_file, "w", encoding="utf-8", buffering=WRITE_BUFFER) as outfile:
+        for results in ordered_map(pool, _chunk_task, _tasks(input_files)):
+            for text in results:
+                if text is None:
+                    skipped += 1
+                    continue
+                docs += 1
+                chunks += text.count("\n")
+                outfile.write(text)
+
+    elapsed = time.perf_counter() - t0
+    print(f"✅ Done! {docs} documents -> {chunks} chunks in {elapsed:.1f}s "
+          f"({docs / max(elapsed, 1e-9):.0f} docs/s), {skipped} lines skipped. Saved to {output_file}")
+    return chunks
+
+
+if __name__ == "__main__":
+    chunk_files(sys.argv[1:] or INPUT_FILES)
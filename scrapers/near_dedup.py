@@ -0,0 +1,258 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import zlib
+from multiprocessing import Pool
+
+import numpy as np
+
+from markdown_chunker import ordered_map
+
+INPUT_FILES = ["immigration_ircc_content.jsonl", "immigration_canadavisa_content.jsonl"]
+
+NUM_PERM = 128              # MinHash permutations
+BANDS = 16                  # LSH bands of NUM_PERM // BANDS rows: pairs near 0.7 Jaccard become candidates
+THRESHOLD = 0.8             # estimated Jaccard at or above which two texts are duplicates
+DOC_SHINGLE = 5             # word n-grams for whole pages
+CHUNK_SHINGLE = 3           # shorter n-grams for ~300 character chunks
+MAX_ANCHORS_PER_BUCKET = 8  # clusters compared against in one bucket; bounds templated-block blowups
+PREFERRED_SOURCES = ("ircc_gov", "ircc")  # official text wins over paraphrases when picking who stays
+SEED = 20251004
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DOCS_PER_TASK = 64
+TASKS_IN_FLIGHT = 4 * NUM_WORKERS
+WRITE_BUFFER = 1 << 20
+
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(SEED)
+_PERM_A = _rng.integers(1, (1 << 31) - 1, size=(NUM_PERM, 1), dtype=np.uint64)
+_PERM_B = _rng.integers(0, (1 << 31) - 1, size=(NUM_PERM, 1), dtype=np.uint64)
+_EMPTY = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+_WORD_RE = re.compile(r"\w+")
+
+
+def output_for(input_file):
+    """immigration_<source>_content.jsonl -> immigration_<source>_dedup_content.jsonl"""
+    if input_file.endswith("_content.jsonl"):
+        return input_file[: -len("_content.jsonl")] + "_dedup_content.jsonl"
+    return os.path.splitext(input_file)[0] + "_dedup.jsonl"
+
+
+# ============================================================================
+# MINHASH
+# ============================================================================
+
+def shingles(text, size):
+    """Distinct word n-gram hashes (uint32) of lowercased text."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = {" ".join(words[i: i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(hashes):
+    """NUM_PERM-value signature; universal hashing (a*x + b) mod (2^31 - 1)."""
+    if not len(hashes):
+        return _EMPTY
+    return ((_PERM_A * hashes[None, :] + _PERM_B) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: the share of equal signature values."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def _signature_task(task):
+    lines, shingle_size = task
+    out = []
+    for raw in lines:
+        try:
+            record = json.loads(raw)
+            text = record["content"]
+        except Exception:
+            out.append(None)
+            continue
+        hashes = shingles(text, shingle_size)
+        priority = 0 if record.get("source") in PREFERRED_SOURCES else 1
+        out.append((minhash(hashes).tobytes(), len(hashes) > 0, len(text), priority))
+    return out
+
+
+# ============================================================================
+# CLUSTERING
+# ============================================================================
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster(signatures, valid, threshold=THRESHOLD, bands=BANDS):
+    """
+    Union-find roots per row. Rows sharing any band are candidates; a
+    candidate joins a cluster whose anchor it matches at `threshold`.
+    """
+    n = len(signatures)
+    parent = np.arange(n, dtype=np.int64)
+    rows = signatures.shape[1] // bands
+    rows_idx = np.flatnonzero(valid)
+
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[rows_idx, band * rows: (band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+        for group in np.split(order, boundaries):
+            if len(group) < 2:
+                continue
+            anchors = []
+            for member in rows_idx[group]:
+                for anchor in anchors:
+                    if _find(parent, anchor) == _find(parent, member):
+                        break
+                    if similarity(signatures[anchor], signatures[member]) >= threshold:
+                        parent[_find(parent, member)] = _find(parent, anchor)
+                        break
+                else:
+                    if len(anchors) < MAX_ANCHORS_PER_BUCKET:
+                        anchors.append(member)
+
+    return np.array([_find(parent, i) for i in range(n)], dtype=np.int64)
+
+
+def choose_representatives(roots, valid, priority, length):
+    """Per row, the row kept for its cluster: preferred source first, then the longest text."""
+    keep_for = np.arange(len(roots), dtype=np.int64)
+    members = np.flatnonzero(valid)
+    order = np.lexsort((-length[members], priority[members], roots[members]))
+    best = {}
+    for i in members[order]:
+        best.setdefault(int(roots[i]), int(i))
+    for i in members:
+        keep_for[i] = best[int(roots[i])]
+    return keep_for
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def _tasks(input_files, shingle_size):
+    for input_file in input_files:
+        with open(input_file, "rb") as f:
+            batch = []
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(line)
+                if len(batch) == DOCS_PER_TASK:
+                    yield batch, shingle_size
+                    batch = []
+            if batch:
+                yield batch, shingle_size
+
+
+def dedup_files(input_files=INPUT_FILES, chunks=False, threshold=THRESHOLD, workers=NUM_WORKERS):
+    """
+    Drop near-duplicate records across all inputs; each input is written
+    to output_for(input) with the survivors in their original order.
+
+    Works on raw pages (default) or, with `chunks=True`, on chunk files.
+    Survivors get `cluster_id` (`chunk_cluster_id` for chunks), which is
+    their own id, and `duplicate_count`; raw pages also get the merged
+    pages' URLs in `duplicate_urls`.
+    """
+    shingle_size = CHUNK_SHINGLE if chunks else DOC_SHINGLE
+    cluster_field = "chunk_cluster_id" if chunks else "cluster_id"
+    t0 = time.perf_counter()
+
+    # Pass 1: signatures, spilled to a temporary memmap so millions of chunks fit
+    with tempfile.TemporaryDirectory() as tmp:
+        sig_path = os.path.join(tmp, "signatures.u32")
+        capacity, n = 1 << 16, 0
+        signatures = np.memmap(sig_path, dtype=np.uint32, mode="w+", shape=(capacity, NUM_PERM))
+        valid, length, priority, parsed = [], [], [], []
+        with Pool(workers) as pool:
+            for results in ordered_map(pool, _signature_task, _tasks(input_files, shingle_size), TASKS_IN_FLIGHT):
+                for result in results:
+                    if n == capacity:
+                        signatures.flush()
+                        capacity *= 2
+                        del signatures
+                        with open(sig_path, "r+b") as f:
+                            f.truncate(capacity * NUM_PERM * 4)
+                        signatures = np.memmap(sig_path, dtype=np.uint32, mode="r+", shape=(capacity, NUM_PERM))
+                    if result is None:
+                        signatures[n] = _EMPTY
+                        valid.append(False); length.append(0); priority.append(1); parsed.append(False)
+                    else:
+                        signature, has_text, text_len, source_rank = result
+                        signatures[n] = np.frombuffer(signature, dtype=np.uint32)
+                        valid.append(has_text); length.append(text_len); priority.append(source_rank)
+                        parsed.append(True)
+                    n += 1
+        print(f"🔑 Signed {n:,} records in {time.perf_counter() - t0:.1f}s")
+
+        valid = np.array(valid, dtype=bool)
+        roots = cluster(signatures[:n], valid, threshold)
+        keep_for = choose_representatives(
+            roots, valid, np.array(priority, dtype=np.int8), np.array(length, dtype=np.int64)
+        )
+        del signatures
+
+    cluster_sizes = np.bincount(keep_for, minlength=n)
+    dropped = int((keep_for != np.arange(n)).sum())
+    print(f"🧩 {int((cluster_sizes > 1).sum()):,} clusters of near-duplicates; "
+          f"dropping {dropped:,} of {n:,} records")
+
+    # Pass 2: URLs of the pages merged into each survivor, then rewrite the survivors
+    merged_urls = {}
+    if not chunks and dropped:
+        row = 0
+        for input_file in input_files:
+            with open(input_file, "rb") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    if parsed[row] and keep_for[row] != row:
+                        merged_urls.setdefault(int(keep_for[row]), []).append(json.loads(line).get("url", ""))
+                    row += 1
+
+    row = 0
+    for input_file in input_files:
+        kept = 0
+        with open(input_file, "rb") as f, \
+                open(output_for(input_file), "w", encoding="utf-8", buffering=WRITE_BUFFER) as out:
+            for line in f:
+                if not line.strip():
+                    continue
+                if parsed[row] and keep_for[row] == row:
+                    record = json.loads(line)
+                    size = int(cluster_sizes[row])
+                    record[cluster_field] = record.get("id")
+                    record["duplicate_count"] = size - 1
+                    if not chunks and size > 1:
+                        record["duplicate_urls"] = merged_urls.get(row, [])
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    kept += 1
+                row += 1
+        print(f"✅ {input_file}: kept {kept:,} records. Saved to {output_for(input_file)}")
+
+    print(f"📊 Done in {time.perf_counter() - t0:.1f}s")
+    return dropped
+
+
+if __name__ == "__main__":
+    # python near_dedup.py [--chunks] [input.jsonl ...]
+    args = sys.argv[1:]
+    chunk_mode = "--chunks" in args
+    args = [a for a in args if a != "--chunks"]
+    dedup_files(args or INPUT_FILES, chunks=chunk_mode)
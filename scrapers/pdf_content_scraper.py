@@ -1,8 +1,27 @@
+import asyncio
 import json
+import random
 import re
+import time
+from urllib.parse import urljoin, urlparse
 from playwright.sync_api import sync_playwright
 
+# ==================Concurrent scraping config==============
+CONCURRENCY = 4                 # browser contexts (one page each) scraping at once
+HOST_MIN_INTERVAL = 1.0         # seconds between requests to the same host, across all pages
+PAGE_TIMEOUT_MS = 30000         # navigation
+SELECTOR_TIMEOUT_MS = 10000     # waiting for <main>
+SHOW_WAIT_MS = 1000             # after clicking "Show instructions"
+EXPAND_WAIT_MS = 2000           # after clicking "Expand all"
+MAX_RETRIES = 3                 # extra attempts after the first
+BACKOFF_BASE = 2.0              # seconds; doubles per attempt, with jitter
+BACKOFF_MAX = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BLOCKED_RESOURCES = {"image", "media", "font"}  # not needed for links or text
+
+
 def scrape_form_page(url: str):
+    """Scrape one form page in its own browser. For many pages use scrape_form_pages."""
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
@@ -58,11 +77,198 @@ def scrape_form_page(url: str):
             "pdf_url": pdf_url,
             "how_to_fill_instructions": instructions
         }
+
+
+# ================Concurrent scraping: one browser, a pool of pages===============
+class FetchError(Exception):
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class HostRateLimiter:
+    """
+    Spaces requests to each host at least `min_interval` seconds apart,
+    however many pages are scraping. A 429/503 pushes the host's next
+    slot back by its Retry-After (or the backoff delay).
+    """
+
+    def __init__(self, min_interval=HOST_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._next = {}
+        self._locks = {}
+
+    async def wait(self, url):
+        host = urlparse(url).netloc
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def penalize(self, url, delay):
+        host = urlparse(url).netloc
+        self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + delay)
+
+
+def _backoff(attempt):
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+async def _click_if_visible(page, name, wait_ms):
+    try:
+        button = page.get_by_role("button", name=re.compile(name, re.IGNORECASE)).first
+        if await button.is_visible():
+            await button.click()
+            await page.wait_for_timeout(wait_ms)
+    except Exception:
+        pass
+
+
+async def extract_form_page(page, url):
+    """Async twin of scrape_form_page, on an already open page."""
+    response = await page.goto(url, wait_until="domcontentloaded", timeout=PAGE_TIMEOUT_MS)
+    if response is not None and response.status >= 400:
+        retry_after = response.headers.get("retry-after")
+        raise FetchError(
+            f"HTTP {response.status}",
+            retryable=response.status in RETRY_STATUSES,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        )
+    await page.wait_for_selector("main", timeout=SELECTOR_TIMEOUT_MS)
+
+    await _click_if_visible(page, r"Show.*instruction", SHOW_WAIT_MS)
+    await _click_if_visible(page, r"Expand all", EXPAND_WAIT_MS)
+
+    pdf_url = None
+    try:
+        hrefs = await page.eval_on_selector_all('a[href*=".pdf"]', "links => links.map(a => a.getAttribute('href'))")
+        href = next((h for h in hrefs if h), None)
+        if href:
+            pdf_url = urljoin(page.url or url, href)
+    except Exception as e:
+        print(f"⚠️ PDF extraction error on {url}: {e}")
+
+    instructions = ""
+    try:
+        complete_form = page.locator('text="Complete the form"')
+        if await complete_form.count() > 0:
+            text = await complete_form.first.locator("..").text_content() or ""
+            instructions = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+    except Exception:
+        pass
+
+    return {
+        "form_page_url": url,
+        "pdf_url": pdf_url,
+        "how_to_fill_instructions": instructions
+    }
+
+
+async def _new_page(context):
+    page = await context.new_page()
+    page.set_default_timeout(PAGE_TIMEOUT_MS)
+    return page
+
+
+async def _block_heavy_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _worker(context, urls, results, limiter, retries):
+    page = await _new_page(context)
+    while True:
+        try:
+            url = urls.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+
+        result, error = None, None
+        for attempt in range(retries + 1):
+            await limiter.wait(url)
+            try:
+                result = await extract_form_page(page, url)
+                break
+            except Exception as e:
+                error = e
+                if not getattr(e, "retryable", True) or attempt == retries:
+                    break
+                delay = getattr(e, "retry_after", None) or _backoff(attempt)
+                if isinstance(e, FetchError):
+                    limiter.penalize(url, delay)  # the host asked us to slow down
+                print(f"↻ {url}: {e} (retry {attempt + 1}/{retries} in {delay:.1f}s)")
+                await asyncio.sleep(delay)
+                if page.is_closed():
+                    page = await _new_page(context)
+
+        if result is None:
+            result = {"form_page_url": url, "error": str(error), "pdf_url": None, "how_to_fill_instructions": ""}
+        await results.put(result)
+    await page.close()
+
+
+async def scrape_form_pages(urls, concurrency=CONCURRENCY, min_interval=HOST_MIN_INTERVAL, retries=MAX_RETRIES,
+                            headless=True):
+    """
+    Scrape form pages with one browser and `concurrency` contexts, each
+    reusing a single page. Requests to a host are at least `min_interval`
+    seconds apart; timeouts and 429/5xx responses are retried with
+    exponential backoff. Yields one result per URL as it completes (an
+    "error" key means every attempt failed).
+    """
+    urls = [u.strip() for u in urls if u and u.strip()]
+    if not urls:  # e.g. a fully resumed run; don't start a browser
+        return
+    from playwright.async_api import async_playwright
+
+    queue = asyncio.Queue()
+    for url in urls:
+        queue.put_nowait(url)
+    results = asyncio.Queue()
+    limiter = HostRateLimiter(min_interval)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            workers = []
+            for _ in range(max(1, min(concurrency, len(urls)))):
+                context = await browser.new_context()
+                await context.route("**/*", _block_heavy_resources)
+                workers.append(asyncio.create_task(_worker(context, queue, results, limiter, retries)))
+
+            for _ in range(len(urls)):
+                getter = asyncio.create_task(results.get())
+                done, _ = await asyncio.wait([getter, *workers], return_when=asyncio.FIRST_COMPLETED)
+                while getter not in done:
+                    failed = next((w for w in done if w.exception()), None)
+                    if failed:  # a worker died outside the per-URL handling (e.g. the browser crashed)
+                        getter.cancel()
+                        raise failed.exception()
+                    workers = [w for w in workers if not w.done()]
+                    done, _ = await asyncio.wait([getter, *workers], return_when=asyncio.FIRST_COMPLETED)
+                yield getter.result()
+            await asyncio.gather(*workers)
+        finally:
+            await browser.close()
+
+
 # Example usage
 if __name__ == "__main__":
-    url = "https://www.canada.ca/en/immigration-refugees-citizenship/services/application/application-forms-guides/cit0002.html"
-    result = scrape_form_page(url)
-    print(json.dumps(result, indent=2, ensure_ascii=False))
+    import sys
+
+    # python pdf_content_scraper.py [form page URL ...]
+    urls = sys.argv[1:] or [
+        "https://www.canada.ca/en/immigration-refugees-citizenship/services/application/application-forms-guides/cit0002.html"
+    ]
+
+    async def main():
+        async for result in scrape_form_pages(urls):
+            print(json.dumps(result, indent=2, ensure_ascii=False))
 
-    with open("cit0002_full.json", "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+    asyncio.run(main())
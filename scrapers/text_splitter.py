@@ -1,7 +1,20 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import json
+import os
+import sys
+import time
+from multiprocessing import Pool
 from tqdm import tqdm
 
+from corpus_store import CHUNK_SCHEMA, CorpusStore, CorpusWriter, is_store
+from markdown_chunker import ordered_map
+
+INPUT_FILES = ["immigration_ircc_content.jsonl", "immigration_canadavisa_content.jsonl"]
+NUM_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DOCS_PER_TASK = 32          # documents split per worker task
+TASKS_IN_FLIGHT = 4 * NUM_WORKERS
+WRITE_BUFFER = 1 << 20
+
 
 scissors = RecursiveCharacterTextSplitter(
     separators=["\n\n", "\n", ". ", "!", "?", " ", ""],
@@ -9,51 +22,169 @@ scissors = RecursiveCharacterTextSplitter(
     chunk_overlap = 50
 )
 
-def content_splitter(input_file):
-    output_file = "immigration_chunks_ircc.jsonl"
 
-    with open(input_file, "r",encoding="utf-8") as infile:
-        total_lines = sum(1 for _ in open(input_file, "r",encoding="utf-8"))
-        infile.seek(0)
+def output_for(input_file):
+    """immigration_<source>_content.jsonl -> immigration_chunks_<source>.jsonl (same format as the input)"""
+    name, ext = os.path.splitext(os.path.basename(input_file))
+    if name.startswith("immigration_") and name.endswith("_content"):
+        name = "immigration_chunks_" + name[len("immigration_"):-len("_content")]
+    else:
+        name += "_chunks"
+    return os.path.join(os.path.dirname(input_file), name + ext)
+
+
+def split_document(doc):
+    """Chunk records for one scraped document."""
+    chunks = scissors.split_text(doc["content"])
+    records = [
+        {
+            "id": f"{doc['id']}_part{i+1}",
+            "url": doc["url"],
+            "title": doc["title"],
+            "description" : doc["description"],
+            "content": chunk,
+            "timestamp" : doc["timestamp"],
+            "content_length": len(chunk),
+            "language": doc["language"],
+            "source": doc["source"],
+            "document_type": "text"
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+    if doc.get("cluster_id"):  # set by near_dedup.py
+        for record in records:
+            record["cluster_id"] = doc["cluster_id"]
+    return records
+
+
+def _split_task(task):
+    """
+    Worker: split a batch of raw JSONL lines or store records. Returns the
+    chunks (serialized as one JSONL string, or as records for a store),
+    with counts and skip messages for the parent to report.
+    """
+    items, as_records = task
+    out, docs, chunks, skipped = [], 0, 0, []
+    for item in items:
+        if isinstance(item, dict):
+            doc = item
+        else:
+            line = item.decode("utf-8").strip()
+            if not line:
+                continue
+            try:
+                doc = json.loads(line)
+            except json.JSONDecodeError:
+                skipped.append(f"Skipping invalid JSON line: {line[:100]}...")
+                continue
+
+        content = doc.get("content")
+        if not content or not isinstance(content, str) or not content.strip():
+            skipped.append(f"Skipping document with missing/empty content. ID: {doc.get('id', 'unknown')}")
+            continue
+
+        records = split_document(doc)
+        if as_records:
+            out.extend(records)
+        else:
+            out.extend(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        docs += 1
+        chunks += len(records)
+    progress = len(items) if isinstance(items[0], dict) else sum(len(raw) for raw in items)
+    return (out if as_records else "".join(out)), docs, chunks, skipped, progress
 
-        with open(output_file, "w", encoding="utf-8") as outfile:
-            for line in tqdm(infile ,  total=total_lines, desc="Splitting documents"):
-                line = line.strip()
-                if not line:
-                    continue
 
+def _read_tasks(input_file, as_records):
+    """Batches of raw lines (JSONL) or records (store), with the output format flag."""
+    if is_store(input_file):
+        for _, records in CorpusStore(input_file).iter_rows(batch_size=DOCS_PER_TASK):
+            yield records, as_records
+        return
+    with open(input_file, "rb") as infile:
+        batch = []
+        for raw in infile:
+            batch.append(raw)
+            if len(batch) == DOCS_PER_TASK:
+                yield batch, as_records
+                batch = []
+        if batch:
+            yield batch, as_records
+
+
+def _open_output(path):
+    if is_store(path):
+        return CorpusWriter(path, CHUNK_SCHEMA)
+    return open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER)
+
+
+def content_splitter(input_files=INPUT_FILES, output_file=None, workers=NUM_WORKERS):
+    """
+    Split every input into chunks. Each input goes to its own
+    immigration_chunks_<source>.jsonl unless `output_file` combines them.
+    Inputs and outputs ending in .parquet are corpus stores (see
+    corpus_store.py) instead of JSONL. Documents stream through the pool
+    in ordered batches, so each output keeps its input's order. Returns
+    the total number of chunks written.
+    """
+    if isinstance(input_files, str):
+        input_files = [input_files]
+
+    totals = {"docs": 0, "chunks": 0, "skipped": 0, "bytes": 0}
+    start_time = time.perf_counter()
+    combined = _open_output(output_file) if output_file else None
+    try:
+        with Pool(workers) as pool:
+            for input_file in input_files:
+                target = output_file or output_for(input_file)
+                outfile = combined or _open_output(target)
+                as_records = is_store(target)
+                docs = chunks = 0
+                file_start = time.perf_counter()
+                if is_store(input_file):
+                    total, unit = CorpusStore(input_file).num_rows, "doc"
+                else:
+                    total, unit = os.path.getsize(input_file), "B"
                 try:
-                    doc = json.loads(line)
-                
-                except json.JSONDecodeError:
-                    print(f"Skipping invalid JSON line: {line[:100]}...")
-                    continue
-
-                content = doc.get("content")
-                if not content or not isinstance(content, str) or not content.strip():
-                    print(f"Skipping document with missing/empty content. ID: {doc.get('id', 'unknown')}")
-                    continue
-                
-                chunks = scissors.split_text(doc["content"])
-
-                for i, chunk in enumerate(chunks):
-                    small_piece = {
-                        "id": f"{doc['id']}_part{i+1}",
-                        "url": doc["url"],
-                        "title": doc["title"],
-                        "description" : doc["description"],
-                        "content": chunk,
-                        "timestamp" : doc["timestamp"],
-                        "content_length": len(chunk),
-                        "language": doc["language"],
-                        "source": doc["source"],
-                        "document_type": "text"
-                    }
-
-                
-                    outfile.write(json.dumps(small_piece, ensure_ascii=False) + "\n")
-
-    print(f"✅ Done! Chunks saved to {output_file}")
+                    with tqdm(total=total, unit=unit, unit_scale=True,
+                              desc=f"Splitting {os.path.basename(input_file)}") as pbar:
+                        for output, n_docs, n_chunks, skipped, progress in ordered_map(
+                            pool, _split_task, _read_tasks(input_file, as_records), TASKS_IN_FLIGHT
+                        ):
+                            outfile.write(output)
+                            for message in skipped:
+                                tqdm.write(message)
+                            docs += n_docs
+                            chunks += n_chunks
+                            totals["skipped"] += len(skipped)
+                            if unit == "B":
+                                totals["bytes"] += progress
+                            pbar.update(progress)
+                finally:
+                    if outfile is not combined:
+                        outfile.close()
+
+                elapsed = time.perf_counter() - file_start
+                totals["docs"] += docs
+                totals["chunks"] += chunks
+                print(f"✅ {input_file}: {docs:,} documents -> {chunks:,} chunks in {elapsed:.1f}s "
+                      f"({docs / max(elapsed, 1e-9):,.0f} docs/s, {chunks / max(elapsed, 1e-9):,.0f} chunks/s). "
+                      f"Saved to {target}")
+    finally:
+        if combined:
+            combined.close()
+
+    elapsed = time.perf_counter() - start_time
+    rate = f", {totals['bytes'] / 1e6 / max(elapsed, 1e-9):.1f} MB/s of JSONL" if totals["bytes"] else ""
+    print(f"📊 {len(input_files)} input(s), {totals['docs']:,} documents, {totals['chunks']:,} chunks, "
+          f"{totals['skipped']:,} skipped in {elapsed:.1f}s on {workers} workers "
+          f"({totals['docs'] / max(elapsed, 1e-9):,.0f} docs/s{rate})")
+    return totals["chunks"]
+
 
 if __name__ == "__main__":
-    content_splitter("immigration_ircc_content.jsonl")
\ No newline at end of file
+    # python text_splitter.py [-o combined.jsonl] [input.jsonl ...]
+    args = sys.argv[1:]
+    output = None
+    if len(args) >= 2 and args[0] in ("-o", "--output"):
+        output, args = args[1], args[2:]
+    content_splitter(args or INPUT_FILES, output)
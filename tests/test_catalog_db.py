@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from app.agents.catalog_db import Catalog, build_catalog, name_match
+
+PROGRAM_NAMES = [
+    "Federal Skilled Worker Program (FSW)",
+    "Canadian Experience Class (CEC)",
+    "Saskatchewan Immigrant Nominee Program – International Skilled Worker: Saskatchewan Express Entry",
+]
+FORMS_CSV = """form_code,title,last_updated,form_page_url,pdf_url,how_to_fill_instructions
+IMM 5257,Application for Temporary Resident Visa,,,,
+IMM 5409,Statutory Declaration of Common-law Union,,,,
+IMM 1294,Application for Study Permit Made Outside of Canada,,,,
+"""
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory):
+    root = tmp_path_factory.mktemp("catalog")
+    (root / "forms.csv").write_text(FORMS_CSV, encoding="utf-8")
+    programs = {"programs": [{"program_name": name, "eligibility_rules": {}} for name in PROGRAM_NAMES]}
+    (root / "programs.json").write_text(json.dumps(programs), encoding="utf-8")
+    build_catalog(root / "forms.csv", root / "programs.json", root / "catalog.sqlite")
+    return Catalog(root / "catalog.sqlite")
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Express Entry Federal Skilled Worker", 0),
+    ("fsw", 0),
+    ("canadian experience class", 1),
+    ("saskatchewan express entry", None),
+])
+def test_name_match(query, expected):
+    assert name_match(query, PROGRAM_NAMES) == expected
+
+
+def test_program_prefers_full_name_match(catalog):
+    assert catalog.program("Express Entry Federal Skilled Worker")["name"] == PROGRAM_NAMES[0]
+
+
+def test_code_query_is_not_padded_with_unrelated_forms(catalog):
+    assert [form["form_code"] for form in catalog.search_forms("imm 5257e")] == ["IMM 5257"]
+
+
+def test_code_and_keywords(catalog):
+    codes = [form["form_code"] for form in catalog.search_forms("IMM 5257 and study permit")]
+    assert codes[:2] == ["IMM 5257", "IMM 1294"]
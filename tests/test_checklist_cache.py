@@ -0,0 +1,31 @@
+import pytest
+
+from app.agents.checklist_cache import ChecklistKey, checklist_key
+
+
+@pytest.mark.parametrize("text", [
+    "What documents does my wife need for an open work permit? She is from India",
+    "documents for my son's study permit from India",
+    "visitor visa checklist for my pregnant mother from Nigeria",
+    "study permit documents for my husband who was in the army",
+    "work permit documents for my daughter",
+    "study permit checklist, I was refused last year",
+    "work permit documents, I have a job offer",
+    "visitor visa and study permit documents",
+])
+def test_personal_or_ambiguous_requests_are_not_cached(text):
+    assert checklist_key(text) is None
+
+
+@pytest.mark.parametrize("text, key", [
+    ("What documents do I need for a study permit from India?", ChecklistKey("Study Permit", "India")),
+    ("Study permit checklist", ChecklistKey("Study Permit", "")),
+    ("visitor visa documents from Nigeria", ChecklistKey("Visitor Visa", "Nigeria")),
+    ("documents required for express entry FSW", ChecklistKey("Express Entry - Federal Skilled Worker", "")),
+    ("Spousal open work permit documents", ChecklistKey("Spousal Open Work Permit", "")),
+    ("Checklist to sponsor my wife", ChecklistKey("Spousal Sponsorship", "")),
+    ("parents and grandparents sponsorship documents", ChecklistKey("Parents and Grandparents Sponsorship", "")),
+    ("PGWP document checklist for Ontario", ChecklistKey("Post-Graduation Work Permit", "Ontario")),
+])
+def test_program_level_requests_share_a_key(text, key):
+    assert checklist_key(text) == key
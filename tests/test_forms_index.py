@@ -0,0 +1,39 @@
+import pytest
+
+from app.agents.forms_index import FormsIndex, form_code_key
+
+ROWS = [
+    {"form_code": "IMM 5257", "title": "Application for Temporary Resident Visa"},
+    {"form_code": "IMM 5257 SCH1", "title": "Schedule 1 - Background/Declaration"},
+    {"form_code": "IMM 1294", "title": "Application for Study Permit Made Outside of Canada"},
+    {"form_code": "IMM 5645", "title": "Family Information"},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FormsIndex([{**row, "how_to_fill_instructions": ""} for row in ROWS])
+
+
+@pytest.mark.parametrize("text, key", [
+    ("IMM 5257", "imm5257"),
+    ("imm5257e", "imm5257e"),
+    ("IMM 5257 Schedule 1", "imm5257sch1"),
+    ("imm5257b1", "imm5257sch1"),
+    ("IMM 8 DEP", "imm0008dep"),
+])
+def test_form_code_key(text, key):
+    assert form_code_key(text) == key
+
+
+def test_schedule_file_name_resolves_to_schedule(index):
+    assert [r.form_number for r in index.search("IMM 5257 B1")] == ["IMM 5257 SCH1"]
+
+
+def test_codes_and_keywords_are_merged(index):
+    numbers = [r.form_number for r in index.search("I need IMM 5257 and a study permit form")]
+    assert numbers[:2] == ["IMM 5257", "IMM 1294"]
+
+
+def test_code_only_query_adds_no_keyword_noise(index):
+    assert [r.form_number for r in index.search("IMM 5257 and IMM 5645")] == ["IMM 5257", "IMM 5645"]
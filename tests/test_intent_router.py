@@ -0,0 +1,54 @@
+import pytest
+
+from bridge.intent_router import CHITCHAT, DOCUMENTS, ELIGIBILITY, SEED_EXAMPLES, SOP, route_intent
+
+# Labelled regression set, held out from SEED_EXAMPLES. None means the
+# message must fall back to chitchat_agent: general questions that only
+# mention a program, permit or document in passing.
+LABELLED = [
+    ("how much money do i need for proof of funds", None),
+    ("what should i know before applying for pr", None),
+    ("I have a question about my work permit application", None),
+    ("My friend got refused, what does that mean for my application?", None),
+    ("I am 30 years old and live in Toronto", None),
+    ("What is a checklist for?", None),
+    ("I want to write a letter to my MP about immigration delays", None),
+    ("how long does express entry take", None),
+    ("can i work while studying in canada", None),
+    ("what happens after i get an ita", None),
+    ("is ielts required for a study permit", None),
+    ("how do i renew my passport", None),
+    ("hi, can you help me with something", None),
+    ("write me a poem about canada", None),
+    ("what documents do i need for a study permit from india", DOCUMENTS),
+    ("documents required for spousal sponsorship", DOCUMENTS),
+    ("checklist for visitor visa", DOCUMENTS),
+    ("which documents should i prepare for an express entry profile", DOCUMENTS),
+    ("am i eligible for express entry", ELIGIBILITY),
+    ("what is my crs score with clb 9 and a masters", ELIGIBILITY),
+    ("which programs can i apply for with 3 years experience as a nurse", ELIGIBILITY),
+    ("write my sop for a canadian college", SOP),
+    ("draft a letter of recommendation from my manager", SOP),
+    ("write a letter of explanation about my previous refusal", SOP),
+]
+
+
+def test_labelled_set_is_held_out():
+    seeds = {seed.lower() for examples in SEED_EXAMPLES.values() for seed in examples}
+    assert not [text for text, _ in LABELLED if text.lower() in seeds]
+
+
+@pytest.mark.parametrize("text, expected", LABELLED)
+def test_labelled_messages(text, expected):
+    assert route_intent(text).escalate_to == expected
+
+
+def test_precision_on_labelled_set():
+    routed = [(route_intent(text).escalate_to, expected) for text, expected in LABELLED]
+    routed = [(got, expected) for got, expected in routed if got is not None]
+    correct = sum(got == expected for got, expected in routed)
+    assert routed and correct / len(routed) == 1.0
+
+
+def test_chitchat_is_never_a_target():
+    assert all(route_intent(text).escalate_to != CHITCHAT for text, _ in LABELLED)
@@ -0,0 +1,25 @@
+from scrapers.markdown_chunker import MAX_TOKENS, MIN_TOKENS, chunk_document
+
+INTRO = "This page explains who can apply and which documents you need before you start an application for this program online."
+LONG_SECTION = " ".join(f"Sentence number {i} explains a requirement." for i in range(80))
+
+
+def doc(content):
+    return {"id": "doc", "url": "https://example.com", "title": "Title", "timestamp": "2025-10-04",
+            "language": "en", "source": "ircc_gov", "content": content}
+
+
+def test_small_section_is_packed_with_a_long_next_section():
+    chunks = chunk_document(doc(f"# Title\n\n{INTRO}\n\n## Section A\n\n{LONG_SECTION}"))
+
+    assert chunks[0]["content"].startswith(f"# Title\n\n{INTRO}\n\n## Section A\n\nSentence number 0 ")
+    assert all(chunk["token_count"] >= MIN_TOKENS for chunk in chunks)
+    assert all(chunk["token_count"] <= MAX_TOKENS for chunk in chunks)
+
+
+def test_small_section_is_packed_with_a_long_list():
+    items = "\n".join(f"- Item {i}: a supporting document you must upload." for i in range(60))
+    chunks = chunk_document(doc(f"# Title\n\n{INTRO}\n\n## Documents\n\n{items}"))
+
+    assert chunks[0]["content"].startswith(f"# Title\n\n{INTRO}\n\n## Documents\n\n- Item 0:")
+    assert all(chunk["token_count"] <= MAX_TOKENS for chunk in chunks)
@@ -0,0 +1,36 @@
+import pytest
+
+from app.agents.eligibility_rules.eligibility_checker import (
+    COMPILED_RULES, ApplicantFacts, evaluate_eligibility_batch,
+)
+
+FSW = next(rule for rule in COMPILED_RULES if rule.program_name.startswith("Federal Skilled Worker"))
+PROFILE = {"work_experience_years": 3, "education_level": "bachelor", "clb_score": 9, "noc_teer_level": "1",
+           "age": 30, "family_size": 2}
+
+
+def funds_check(**overrides):
+    return FSW.evaluate(ApplicantFacts({**PROFILE, **overrides}))["settlement_funds"][0]
+
+
+def test_table_is_read_by_family_size():
+    assert FSW.required_funds(2) == 19001
+    assert FSW.required_funds(9) == 40392 + 2 * 4112
+
+
+@pytest.mark.parametrize("overrides, passed", [
+    ({}, True),                                   # unknown: not checked
+    ({"settlement_funds_cad": None}, True),
+    ({"settlement_funds_cad": 19001}, True),
+    ({"settlement_funds_cad": 19000}, False),
+    ({"settlement_funds_cad": 0}, False),
+])
+def test_funds_check(overrides, passed):
+    assert funds_check(**overrides) is passed
+
+
+def test_batch_matches_scalar():
+    profiles = [PROFILE, {**PROFILE, "settlement_funds_cad": 0}, {**PROFILE, "settlement_funds_cad": 50000}]
+    result = evaluate_eligibility_batch(profiles)
+    column = result["program_names"].index(FSW.program_name)
+    assert result["failed_checks"]["settlement_funds"][:, column].tolist() == [False, True, False]